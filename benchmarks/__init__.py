@@ -0,0 +1 @@
+"""Benchmarks, the fake CKAN server and the load-testing harness."""
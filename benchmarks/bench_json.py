@@ -0,0 +1,104 @@
+"""Micro-benchmark of the JSON codecs on representative payloads.
+
+Compares the standard library codec with orjson (when installed) on:
+
+- decoding a ``datastore_search`` response body
+- encoding a GeoJSON feature collection (``map_generator``)
+- encoding a Vega-Lite spec with inline data (``chart_generator``)
+
+Usage:
+    python benchmarks/bench_json.py [--rows 10000] [--repeat 5]
+"""
+
+import argparse
+import random
+import time
+
+from datagov_mcp.json_codec import OrjsonCodec, StdlibCodec, orjson_available
+
+CITIES = ["תל אביב", "ירושלים", "חיפה", "באר שבע", "נתניה", None]
+
+
+def make_records(rows: int) -> list[dict]:
+    rng = random.Random(42)
+    return [
+        {
+            "_id": i + 1,
+            "שם": f"תחנה {i}",
+            "city": rng.choice(CITIES),
+            "lat": round(rng.uniform(29.5, 33.3), 6),
+            "lon": round(rng.uniform(34.2, 35.9), 6),
+            "value": rng.random() * 1000 if i % 7 else None,
+            "count": rng.randint(0, 10_000),
+        }
+        for i in range(rows)
+    ]
+
+
+def make_payloads(rows: int) -> dict[str, object]:
+    records = make_records(rows)
+    geojson = {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [r["lon"], r["lat"]]},
+                "properties": {k: v for k, v in r.items() if k not in ("lat", "lon")},
+            }
+            for r in records
+        ],
+    }
+    spec = {
+        "$schema": "https://vega.github.io/schema/vega-lite/v5.json",
+        "data": {"values": records},
+        "mark": "bar",
+        "encoding": {"x": {"field": "city"}, "y": {"field": "value", "type": "quantitative"}},
+    }
+    response = {"success": True, "result": {"records": records, "total": rows}}
+    return {"response": response, "geojson": geojson, "spec": spec}
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    codecs = [StdlibCodec()]
+    if orjson_available():
+        codecs.append(OrjsonCodec())
+    else:
+        print("orjson is not installed; only the standard library is measured\n")
+
+    payloads = make_payloads(args.rows)
+    body = StdlibCodec().dumps_bytes(payloads["response"])
+    cases = {
+        f"decode datastore_search ({len(body) / 1e6:.1f} MB)": lambda c: c.loads(body),
+        "encode GeoJSON": lambda c: c.dumps(payloads["geojson"]),
+        "encode Vega-Lite spec": lambda c: c.dumps(payloads["spec"]),
+    }
+
+    print(f"{args.rows} rows, best of {args.repeat}\n")
+    header = f"{'case':<36}" + "".join(f"{c.name:>12}" for c in codecs)
+    if len(codecs) > 1:
+        header += f"{'speedup':>10}"
+    print(header)
+    for label, case in cases.items():
+        timings = [best_of(lambda: case(c), args.repeat) for c in codecs]
+        line = f"{label:<36}" + "".join(f"{t * 1000:>10.1f}ms" for t in timings)
+        if len(timings) > 1:
+            line += f"{timings[0] / timings[1]:>9.1f}x"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Measure the overhead of the metrics instrumentation.
+
+Times the cheapest instrumented path, a ``ckan_api_call`` served from the
+in-memory cache, with metrics enabled and disabled, as well as the raw cost
+of each recording primitive. Upstream calls take milliseconds, so the
+overhead there is far smaller in relative terms.
+
+Usage:
+    python benchmarks/bench_metrics.py [--calls 100000]
+"""
+
+import argparse
+import asyncio
+import time
+
+from datagov_mcp.api import ckan_api_call
+from datagov_mcp.cache import make_cache_key, response_cache
+from datagov_mcp.metrics import Metrics, metrics
+
+
+def per_call_ns(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+async def cached_call_ns(calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        await ckan_api_call("license_list")
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def bench_primitives(calls: int) -> None:
+    registry = Metrics()
+
+    def track():
+        with registry.track_action("package_search"):
+            pass
+
+    def upstream():
+        registry.upstream_finished(
+            "package_search", registry.upstream_started("package_search"), 200
+        )
+
+    def cache():
+        registry.record_cache("package_search", "hit")
+
+    print(f"{'primitive':<28}{'ns/event':>10}")
+    for label, fn in (
+        ("track_action", track),
+        ("upstream attempt", upstream),
+        ("record_cache", cache),
+    ):
+        print(f"{label:<28}{per_call_ns(fn, calls):>10.0f}")
+
+
+async def bench_cached_call(calls: int) -> None:
+    key = make_cache_key("license_list", "GET", {})
+    response_cache.set(key, "license_list", {"success": True, "result": []}, size=1)
+
+    timings = {}
+    for enabled in (False, True, False, True):  # interleave to reduce drift
+        metrics.enabled = enabled
+        ns = await cached_call_ns(calls)
+        timings[enabled] = min(ns, timings.get(enabled, ns))
+    overhead = timings[True] - timings[False]
+
+    print(f"\n{'cached ckan_api_call':<28}{'ns/call':>10}")
+    print(f"{'metrics disabled':<28}{timings[False]:>10.0f}")
+    print(f"{'metrics enabled':<28}{timings[True]:>10.0f}")
+    print(f"{'overhead':<28}{overhead:>10.0f}  ({overhead / timings[False]:+.0%})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100_000)
+    args = parser.parse_args()
+
+    bench_primitives(args.calls)
+    asyncio.run(bench_cached_call(args.calls))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""Micro-benchmarks of the CPU-bound data processing, with stored baselines.
+
+Measures time and peak traced allocations of:
+
+- ``infer_field_type`` over every column of a table (``dataset_profile``)
+- ``calculate_stats`` over every column of a table (``dataset_profile``)
+- the GeoJSON feature loop of ``map_generator``
+- the Vega-Lite spec and HTML assembly of ``chart_generator``
+
+on synthetic tables with mixed types, nulls and Hebrew strings. Baselines are
+stored in ``benchmarks/baselines/processing.json``; ``--check`` fails when a
+case is slower or allocates more than the baseline by over ``--threshold``.
+Timings are only comparable on the machine that recorded the baseline, so
+re-record it there before optimizing; ``--normalize`` scales baseline timings
+by a pure-Python calibration loop for a rough comparison across machines.
+
+Usage:
+    python -m benchmarks.bench_processing [--sizes 100,1000,10000,100000]
+    python -m benchmarks.bench_processing --save-baseline
+    python -m benchmarks.bench_processing --check [--threshold 0.3] [--normalize]
+    python -m benchmarks.bench_processing --sizes 1000000
+"""
+
+import argparse
+import gc
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from datagov_mcp.visualization_impl import (
+    build_chart_spec,
+    calculate_stats,
+    infer_field_type,
+    records_to_features,
+    render_chart_html,
+)
+
+DEFAULT_SIZES = [100, 1_000, 10_000, 100_000]
+DEFAULT_BASELINE = Path(__file__).parent / "baselines" / "processing.json"
+DEFAULT_THRESHOLD = 0.3
+
+# Absolute slack so sub-millisecond cases don't fail on timer noise
+TIME_SLACK_MS = 0.05
+PEAK_SLACK_KIB = 16.0
+
+CITIES = ["תל אביב - יפו", "ירושלים", "חיפה", "באר שבע", "נתניה", "אשדוד", "Eilat"]
+STATUSES = ["פעיל", "סגור", "בבנייה", "", None]
+
+
+def make_table(rows: int, seed: int = 42) -> list[dict[str, Any]]:
+    """Build a synthetic datastore table with mixed types and nulls."""
+    rng = random.Random(seed)
+    table = []
+    for i in range(rows):
+        table.append(
+            {
+                "_id": i + 1,
+                "name": f"מוסד {i} {rng.choice(CITIES)}",
+                "city": rng.choice(CITIES),
+                "status": rng.choice(STATUSES),
+                "lat": round(rng.uniform(29.5, 33.3), 6) if i % 50 else None,
+                "lon": round(rng.uniform(34.2, 35.9), 6) if i % 50 else "",
+                "value": round(rng.uniform(0, 1e5), 2) if i % 9 else None,
+                "count": rng.randint(0, 10_000),
+                "code": str(rng.randint(100, 999)),  # numeric strings
+                "date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            }
+        )
+    return table
+
+
+def columns(table: list[dict[str, Any]]) -> dict[str, list[Any]]:
+    """Split a table into per-field value lists, as ``dataset_profile`` does."""
+    names = [name for name in table[0] if name != "_id"] if table else []
+    return {name: [record.get(name) for record in table] for name in names}
+
+
+def build_cases(table: list[dict[str, Any]]) -> dict[str, Callable[[], Any]]:
+    """Benchmark cases over one table, keyed by case name."""
+    cols = columns(table)
+    types = {name: infer_field_type(values) for name, values in cols.items()}
+
+    def infer_types():
+        for values in cols.values():
+            infer_field_type(values)
+
+    def stats():
+        for name, values in cols.items():
+            calculate_stats(values, types[name])
+
+    def map_features():
+        records_to_features(table, "lat", "lon")
+
+    def chart_html():
+        render_chart_html(build_chart_spec(table, "bar", "city", "value"))
+
+    return {
+        "infer_field_type": infer_types,
+        "calculate_stats": stats,
+        "map_features": map_features,
+        "chart_spec_html": chart_html,
+    }
+
+
+def time_call(fn: Callable[[], Any], repeat: int, min_time: float = 0.02) -> float:
+    """
+    Best per-call time in seconds, looping each sample to at least ``min_time``.
+
+    Like ``timeit``, the cyclic garbage collector is paused while timing so a
+    collection triggered by building the table doesn't land in one sample.
+    """
+    gc.collect()
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _best_time(fn, repeat, min_time)
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def _best_time(fn: Callable[[], Any], repeat: int, min_time: float) -> float:
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1 << 20:
+            break
+        loops *= 2
+    best = elapsed / loops
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        best = min(best, (time.perf_counter() - start) / loops)
+    return best
+
+
+def peak_allocated(fn: Callable[[], Any]) -> int:
+    """Peak bytes allocated while running ``fn`` once."""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - base
+
+
+def calibrate(repeat: int = 5) -> float:
+    """Time a fixed pure-Python workload, in milliseconds."""
+
+    def workload():
+        counts: dict[str, int] = {}
+        for i in range(20_000):
+            key = str(i % 97)
+            counts[key] = counts.get(key, 0) + 1
+        sorted(float(v) for v in counts.values())
+
+    return time_call(workload, repeat) * 1000
+
+
+def run(
+    sizes: list[int], repeat: int, only: list[str] | None = None, log=print
+) -> dict[str, dict[str, float]]:
+    """Measure every case at every size; returns ``{"case/rows": {time_ms, peak_kib}}``."""
+    results = {}
+    for rows in sizes:
+        cases = build_cases(make_table(rows))
+        for name, fn in cases.items():
+            if only and name not in only:
+                continue
+            key = f"{name}/{rows}"
+            results[key] = {
+                "time_ms": time_call(fn, repeat) * 1000,
+                "peak_kib": peak_allocated(fn) / 1024,
+            }
+            log(
+                f"{name:<20}{rows:>10}{results[key]['time_ms']:>12.3f}"
+                f"{results[key]['peak_kib']:>14.1f}"
+            )
+    return results
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, Any],
+    threshold: float = DEFAULT_THRESHOLD,
+    calibration_ms: float | None = None,
+) -> list[str]:
+    """
+    Describe every case that regressed more than ``threshold`` over the baseline.
+
+    With ``calibration_ms``, baseline timings are scaled by how much slower or
+    faster this machine ran the calibration loop than the baseline machine.
+    """
+    scale = 1.0
+    if calibration_ms and baseline.get("calibration_ms"):
+        scale = calibration_ms / baseline["calibration_ms"]
+    regressions = []
+    for key, current in results.items():
+        expected = baseline.get("cases", {}).get(key)
+        if expected is None:
+            continue
+        time_limit = expected["time_ms"] * scale * (1 + threshold) + TIME_SLACK_MS
+        if current["time_ms"] > time_limit:
+            regressions.append(
+                f"{key}: {current['time_ms']:.3f} ms > {time_limit:.3f} ms "
+                f"(baseline {expected['time_ms']:.3f} ms, scale {scale:.2f})"
+            )
+        peak_limit = expected["peak_kib"] * (1 + threshold) + PEAK_SLACK_KIB
+        if current["peak_kib"] > peak_limit:
+            regressions.append(
+                f"{key}: peak {current['peak_kib']:.1f} KiB > {peak_limit:.1f} KiB "
+                f"(baseline {expected['peak_kib']:.1f} KiB)"
+            )
+    return regressions
+
+
+def confirm(
+    results: dict[str, dict[str, float]], keys: list[str], repeat: int
+) -> dict[str, dict[str, float]]:
+    """Re-measure ``keys`` and keep the better timing, so one noisy run doesn't fail a check."""
+    cases = {key.split("/")[0] for key in keys}
+    sizes = sorted({int(key.split("/")[1]) for key in keys})
+    again = run(sizes, repeat, sorted(cases), log=lambda line: None)
+    merged = dict(results)
+    for key in keys:
+        if key in again:
+            merged[key] = {
+                "time_ms": min(results[key]["time_ms"], again[key]["time_ms"]),
+                "peak_kib": min(results[key]["peak_kib"], again[key]["peak_kib"]),
+            }
+    return merged
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=lambda v: [int(s) for s in v.split(",")],
+        default=DEFAULT_SIZES,
+        help="Comma-separated row counts",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--cases", type=lambda v: v.split(","), help="Only run these cases")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store results as baseline")
+    parser.add_argument("--check", action="store_true", help="Exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument(
+        "--normalize", action="store_true", help="Scale baseline timings by calibration"
+    )
+    args = parser.parse_args()
+
+    calibration_ms = calibrate(args.repeat)
+    print(f"calibration {calibration_ms:.2f} ms, best of {args.repeat}\n")
+    print(f"{'case':<20}{'rows':>10}{'time ms':>12}{'peak KiB':>14}")
+    results = run(args.sizes, args.repeat, args.cases)
+
+    if args.save_baseline:
+        # Merge so baselines for other sizes or cases are kept
+        cases = {}
+        if args.baseline.exists():
+            cases = json.loads(args.baseline.read_text()).get("cases", {})
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        baseline = {
+            "calibration_ms": calibration_ms,
+            "python": platform.python_version(),
+            "cases": {**cases, **results},
+        }
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"\nBaseline written to {args.baseline}")
+
+    if args.check:
+        baseline = json.loads(args.baseline.read_text())
+        calibration = calibration_ms if args.normalize else None
+        regressions = compare(results, baseline, args.threshold, calibration)
+        if regressions:
+            suspects = [line.split(":")[0] for line in regressions]
+            results = confirm(results, suspects, args.repeat * 2)
+            regressions = compare(results, baseline, args.threshold, calibration)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions over {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
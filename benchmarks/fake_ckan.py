@@ -0,0 +1,413 @@
+"""Local CKAN stand-in serving synthetic datasets, with injectable latency and faults.
+
+Implements the subset of the CKAN action API the server uses (``status_show``,
+``license_list``, ``package_list``, ``package_search``, ``package_show``,
+``organization_list``, ``organization_show``, ``resource_show``, ``resource_search``,
+``datastore_search`` and the ``_id`` range queries the server sends to
+``datastore_search_sql``) over deterministic synthetic data of configurable
+size. Datastore rows are generated on demand, so large resources cost no memory.
+
+Usage:
+    python -m benchmarks.fake_ckan --port 8765 --rows 100000 --latency-ms 20 \\
+        --error-rate 0.01 --throttle-rate 0.01
+
+Then run the server against it with ``DATAGOV_BASE_URL=http://127.0.0.1:8765/api/3``.
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import random
+import re
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+CITIES = ["תל אביב - יפו", "ירושלים", "חיפה", "באר שבע", "נתניה", "אשדוד", "ראשון לציון"]
+TOPICS = ["education", "health", "transport", "environment", "budget", "population"]
+TOPIC_TITLES = {
+    "education": "חינוך",
+    "health": "בריאות",
+    "transport": "תחבורה",
+    "environment": "סביבה",
+    "budget": "תקציב",
+    "population": "אוכלוסייה",
+}
+
+FIELDS = [
+    {"id": "_id", "type": "int"},
+    {"id": "name", "type": "text"},
+    {"id": "city", "type": "text"},
+    {"id": "lat", "type": "numeric"},
+    {"id": "lon", "type": "numeric"},
+    {"id": "value", "type": "numeric"},
+    {"id": "count", "type": "int4"},
+    {"id": "date", "type": "timestamp"},
+]
+
+
+@dataclass
+class FakeCKANConfig:
+    """Size of the synthetic catalog and injected faults."""
+
+    datasets: int = 100
+    resources_per_dataset: int = 2
+    rows_per_resource: int = 10_000
+    latency_ms: float = 0.0
+    latency_jitter_ms: float = 0.0
+    error_rate: float = 0.0  # fraction of requests answered with 500
+    throttle_rate: float = 0.0  # fraction of requests answered with 429
+    retry_after: float = 1.0  # Retry-After sent with 429s
+    gzip: bool = True
+    sql_enabled: bool = True  # answer datastore_search_sql, as opposed to 403
+    seed: int = 0
+
+
+# The statements keyset paging sends, e.g.
+#   SELECT "_id", "city" FROM "res-0-0" WHERE "city" = 'x' AND "_id" > 10 ORDER BY "_id" LIMIT 5
+SQL_SELECT = re.compile(
+    r'SELECT (?P<columns>.+?) FROM "(?P<table>[^"]+)"(?: WHERE (?P<where>.+?))?'
+    r'(?: ORDER BY "_id")?(?: LIMIT (?P<limit>\d+))?(?: OFFSET (?P<offset>\d+))?$'
+)
+SQL_CONDITION = re.compile(r'"(?P<column>[^"]+)" (?P<op>=|>|<=) (?P<value>.+)')
+
+
+def dataset_name(index: int) -> str:
+    return f"dataset-{index}"
+
+
+def resource_id(dataset_index: int, resource_index: int) -> str:
+    return f"res-{dataset_index}-{resource_index}"
+
+
+def make_row(resource_seed: int, index: int) -> dict[str, Any]:
+    """Build row ``index`` (0-based) of a resource deterministically."""
+    mixed = (index * 2654435761 + resource_seed * 40503) % 1_000_003
+    return {
+        "_id": index + 1,
+        "name": f"רשומה {index + 1}",
+        "city": CITIES[mixed % len(CITIES)],
+        "lat": round(29.5 + (mixed % 38000) / 10000, 6),
+        "lon": round(34.3 + (mixed % 16000) / 10000, 6),
+        "value": None if index % 11 == 0 else round((mixed % 100000) / 100, 2),
+        "count": mixed % 5000,
+        "date": f"2024-{1 + mixed % 12:02d}-{1 + mixed % 28:02d}T00:00:00",
+    }
+
+
+class FakeCKAN:
+    """Synthetic catalog plus the ASGI app that serves it."""
+
+    def __init__(self, config: FakeCKANConfig | None = None):
+        self.config = config or FakeCKANConfig()
+        self.requests: Counter[str] = Counter()
+        self.faults: Counter[str] = Counter()
+        self._rng = random.Random(self.config.seed)
+        self.organizations = [
+            {"id": f"org-{i}", "name": f"org-{i}", "title": f"משרד {i}"}
+            for i in range(max(1, self.config.datasets // 10))
+        ]
+        self.packages = [self._package(i) for i in range(self.config.datasets)]
+        self._by_name = {p["name"]: p for p in self.packages}
+        self._by_name.update({p["id"]: p for p in self.packages})
+        self._resources = {r["id"]: r for p in self.packages for r in p["resources"]}
+
+    def _package(self, index: int) -> dict[str, Any]:
+        topic = TOPICS[index % len(TOPICS)]
+        organization = self.organizations[index % len(self.organizations)]
+        name = dataset_name(index)
+        return {
+            "id": f"pkg-{index}",
+            "name": name,
+            "title": f"{TOPIC_TITLES[topic]} {index} ({topic})",
+            "notes": f"Synthetic {topic} dataset {index}",
+            "organization": organization,
+            "owner_org": organization["id"],
+            "metadata_modified": f"2024-01-{1 + index % 28:02d}T00:00:00",
+            "num_resources": self.config.resources_per_dataset,
+            "resources": [
+                {
+                    "id": resource_id(index, j),
+                    "name": f"{name} resource {j}",
+                    "format": "CSV",
+                    "datastore_active": True,
+                    "package_id": f"pkg-{index}",
+                    "last_modified": f"2024-02-{1 + index % 28:02d}T00:00:00",
+                }
+                for j in range(self.config.resources_per_dataset)
+            ],
+        }
+
+    def app(self) -> Starlette:
+        """Build the ASGI application."""
+        middleware = [Middleware(GZipMiddleware, minimum_size=1024)] if self.config.gzip else []
+        return Starlette(
+            routes=[
+                Route("/api/3/action/{action}", self._dispatch, methods=["GET", "POST"]),
+                Route("/_stats", self._stats, methods=["GET"]),
+            ],
+            middleware=middleware,
+        )
+
+    async def _stats(self, request: Request) -> Response:
+        return JSONResponse({"requests": dict(self.requests), "faults": dict(self.faults)})
+
+    async def _dispatch(self, request: Request) -> Response:
+        action = request.path_params["action"]
+        self.requests[action] += 1
+        config = self.config
+        if config.latency_ms or config.latency_jitter_ms:
+            jitter = self._rng.uniform(0, config.latency_jitter_ms)
+            await asyncio.sleep((config.latency_ms + jitter) / 1000)
+        roll = self._rng.random()
+        if roll < config.throttle_rate:
+            self.faults["429"] += 1
+            return _error(429, "Rate limit exceeded", {"Retry-After": f"{config.retry_after:g}"})
+        if roll < config.throttle_rate + config.error_rate:
+            self.faults["500"] += 1
+            return _error(500, "Internal server error")
+
+        params: dict[str, Any] = dict(request.query_params)
+        if request.method == "POST":
+            body = await request.body()
+            if body:
+                params.update(json.loads(body))
+        handler = getattr(self, f"action_{action}", None)
+        if handler is None:
+            return _error(400, f"Action name not known: {action}")
+        try:
+            result = handler(params)
+        except KeyError as e:
+            return _error(404, f"Not found: {e.args[0]}")
+        except PermissionError as e:
+            return _error(403, str(e))
+        except ValueError as e:
+            return _error(409, str(e))
+        return _ok(result)
+
+    def action_status_show(self, params: dict[str, Any]) -> dict[str, Any]:
+        return {"ckan_version": "2.9.9", "site_title": "Fake CKAN", "extensions": ["datastore"]}
+
+    def action_license_list(self, params: dict[str, Any]) -> list[dict[str, Any]]:
+        return [{"id": "cc-by", "title": "Creative Commons Attribution"}]
+
+    def action_package_list(self, params: dict[str, Any]) -> list[str]:
+        return [p["name"] for p in self.packages]
+
+    def action_organization_list(self, params: dict[str, Any]) -> list[str]:
+        return [o["name"] for o in self.organizations]
+
+    def action_organization_show(self, params: dict[str, Any]) -> dict[str, Any]:
+        org_id = params.get("id", "")
+        organization = next((o for o in self.organizations if o["name"] == org_id), None)
+        if organization is None:
+            raise KeyError(org_id)
+        count = sum(1 for p in self.packages if p["owner_org"] == organization["id"])
+        return {**organization, "package_count": count}
+
+    def action_package_show(self, params: dict[str, Any]) -> dict[str, Any]:
+        return self._by_name[params.get("id", "")]
+
+    def action_package_search(self, params: dict[str, Any]) -> dict[str, Any]:
+        q = str(params.get("q", "")).lower()
+        rows = int(params.get("rows", 10))
+        start = int(params.get("start", 0))
+        matches = [
+            p for p in self.packages if not q or q in p["title"].lower() or q in p["notes"].lower()
+        ]
+        return {"count": len(matches), "results": matches[start : start + rows]}
+
+    def action_resource_show(self, params: dict[str, Any]) -> dict[str, Any]:
+        return self._resources[params.get("id", "")]
+
+    def action_resource_search(self, params: dict[str, Any]) -> dict[str, Any]:
+        query = str(params.get("query", ""))
+        _, _, term = query.partition(":")
+        limit = int(params.get("limit", 100))
+        offset = int(params.get("offset", 0))
+        matches = [r for r in self._resources.values() if term.lower() in r["name"].lower()]
+        return {"count": len(matches), "results": matches[offset : offset + limit]}
+
+    def _resource_seed(self, res_id: str) -> int:
+        if res_id not in self._resources:
+            raise KeyError(res_id)
+        return zlib.crc32(res_id.encode()) & 0xFFFF
+
+    def action_datastore_search(self, params: dict[str, Any]) -> dict[str, Any]:
+        res_id = params.get("resource_id", "")
+        resource_seed = self._resource_seed(res_id)
+        total = self.config.rows_per_resource
+        limit = min(int(params.get("limit", 100)), 32000)
+        offset = int(params.get("offset", 0))
+        filters = params.get("filters") or {}
+        if isinstance(filters, str):
+            filters = json.loads(filters)
+
+        if filters:
+            rows = [
+                row
+                for row in (make_row(resource_seed, i) for i in range(total))
+                if all(row.get(k) == v for k, v in filters.items())
+            ]
+            total = len(rows)
+            rows = rows[offset : offset + limit]
+        else:
+            end = min(offset + limit, total)
+            rows = [make_row(resource_seed, i) for i in range(offset, end)]
+
+        fields = FIELDS
+        requested = params.get("fields")
+        if requested:
+            names = [f.strip() for f in str(requested).split(",") if f.strip()]
+            fields = [f for f in FIELDS if f["id"] in names]
+            rows = [{name: row.get(name) for name in names} for row in rows]
+
+        result: dict[str, Any] = {
+            "resource_id": res_id,
+            "fields": fields,
+            "limit": limit,
+            "offset": offset,
+            "total": total,
+        }
+        records_format = params.get("records_format", "objects")
+        field_ids = [f["id"] for f in fields]
+        if records_format == "lists":
+            result["records"] = [[row.get(f) for f in field_ids] for row in rows]
+        elif records_format == "csv":
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows([row.get(f) for f in field_ids] for row in rows)
+            result["records"] = buffer.getvalue()
+        else:
+            result["records"] = rows
+        return result
+
+    def action_datastore_search_sql(self, params: dict[str, Any]) -> dict[str, Any]:
+        if not self.config.sql_enabled:
+            raise PermissionError("Access denied: datastore_search_sql is disabled")
+        match = SQL_SELECT.match(str(params.get("sql", "")).strip())
+        if match is None:
+            raise ValueError("Unsupported SQL statement")
+        resource_seed = self._resource_seed(match["table"])
+        conditions = [SQL_CONDITION.match(c) for c in (match["where"] or "").split(" AND ") if c]
+        if not all(conditions):
+            raise ValueError("Unsupported SQL condition")
+
+        # Only the _id range is read, so deep keyset pages cost no more than the first
+        low, high = 0, self.config.rows_per_resource
+        for condition in conditions:
+            if condition["column"] == "_id" and condition["op"] == ">":
+                low = max(low, int(condition["value"]))
+            elif condition["column"] == "_id" and condition["op"] == "<=":
+                high = min(high, int(condition["value"]))
+        filters = {c["column"]: _sql_literal(c["value"]) for c in conditions if c["op"] == "="}
+        rows = [
+            row
+            for row in (make_row(resource_seed, i) for i in range(low, max(low, high)))
+            if all(row.get(k) == v for k, v in filters.items())
+        ]
+
+        columns = [c.strip() for c in match["columns"].split(",")]
+        if columns[0].startswith("count(*)"):
+            ids = [row["_id"] for row in rows]
+            return {
+                "records": [
+                    {
+                        "total": len(ids),
+                        "lo": min(ids, default=None),
+                        "hi": max(ids, default=None),
+                    }
+                ]
+            }
+        offset = int(match["offset"] or 0)
+        end = offset + int(match["limit"]) if match["limit"] else None
+        names = [c.strip('"') for c in columns]
+        fields = [f for f in FIELDS if f["id"] in names]
+        return {
+            "fields": fields,
+            "records": [{name: row.get(name) for name in names} for row in rows[offset:end]],
+        }
+
+
+def _sql_literal(text: str) -> Any:
+    if text.startswith("'"):
+        return text[1:-1].replace("''", "'")
+    return float(text) if "." in text else int(text)
+
+
+def _ok(result: Any) -> Response:
+    body = json.dumps({"success": True, "result": result}, ensure_ascii=False)
+    return Response(body, media_type="application/json")
+
+
+def _error(status: int, message: str, headers: dict[str, str] | None = None) -> Response:
+    return JSONResponse(
+        {"success": False, "error": {"message": message, "__type": "Error"}},
+        status_code=status,
+        headers=headers,
+    )
+
+
+def create_app(config: FakeCKANConfig | None = None) -> Starlette:
+    """Build a fake CKAN ASGI app."""
+    return FakeCKAN(config).app()
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the ``FakeCKANConfig`` options to a command-line parser."""
+    defaults = FakeCKANConfig()
+    parser.add_argument("--datasets", type=int, default=defaults.datasets)
+    parser.add_argument("--resources", type=int, default=defaults.resources_per_dataset)
+    parser.add_argument("--rows", type=int, default=defaults.rows_per_resource)
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=defaults.latency_jitter_ms)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--throttle-rate", type=float, default=defaults.throttle_rate)
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after)
+    parser.add_argument("--no-gzip", action="store_true")
+    parser.add_argument("--no-sql", action="store_true", help="Refuse datastore_search_sql")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def config_from_args(args: argparse.Namespace) -> FakeCKANConfig:
+    """Build a config from the options added by ``add_config_arguments``."""
+    return FakeCKANConfig(
+        datasets=args.datasets,
+        resources_per_dataset=args.resources,
+        rows_per_resource=args.rows,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        gzip=not args.no_gzip,
+        sql_enabled=not args.no_sql,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning"
+    )
+
+
+if __name__ == "__main__":
+    main()
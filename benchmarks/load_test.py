@@ -0,0 +1,267 @@
+"""Load generator: drive the MCP tools at a given concurrency against a fake CKAN.
+
+Starts ``benchmarks.fake_ckan`` in a subprocess (or targets ``--ckan-url``),
+points the server at it through ``DATAGOV_BASE_URL`` and calls the tools
+through an in-memory MCP client, so requests go through the same middleware,
+caches and HTTP client as in production. Reports throughput, p50/p95/p99
+latency per tool, errors, upstream requests and peak RSS of this process
+(the fake CKAN runs in its own process and is not included).
+
+Usage:
+    python -m benchmarks.load_test --concurrency 20 --requests 2000 \\
+        --latency-ms 20 --throttle-rate 0.01 [--no-cache] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Any
+
+import httpx
+
+from benchmarks.fake_ckan import FakeCKANConfig, add_config_arguments, config_from_args
+
+DEFAULT_MIX = {
+    "package_search": 3,
+    "package_show": 3,
+    "datastore_search": 3,
+    "fetch_data": 2,
+    "dataset_profile": 1,
+    "chart_generator": 1,
+    "map_generator": 1,
+}
+
+
+def scenario_args(tool: str, rng: random.Random, config: FakeCKANConfig) -> dict[str, Any]:
+    """Build random arguments for a tool call against the synthetic catalog."""
+    dataset = rng.randrange(config.datasets)
+    resource_id = f"res-{dataset}-{rng.randrange(config.resources_per_dataset)}"
+    if tool == "package_search":
+        return {"q": rng.choice(["education", "health", "transport", "budget"]), "rows": 20}
+    if tool == "package_show":
+        return {"id": f"dataset-{dataset}"}
+    if tool == "datastore_search":
+        offset = rng.randrange(max(1, config.rows_per_resource - 100))
+        return {"resource_id": resource_id, "limit": 100, "offset": offset}
+    if tool == "fetch_data":
+        return {"dataset_name": f"dataset-{dataset}", "limit": 100}
+    if tool == "dataset_profile":
+        return {"resource_id": resource_id, "sample_size": 500}
+    if tool == "chart_generator":
+        return {
+            "resource_id": resource_id,
+            "chart_type": "bar",
+            "x_field": "city",
+            "y_field": "value",
+            "limit": 500,
+        }
+    if tool == "map_generator":
+        return {"resource_id": resource_id, "lat_field": "lat", "lon_field": "lon", "limit": 500}
+    raise ValueError(f"No scenario for tool {tool!r}")
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    """Parse ``tool=weight,tool=weight``."""
+    mix = {}
+    for part in value.split(","):
+        tool, _, weight = part.partition("=")
+        mix[tool.strip()] = int(weight or 1)
+    return mix
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_fake_ckan(args: argparse.Namespace) -> tuple[subprocess.Popen, str]:
+    """Run the fake CKAN in a subprocess and wait until it answers."""
+    port = free_port()
+    command = [sys.executable, "-m", "benchmarks.fake_ckan", "--port", str(port)]
+    command += _fake_ckan_flags(args)
+    process = subprocess.Popen(command)
+    url = f"http://127.0.0.1:{port}/api/3"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            # Bypass fault injection: /_stats always answers
+            httpx.get(f"http://127.0.0.1:{port}/_stats", timeout=1).raise_for_status()
+            return process, url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Fake CKAN did not start")
+
+
+def _fake_ckan_flags(args: argparse.Namespace) -> list[str]:
+    flags = [
+        f"--datasets={args.datasets}",
+        f"--resources={args.resources}",
+        f"--rows={args.rows}",
+        f"--latency-ms={args.latency_ms}",
+        f"--jitter-ms={args.jitter_ms}",
+        f"--error-rate={args.error_rate}",
+        f"--throttle-rate={args.throttle_rate}",
+        f"--retry-after={args.retry_after}",
+        f"--seed={args.seed}",
+    ]
+    if args.no_gzip:
+        flags.append("--no-gzip")
+    return flags
+
+
+async def run_load(
+    args: argparse.Namespace, config: FakeCKANConfig, mix: dict[str, int]
+) -> dict[str, Any]:
+    # Imported here so DATAGOV_* variables set by main() take effect
+    from fastmcp import Client
+
+    from datagov_mcp.server import mcp
+
+    rng = random.Random(args.seed)
+    tools = list(mix)
+    weights = [mix[t] for t in tools]
+    plan = [rng.choices(tools, weights)[0] for _ in range(args.requests)]
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    next_index = 0
+
+    async def worker(client: Client, worker_rng: random.Random) -> None:
+        nonlocal next_index
+        while next_index < len(plan):
+            tool = plan[next_index]
+            next_index += 1
+            arguments = scenario_args(tool, worker_rng, config)
+            start = time.perf_counter()
+            try:
+                result = await client.call_tool(tool, arguments, raise_on_error=False)
+                failed = result.is_error or (
+                    isinstance(result.structured_content, dict)
+                    and "error" in result.structured_content
+                )
+            except Exception:
+                failed = True
+            latencies[tool].append(time.perf_counter() - start)
+            if failed:
+                errors[tool] += 1
+
+    async def drop_log(message) -> None:
+        pass
+
+    # Tool progress messages would otherwise flood the report
+    logging.getLogger("fastmcp").setLevel(logging.WARNING)
+    async with Client(mcp, log_handler=drop_log) as client:
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(worker(client, random.Random(args.seed + i)) for i in range(args.concurrency))
+        )
+        elapsed = time.perf_counter() - started
+
+    def summary(values: list[float]) -> dict[str, float]:
+        ordered = sorted(values)
+        return {
+            "count": len(ordered),
+            "p50_ms": percentile(ordered, 0.50) * 1000,
+            "p95_ms": percentile(ordered, 0.95) * 1000,
+            "p99_ms": percentile(ordered, 0.99) * 1000,
+        }
+
+    all_latencies = [v for values in latencies.values() for v in values]
+    return {
+        "requests": len(all_latencies),
+        "concurrency": args.concurrency,
+        "duration_s": elapsed,
+        "throughput_rps": len(all_latencies) / elapsed if elapsed else 0.0,
+        "errors": sum(errors.values()),
+        "latency": summary(all_latencies),
+        "tools": {
+            tool: {**summary(values), "errors": errors[tool]}
+            for tool, values in sorted(latencies.items())
+        },
+        "peak_rss_mb": peak_rss_bytes() / 2**20,
+    }
+
+
+def print_report(report: dict[str, Any]) -> None:
+    print(
+        f"{report['requests']} calls, concurrency {report['concurrency']}, "
+        f"{report['duration_s']:.2f}s -> {report['throughput_rps']:.1f} calls/s, "
+        f"{report['errors']} errors, peak RSS {report['peak_rss_mb']:.0f} MB\n"
+    )
+    header = f"{'tool':<20}{'calls':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    rows = [*report["tools"].items(), ("all", {**report["latency"], "errors": report["errors"]})]
+    for tool, stats in rows:
+        print(
+            f"{tool:<20}{stats['count']:>7}{stats['errors']:>8}"
+            f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}"
+        )
+    upstream = report.get("upstream")
+    if upstream:
+        print(f"\nupstream requests: {upstream['requests']}")
+        print(f"injected faults:   {upstream['faults']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="tool=weight,...")
+    parser.add_argument("--ckan-url", help="Target an already running CKAN instead")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the response cache")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    config = config_from_args(args)
+
+    process = None
+    url = args.ckan_url
+    if url is None:
+        process, url = start_fake_ckan(args)
+    os.environ["DATAGOV_BASE_URL"] = url
+    if args.no_cache:
+        os.environ["DATAGOV_CACHE_ENABLED"] = "false"
+
+    try:
+        report = asyncio.run(run_load(args, config, args.mix))
+        if process is not None:
+            stats_url = url.removesuffix("/api/3") + "/_stats"
+            report["upstream"] = httpx.get(stats_url, timeout=5).json()
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+"""
+Aggregates over whole datastore resources: profiles, histograms and grouped values.
+
+Compiles the statistics behind ``dataset_profile`` and ``chart_generator``
+into ``datastore_search_sql`` statements, so PostgreSQL summarizes the whole
+resource and only the small result crosses the network. When the portal
+refuses SQL, or a statement fails on the data, the same results are computed
+client-side from rows fetched with :func:`fetch_all_records`, up to its caps.
+
+data.gov.il loads most resources as ``text`` columns, so numeric aggregates
+cast only the values that look like numbers, matching what the client-side
+statistics accept.
+"""
+
+import math
+from collections.abc import Iterable
+from typing import Any
+
+from datagov_mcp.api import CKANAPIError, ckan_api_call
+from datagov_mcp.pagination import (
+    fetch_all_records,
+    filter_conditions,
+    quote_identifier,
+    quote_literal,
+    search_sql,
+)
+
+# Aggregate names accepted by the tools, and the SQL function computing each
+AGGREGATES = {"count": "count", "sum": "sum", "mean": "avg", "min": "min", "max": "max"}
+
+NUMERIC_TYPES = frozenset(
+    {
+        "int",
+        "int2",
+        "int4",
+        "int8",
+        "integer",
+        "smallint",
+        "bigint",
+        "numeric",
+        "float4",
+        "float8",
+        "real",
+        "double precision",
+    }
+)
+TEXT_TYPES = frozenset({"text", "varchar", "character varying"})
+
+# Text values cast to numeric by numeric aggregates
+NUMBER_PATTERN = r"^\s*[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?\s*$"
+
+TOP_VALUES = 5
+
+# CKAN answers 409 when a statement fails to execute, e.g. on an unexpected value
+SQL_FAILED_STATUS_CODE = 409
+
+
+def numeric_expression(field: str, db_type: str) -> str | None:
+    """SQL expression for a field's numeric value, or None if it can't be numeric."""
+    column = quote_identifier(field)
+    if db_type in NUMERIC_TYPES:
+        return column
+    if db_type in TEXT_TYPES:
+        return f"CASE WHEN {column} ~ {quote_literal(NUMBER_PATTERN)} THEN {column}::numeric END"
+    return None
+
+
+def profile_sql(resource_id: str, fields: list[tuple[str, str, str]]) -> str:
+    """
+    Build one statement computing the ``calculate_stats`` values of every field.
+
+    ``fields`` holds ``(name, inferred_type, db_type)`` tuples. Result columns
+    are ``rows`` and, for field ``i``, ``n{i}`` (non-null count), ``min{i}``,
+    ``max{i}`` and ``mean{i}`` for numbers, or ``unique{i}`` for strings.
+    """
+    parts = ['count(*) AS "rows"']
+    for i, (name, kind, db_type) in enumerate(fields):
+        column = quote_identifier(name)
+        parts.append(f'count({column}) AS "n{i}"')
+        number = numeric_expression(name, db_type)
+        if kind in ("integer", "number") and number is not None:
+            parts += [
+                f'min({number}) AS "min{i}"',
+                f'max({number}) AS "max{i}"',
+                f'avg({number}) AS "mean{i}"',
+            ]
+        elif kind == "string":
+            parts.append(f'count(DISTINCT {column}) AS "unique{i}"')
+    return f"SELECT {', '.join(parts)} FROM {quote_identifier(resource_id)}"
+
+
+def top_values_sql(resource_id: str, fields: dict[int, str]) -> str:
+    """Build one statement returning the most common values of each ``{index: field}``."""
+    table = quote_identifier(resource_id)
+    branches = []
+    for i, name in fields.items():
+        column = quote_identifier(name)
+        branches.append(
+            f'(SELECT {i} AS "f", CAST({column} AS text) AS "value", count(*) AS "n" '
+            f"FROM {table} WHERE {column} IS NOT NULL "
+            f"GROUP BY 2 ORDER BY 3 DESC, 2 LIMIT {TOP_VALUES})"
+        )
+    return f'SELECT "f", "value", "n" FROM ({" UNION ALL ".join(branches)}) AS "top"'
+
+
+def where_clause(filters: dict[str, Any] | None) -> str:
+    """``WHERE`` clause of ``datastore_search`` equality filters, or ``""`` without any."""
+    conditions = filter_conditions(filters)
+    return f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+
+def histogram_sql(
+    resource_id: str,
+    field: str,
+    db_type: str,
+    bins: int,
+    filters: dict[str, Any] | None = None,
+) -> str | None:
+    """Build a statement counting a field's numeric values in ``bins`` equal-width bins."""
+    number = numeric_expression(field, db_type)
+    if number is None:
+        return None
+    bucket = f"floor((x - lo) * {int(bins)} / nullif(hi - lo, 0))"
+    return (
+        f"WITH v AS (SELECT {number} AS x FROM {quote_identifier(resource_id)}"
+        f"{where_clause(filters)}), "
+        f"b AS (SELECT min(x) AS lo, max(x) AS hi FROM v) "
+        f'SELECT coalesce(least({bucket}, {int(bins) - 1}), 0) AS "bucket", '
+        f'count(*) AS "n", min(lo) AS "lo", min(hi) AS "hi" '
+        f"FROM v, b WHERE x IS NOT NULL GROUP BY 1 ORDER BY 1"
+    )
+
+
+def group_sql(
+    resource_id: str,
+    x_field: str,
+    y_field: str,
+    y_db_type: str,
+    aggregate: str,
+    order: str = "value",
+    limit: int = 100,
+    filters: dict[str, Any] | None = None,
+) -> str | None:
+    """
+    Build a statement aggregating ``y_field`` per value of ``x_field``.
+
+    Rows are ordered by aggregate descending (``order="value"``) or by the
+    group key (``order="key"``).
+    """
+    if aggregate == "count":
+        value = "count(*)"
+    else:
+        number = numeric_expression(y_field, y_db_type)
+        if number is None:
+            return None
+        value = f"{AGGREGATES[aggregate]}({number})"
+    order_by = "2 DESC NULLS LAST, 1" if order == "value" else "1"
+    return (
+        f'SELECT {quote_identifier(x_field)} AS "x", {value} AS "y" '
+        f"FROM {quote_identifier(resource_id)}{where_clause(filters)} "
+        f"GROUP BY 1 ORDER BY {order_by} LIMIT {int(limit)}"
+    )
+
+
+def to_number(value: Any) -> float | None:
+    """Numeric value of a datastore value, or None if it isn't a finite number."""
+    if value is None or value == "" or isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (ValueError, TypeError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def bin_rows(low: float, high: float, counts: list[int]) -> list[dict[str, Any]]:
+    """Describe histogram counts as ``{bin_start, bin_end, count}`` rows."""
+    if high == low:
+        return [{"bin_start": low, "bin_end": high, "count": sum(counts)}]
+    width = (high - low) / len(counts)
+    return [
+        {"bin_start": low + k * width, "bin_end": low + (k + 1) * width, "count": count}
+        for k, count in enumerate(counts)
+    ]
+
+
+def histogram_bins(values: Iterable[Any], bins: int) -> list[dict[str, Any]]:
+    """Client-side equivalent of :func:`histogram_sql`."""
+    numbers = [n for n in (to_number(v) for v in values) if n is not None]
+    if not numbers:
+        return []
+    low, high = min(numbers), max(numbers)
+    counts = [0] * bins
+    for number in numbers:
+        k = int((number - low) * bins / (high - low)) if high > low else 0
+        counts[min(k, bins - 1)] += 1
+    return bin_rows(low, high, counts)
+
+
+def sort_key(value: Any) -> tuple[int, Any]:
+    """Key ordering numbers first, then text, then nulls last as in PostgreSQL's ORDER BY."""
+    number = to_number(value)
+    if number is not None:
+        return (0, number)
+    return (1, str(value)) if value is not None else (2, "")
+
+
+def group_values(
+    records: Iterable[dict[str, Any]],
+    x_field: str,
+    y_field: str,
+    aggregate: str,
+    order: str = "value",
+    limit: int = 100,
+) -> list[dict[str, Any]]:
+    """Client-side equivalent of :func:`group_sql`, returning ``{x, y}`` rows."""
+    groups: dict[Any, list[float]] = {}
+    counts: dict[Any, int] = {}
+    for record in records:
+        key = record.get(x_field)
+        counts[key] = counts.get(key, 0) + 1
+        number = to_number(record.get(y_field))
+        values = groups.setdefault(key, [])
+        if number is not None:
+            values.append(number)
+
+    def value(key: Any) -> float | None:
+        if aggregate == "count":
+            return counts[key]
+        numbers = groups[key]
+        if not numbers:
+            return None
+        if aggregate == "sum":
+            return sum(numbers)
+        if aggregate == "mean":
+            return sum(numbers) / len(numbers)
+        return min(numbers) if aggregate == "min" else max(numbers)
+
+    rows = [{"x": key, "y": value(key)} for key in sorted(counts, key=sort_key)]
+    if order == "value":
+        rows.sort(key=lambda row: (row["y"] is None, -(row["y"] or 0)))
+    return rows[:limit]
+
+
+async def run_aggregate(
+    statement: str, resource_id: str | None = None
+) -> list[dict[str, Any]] | None:
+    """Run an aggregate statement, or return None to compute the result client-side."""
+    try:
+        result = await search_sql(statement, resource_id=resource_id)
+    except CKANAPIError as e:
+        if e.status_code == SQL_FAILED_STATUS_CODE:
+            return None
+        raise
+    return None if result is None else result.get("records", [])
+
+
+async def resource_fields(resource_id: str) -> list[dict[str, Any]]:
+    """Field descriptions of a datastore resource."""
+    response = await ckan_api_call(
+        "datastore_search", params={"resource_id": resource_id, "limit": 0}
+    )
+    return response.get("result", {}).get("fields", [])
+
+
+async def fetch_columns(
+    resource_id: str, names: list[str], filters: dict[str, Any] | None = None
+) -> dict[str, Any]:
+    """Fetch the given columns of every (matching) row, for client-side aggregation."""
+    unique = list(dict.fromkeys(n for n in names if n))
+    params = {"fields": ",".join(unique), "filters": filters or None}
+    return await fetch_all_records(resource_id, params=params)
+
+
+async def profile_stats(
+    resource_id: str, fields: list[tuple[str, str, str]]
+) -> dict[str, dict[str, Any]] | None:
+    """
+    Compute ``calculate_stats`` values of every field over the whole resource in SQL.
+
+    Returns stats keyed by field name, or None when SQL can't be used.
+    """
+    rows = await run_aggregate(profile_sql(resource_id, fields), resource_id)
+    if not rows:
+        return None
+    row = rows[0]
+    total = int(row["rows"])
+    strings = {i: name for i, (name, kind, _) in enumerate(fields) if kind == "string"}
+    top: dict[int, dict[str, int]] = {i: {} for i in strings}
+    if strings and total:
+        top_rows = await run_aggregate(top_values_sql(resource_id, strings), resource_id)
+        if top_rows is None:
+            return None
+        for top_row in top_rows:
+            top[int(top_row["f"])][str(top_row["value"])] = int(top_row["n"])
+
+    stats = {}
+    for i, (name, _, _) in enumerate(fields):
+        field_stats: dict[str, Any] = {"count": total, "null_count": total - int(row[f"n{i}"])}
+        if row.get(f"min{i}") is not None:
+            field_stats.update(
+                {
+                    "min": float(row[f"min{i}"]),
+                    "max": float(row[f"max{i}"]),
+                    "mean": float(row[f"mean{i}"]),
+                }
+            )
+        elif i in strings and row[f"n{i}"]:
+            field_stats["unique_count"] = int(row[f"unique{i}"])
+            field_stats["top_values"] = top[i]
+        stats[name] = field_stats
+    return stats
+
+
+async def resource_histogram(
+    resource_id: str, field: str, bins: int, filters: dict[str, Any] | None = None
+) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+    """
+    Histogram of a field over the whole resource, or the rows matching ``filters``.
+
+    Returns the ``bin_rows`` and how they were computed: ``{"computed": "sql"}``
+    or ``{"computed": "client", "truncated": ...}``.
+    """
+    db_types = {f["id"]: f.get("type", "") for f in await resource_fields(resource_id)}
+    statement = histogram_sql(resource_id, field, db_types.get(field, ""), bins, filters)
+    rows = await run_aggregate(statement, resource_id) if statement else None
+    if rows is not None:
+        if not rows:
+            return [], {"computed": "sql"}
+        counts = [0] * bins
+        for row in rows:
+            counts[int(row["bucket"])] += int(row["n"])
+        low, high = float(rows[0]["lo"]), float(rows[0]["hi"])
+        return bin_rows(low, high, counts), {"computed": "sql"}
+
+    fetched = await fetch_columns(resource_id, [field], filters)
+    values = (record.get(field) for record in fetched["records"])
+    return histogram_bins(values, bins), {
+        "computed": "client",
+        "truncated": fetched["truncated"],
+    }
+
+
+async def resource_groups(
+    resource_id: str,
+    x_field: str,
+    y_field: str,
+    aggregate: str,
+    order: str = "value",
+    limit: int = 100,
+    filters: dict[str, Any] | None = None,
+) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+    """
+    Aggregate ``y_field`` per value of ``x_field`` over the whole resource.
+
+    Returns ``{x, y}`` rows and how they were computed, as :func:`resource_histogram`.
+    """
+    db_types = {f["id"]: f.get("type", "") for f in await resource_fields(resource_id)}
+    statement = group_sql(
+        resource_id, x_field, y_field, db_types.get(y_field, ""), aggregate, order, limit, filters
+    )
+    rows = await run_aggregate(statement, resource_id) if statement else None
+    if rows is not None:
+        values = [{"x": row["x"], "y": to_number(row["y"])} for row in rows]
+        return values, {"computed": "sql"}
+
+    fetched = await fetch_columns(resource_id, [x_field, y_field], filters)
+    values = group_values(fetched["records"], x_field, y_field, aggregate, order, limit)
+    return values, {"computed": "client", "truncated": fetched["truncated"]}
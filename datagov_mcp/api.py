@@ -1,13 +1,29 @@
-"""Centralized CKAN API helper with error handling and retry logic."""
+"""Centralized CKAN API helper with caching, error handling and retry logic."""
 
+import asyncio
+import hashlib
+from dataclasses import dataclass
 from typing import Any
 
 import httpx
 
-from datagov_mcp.client import get_http_client
+from datagov_mcp import disk_cache, json_codec, tracing
+from datagov_mcp.breaker import circuit_breakers
+from datagov_mcp.cache import CacheEntry, make_cache_key, response_cache
+from datagov_mcp.client import get_http_client, transfer_stats
+from datagov_mcp.config import env_str
+from datagov_mcp.metrics import metrics
+from datagov_mcp.retry import (
+    RETRY_AFTER_STATUS_CODES,
+    RETRYABLE_STATUS_CODES,
+    parse_retry_after,
+    retry_budget,
+    retry_policy,
+)
+from datagov_mcp.singleflight import inflight_requests
 
-# Base URL for the CKAN API
-BASE_URL = "https://data.gov.il/api/3"
+# Base URL for the CKAN API; DATAGOV_BASE_URL points the server at another CKAN instance
+BASE_URL = env_str("DATAGOV_BASE_URL", "https://data.gov.il/api/3").rstrip("/")
 
 
 class CKANAPIError(Exception):
@@ -19,20 +35,60 @@ class CKANAPIError(Exception):
         super().__init__(self.message)
 
 
+class CircuitOpenError(CKANAPIError):
+    """Raised without contacting the upstream while its circuit breaker is open."""
+
+
+@dataclass
+class UpstreamResponse:
+    """A successful upstream response and its cache validators."""
+
+    data: dict[str, Any] | None
+    size: int = 0
+    etag: str | None = None
+    last_modified: str | None = None
+    content_hash: str | None = None
+    not_modified: bool = False
+
+
+def content_hash(body: bytes) -> str:
+    """Hash a response body, to detect unchanged responses without validators."""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def _record_cache(action: str, outcome: str) -> None:
+    metrics.record_cache(action, outcome)
+    tracing.current_span().set_attribute("cache", outcome)
+
+
 async def ckan_api_call(
     action: str,
     method: str = "GET",
     params: dict[str, Any] | None = None,
     max_retries: int = 2,
+    use_cache: bool = True,
 ) -> dict[str, Any]:
     """
-    Make a CKAN API call with error handling and retry logic.
+    Make a CKAN API call with caching, error handling and retry logic.
+
+    Successful responses for cacheable actions are stored in the shared
+    response cache and returned from memory until their TTL expires. When a
+    persistent cache is configured, long-lived catalog responses are also
+    read from and written to disk, so they survive restarts.
+    Expired entries are revalidated with If-None-Match / If-Modified-Since;
+    a 304, or a body whose hash matches the cached one, renews the entry and
+    returns the same cached object, so callers can detect unchanged data by
+    identity and the body is not decoded again.
+    Concurrent identical calls are coalesced into a single upstream request
+    whose result (or error) is shared by every caller. Returned responses may
+    be shared between callers and must not be mutated.
 
     Args:
         action: CKAN action name (e.g., 'package_search')
         method: HTTP method (GET or POST)
         params: Query parameters or request body
         max_retries: Maximum number of retry attempts for transient failures
+        use_cache: Serve from and store into the response caches
 
     Returns:
         API response as a dictionary
@@ -40,51 +96,182 @@ async def ckan_api_call(
     Raises:
         CKANAPIError: If the API call fails after retries
     """
-    url = f"{BASE_URL}/action/{action}"
     params = params or {}
+    key = make_cache_key(action, method, params)
+    cacheable = use_cache and response_cache.ttl_for(action) > 0
+    store = disk_cache.persistent_cache
+    persistable = use_cache and store is not None and store.ttl_for(action) > 0
+
+    async def fetch() -> dict[str, Any]:
+        if persistable:
+            stored = await store.aget(key)
+            if stored is not None:
+                _record_cache(action, "disk_hit")
+                if cacheable:
+                    response_cache.set(key, action, stored.value, size=stored.size, ttl=stored.ttl)
+                return stored.value
+
+        stale = response_cache.peek(key) if cacheable else None
+        upstream = await _request_with_retries(action, method, params, max_retries, stale)
+        if upstream.not_modified:
+            _record_cache(action, "revalidated")
+            response_cache.renew(key)
+            return stale.value
+
+        _record_cache(action, "miss" if cacheable or persistable else "uncached")
+        data = upstream.data
+        if cacheable:
+            response_cache.set(
+                key,
+                action,
+                data,
+                size=upstream.size,
+                etag=upstream.etag,
+                last_modified=upstream.last_modified,
+                content_hash=upstream.content_hash,
+            )
+        if persistable:
+            await store.aset(key, action, data)
+        return data
+
+    # Callers bypassing the caches must not share a flight with those that
+    # read and store them.
+    flight_key = key if use_cache else f"nocache {key}"
+
+    with tracing.span("ckan_api_call", action=action), metrics.track_action(action):
+        if cacheable:
+            cached = response_cache.get(key)
+            if cached is not None:
+                _record_cache(action, "hit")
+                return cached
+        return await inflight_requests.do(flight_key, fetch)
+
+
+async def _request_with_retries(
+    action: str,
+    method: str,
+    params: dict[str, Any],
+    max_retries: int,
+    stale: CacheEntry | None = None,
+) -> UpstreamResponse:
+    """
+    Send a CKAN request, retrying transient failures.
+
+    With a ``stale`` cache entry, the request is made conditional on its
+    validators. A 304, or a 200 whose body hashes to the cached content hash,
+    yields a ``not_modified`` response without decoding the body.
+
+    Retries 429/5xx responses and network errors with jittered exponential
+    backoff, honoring Retry-After on 429/503. Every retry is drawn from the
+    process-wide retry budget; once it is exhausted the last error is raised
+    instead of adding more load to a struggling upstream.
+
+    Each attempt is guarded by the circuit breaker for the action's family.
+    5xx responses and network errors count as failures; while the breaker is
+    open, CircuitOpenError is raised immediately.
+    """
+    url = f"{BASE_URL}/action/{action}"
+    breaker = circuit_breakers.for_action(action)
+    headers = {}
+    if stale is not None:
+        if stale.etag:
+            headers["If-None-Match"] = stale.etag
+        if stale.last_modified:
+            headers["If-Modified-Since"] = stale.last_modified
+    retry_budget.record_request()
 
     last_error = None
     for attempt in range(max_retries + 1):
-        try:
-            async for client in get_http_client():
-                if method == "GET":
-                    response = await client.get(url, params=params)
-                elif method == "POST":
-                    response = await client.post(url, json=params)
-                else:
-                    raise ValueError(f"Unsupported HTTP method: {method}")
-
-                response.raise_for_status()
-                data = response.json()
-
-                # Check for CKAN-level errors
-                if not data.get("success", False):
-                    error_msg = data.get("error", {})
-                    if isinstance(error_msg, dict):
-                        error_msg = error_msg.get("message", str(error_msg))
-                    raise CKANAPIError(f"CKAN API error: {error_msg}")
-
-                return data
-
-        except httpx.HTTPStatusError as e:
-            last_error = CKANAPIError(
-                f"HTTP {e.response.status_code}: {e.response.text}",
-                status_code=e.response.status_code,
+        if not breaker.allow():
+            raise CircuitOpenError(
+                f"Circuit breaker for {breaker.name} API is open; "
+                f"retry in {breaker.retry_in():.0f}s",
+                status_code=503,
             )
-            # Retry on transient errors (5xx)
-            if e.response.status_code >= 500 and attempt < max_retries:
-                continue
-            raise last_error
 
-        except httpx.RequestError as e:
-            last_error = CKANAPIError(f"Request error: {str(e)}")
-            # Retry on network errors
-            if attempt < max_retries:
-                continue
-            raise last_error
+        retry_after = None
+        healthy = None
+        status = None
+        started = metrics.upstream_started(action)
+        with tracing.span("ckan.request", action=action, attempt=attempt) as request_span:
+            try:
+                async with get_http_client() as client:
+                    if method == "GET":
+                        response = await client.get(url, params=params, headers=headers)
+                    elif method == "POST":
+                        response = await client.post(url, json=params, headers=headers)
+                    else:
+                        raise ValueError(f"Unsupported HTTP method: {method}")
+
+                    status = response.status_code
+                    healthy = status < 500
+                    transfer_stats.record_response(action, response)
+                    if response.status_code == 304 and stale is not None:
+                        return UpstreamResponse(data=None, not_modified=True)
+                    response.raise_for_status()
 
-        except Exception as e:
-            raise CKANAPIError(f"Unexpected error: {str(e)}")
+                    body_hash = content_hash(response.content)
+                    if stale is not None and stale.content_hash == body_hash:
+                        return UpstreamResponse(data=None, not_modified=True)
+                    try:
+                        with tracing.span(
+                            "ckan.decode", action=action, bytes=len(response.content)
+                        ):
+                            data = json_codec.loads(response.content)
+                    except ValueError as e:
+                        raise CKANAPIError(
+                            f"Invalid JSON response: {str(e)}", status_code=response.status_code
+                        )
+
+                    # Check for CKAN-level errors
+                    if not data.get("success", False):
+                        error_msg = data.get("error", {})
+                        if isinstance(error_msg, dict):
+                            error_msg = error_msg.get("message", str(error_msg))
+                        raise CKANAPIError(f"CKAN API error: {error_msg}")
+
+                    return UpstreamResponse(
+                        data=data,
+                        size=len(response.content),
+                        etag=response.headers.get("ETag"),
+                        last_modified=response.headers.get("Last-Modified"),
+                        content_hash=body_hash,
+                    )
+
+            except httpx.HTTPStatusError as e:
+                status_code = e.response.status_code
+                last_error = CKANAPIError(
+                    f"HTTP {status_code}: {e.response.text}",
+                    status_code=status_code,
+                )
+                # Only throttling and transient server errors are worth retrying
+                if status_code not in RETRYABLE_STATUS_CODES:
+                    raise last_error
+                if status_code in RETRY_AFTER_STATUS_CODES:
+                    retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
+
+            except httpx.RequestError as e:
+                healthy = False
+                last_error = CKANAPIError(f"Request error: {str(e)}")
+
+            except CKANAPIError:
+                raise
+
+            except Exception as e:
+                raise CKANAPIError(f"Unexpected error: {str(e)}")
+
+            finally:
+                breaker.record(healthy)
+                metrics.upstream_finished(action, started, status)
+                if status is not None:
+                    request_span.set_attribute("http.response.status_code", status)
+
+        if attempt >= max_retries or not retry_budget.try_spend():
+            raise last_error
+        metrics.record_retry(action)
+        delay = retry_policy.delay(attempt, retry_after)
+        with tracing.span("ckan.backoff", action=action, delay=delay):
+            await asyncio.sleep(delay)
 
     # Should not reach here, but just in case
     if last_error:
@@ -0,0 +1,92 @@
+"""
+Batched metadata lookups.
+
+Fetches many packages concurrently, at most ``batch_limits.concurrency`` at a
+time. Each lookup goes through ``ckan_api_call``, so cached packages are
+served from memory and concurrent lookups of one package share a request.
+A failed lookup is reported next to the others instead of failing the batch.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any
+
+from datagov_mcp.api import CKANAPIError, ckan_api_call
+from datagov_mcp.config import env_int
+from datagov_mcp.pagination import Progress
+from datagov_mcp.resolver import resource_index
+
+
+@dataclass
+class BatchLimits:
+    """Concurrency and size caps of batched lookups."""
+
+    concurrency: int = 8
+    max_ids: int = 100
+
+
+async def show_packages(
+    ids: list[str],
+    concurrency: int = 0,
+    limits: BatchLimits | None = None,
+    progress: Progress | None = None,
+) -> dict[str, Any]:
+    """
+    Run ``package_show`` for each ID concurrently.
+
+    Duplicate and empty IDs are dropped. Packages are also indexed for
+    ``fetch_data`` (see :mod:`datagov_mcp.resolver`).
+
+    Args:
+        ids: Package names or IDs
+        concurrency: Lookups in flight at once (0 for the configured limit)
+        limits: Batch caps (defaults to ``batch_limits``)
+        progress: Called with (completed, total) as lookups finish
+
+    Returns:
+        ``results`` (package by ID) and ``errors`` (message and status code
+        by ID), each in request order
+
+    Raises:
+        CKANAPIError: With status 400 when there are more IDs than ``limits.max_ids``
+    """
+    limits = limits or batch_limits
+    unique = list(dict.fromkeys(i for i in ids if i))
+    if len(unique) > limits.max_ids:
+        raise CKANAPIError(
+            f"Too many package IDs: {len(unique)} (at most {limits.max_ids})", status_code=400
+        )
+    semaphore = asyncio.Semaphore(
+        max(1, min(concurrency or limits.concurrency, limits.concurrency))
+    )
+    completed = 0
+
+    async def show(package_id: str) -> tuple[dict[str, Any] | None, dict[str, Any] | None]:
+        nonlocal completed
+        try:
+            async with semaphore:
+                response = await ckan_api_call("package_show", params={"id": package_id})
+            package = response.get("result", {})
+            resource_index.observe(package, alias=package_id)
+            return package, None
+        except CKANAPIError as e:
+            return None, {"error": str(e.message), "status_code": e.status_code}
+        finally:
+            completed += 1
+            if progress is not None:
+                await progress(completed, len(unique))
+
+    outcomes = await asyncio.gather(*(show(package_id) for package_id in unique))
+    results, errors = {}, {}
+    for package_id, (package, error) in zip(unique, outcomes):
+        if error is None:
+            results[package_id] = package
+        else:
+            errors[package_id] = error
+    return {"results": results, "errors": errors}
+
+
+batch_limits = BatchLimits(
+    concurrency=env_int("DATAGOV_BATCH_CONCURRENCY", 8),
+    max_ids=env_int("DATAGOV_BATCH_MAX_IDS", 100),
+)
@@ -0,0 +1,176 @@
+"""Circuit breakers for the CKAN upstream, keyed by action family."""
+
+import time
+from collections import deque
+from collections.abc import Callable
+from typing import Any
+
+from datagov_mcp.config import env_bool, env_float, env_int
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def action_family(action: str) -> str:
+    """Map a CKAN action to the backend it exercises ('datastore' or 'catalog')."""
+    return "datastore" if action.startswith("datastore_") else "catalog"
+
+
+class CircuitBreaker:
+    """
+    Failure-rate circuit breaker with closed, open and half-open states.
+
+    While closed, the outcomes of the last ``window_size`` requests are kept;
+    once at least ``min_calls`` have been seen and the failure rate reaches
+    ``failure_rate_threshold`` the breaker opens. While open, requests are
+    rejected until ``open_duration`` has elapsed, after which up to
+    ``half_open_max_calls`` probe requests are let through. A successful probe
+    closes the breaker; a failed probe opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        window_size: int = 20,
+        min_calls: int = 10,
+        open_duration: float = 30.0,
+        half_open_max_calls: int = 1,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.open_duration = open_duration
+        self.half_open_max_calls = half_open_max_calls
+        self.enabled = enabled
+        self._clock = clock
+        self._outcomes: deque[bool] = deque(maxlen=window_size)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self.rejected = 0
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        """Current state, moving from open to half-open once the open period has elapsed."""
+        if self._state == OPEN and self._clock() >= self._opened_at + self.open_duration:
+            self._state = HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def allow(self) -> bool:
+        """Return True if a request may be sent now. Every allowed request must be recorded."""
+        if not self.enabled:
+            return True
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and self._probes < self.half_open_max_calls:
+            self._probes += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def record(self, success: bool | None) -> None:
+        """
+        Record the outcome of an allowed request.
+
+        ``None`` means the request finished without reaching the upstream (for
+        example it was cancelled); it only releases a half-open probe slot.
+        """
+        if not self.enabled:
+            return
+        if self._state == HALF_OPEN:
+            self._probes = max(self._probes - 1, 0)
+            if success is True:
+                self._close()
+            elif success is False:
+                self._trip()
+            return
+        if success is None or self._state == OPEN:
+            return
+        self._outcomes.append(success)
+        if len(self._outcomes) >= self.min_calls and self.failure_rate() >= (
+            self.failure_rate_threshold
+        ):
+            self._trip()
+
+    def failure_rate(self) -> float:
+        """Failure rate over the current window."""
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def retry_in(self) -> float:
+        """Seconds until an open breaker lets a probe through."""
+        if self.state != OPEN:
+            return 0.0
+        return max(self._opened_at + self.open_duration - self._clock(), 0.0)
+
+    def reset(self) -> None:
+        """Close the breaker and reset counters."""
+        self._close()
+        self.rejected = self.opened = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Return a snapshot of breaker state and counters."""
+        return {
+            "state": self.state,
+            "failure_rate": self.failure_rate(),
+            "window_calls": len(self._outcomes),
+            "rejected": self.rejected,
+            "opened": self.opened,
+        }
+
+    def _trip(self) -> None:
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._probes = 0
+        self._outcomes.clear()
+        self.opened += 1
+
+    def _close(self) -> None:
+        self._state = CLOSED
+        self._probes = 0
+        self._outcomes.clear()
+
+
+class CircuitBreakerRegistry:
+    """Lazily created circuit breakers, one per action family."""
+
+    def __init__(self, **breaker_options: Any):
+        self._options = breaker_options
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def for_action(self, action: str) -> CircuitBreaker:
+        """Return the breaker guarding an action's family."""
+        family = action_family(action)
+        breaker = self._breakers.get(family)
+        if breaker is None:
+            breaker = CircuitBreaker(family, **self._options)
+            self._breakers[family] = breaker
+        return breaker
+
+    def reset(self) -> None:
+        """Close all breakers and reset their counters."""
+        for breaker in self._breakers.values():
+            breaker.reset()
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Return a snapshot of every breaker."""
+        return {name: breaker.stats() for name, breaker in self._breakers.items()}
+
+
+# Global registry used by ckan_api_call
+circuit_breakers = CircuitBreakerRegistry(
+    failure_rate_threshold=env_float("DATAGOV_BREAKER_FAILURE_RATE", 0.5),
+    window_size=env_int("DATAGOV_BREAKER_WINDOW", 20),
+    min_calls=env_int("DATAGOV_BREAKER_MIN_CALLS", 10),
+    open_duration=env_float("DATAGOV_BREAKER_OPEN_SECONDS", 30.0),
+    half_open_max_calls=env_int("DATAGOV_BREAKER_HALF_OPEN_CALLS", 1),
+    enabled=env_bool("DATAGOV_BREAKER_ENABLED", True),
+)
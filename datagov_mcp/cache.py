@@ -0,0 +1,231 @@
+"""Bounded in-process TTL + LRU cache for CKAN API responses."""
+
+import json
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from datagov_mcp.config import env_bool, env_float, env_int
+
+# Default time-to-live (seconds) per CKAN action. Actions not listed here are
+# never cached. Catalog metadata changes rarely; search results and datastore
+# pages are kept briefly so repeated agent turns are served from memory.
+DEFAULT_TTLS: dict[str, float] = {
+    "status_show": 300.0,
+    "license_list": 3600.0,
+    "organization_list": 900.0,
+    "package_list": 900.0,
+    "organization_show": 300.0,
+    "package_show": 300.0,
+    "package_search": 60.0,
+    "resource_search": 60.0,
+    "datastore_search": 60.0,
+    "datastore_search_sql": 60.0,
+}
+
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _normalize_value(value: Any) -> Any:
+    """Normalize a GET parameter to the form it takes on the query string."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, tuple)):
+        return [_normalize_value(v) for v in value]
+    return str(value)
+
+
+def make_cache_key(action: str, method: str, params: dict[str, Any] | None) -> str:
+    """
+    Build a cache key from an action, HTTP method and request parameters.
+
+    Parameters are sorted and ``None`` values dropped. For GET requests, values
+    are converted to their query-string form so that ``rows=10`` and
+    ``rows="10"`` share an entry, as they produce the same upstream request.
+    """
+    method = method.upper()
+    items = {k: v for k, v in (params or {}).items() if v is not None}
+    if method == "GET":
+        items = {k: _normalize_value(v) for k, v in items.items()}
+    encoded = json.dumps(items, sort_keys=True, separators=(",", ":"), default=str)
+    return f"{method} {action} {encoded}"
+
+
+@dataclass
+class CacheEntry:
+    """A cached response, its validators and bookkeeping."""
+
+    action: str
+    value: dict[str, Any]
+    size: int
+    expires_at: float
+    etag: str | None = None
+    last_modified: str | None = None
+    content_hash: str | None = None
+
+
+class ResponseCache:
+    """
+    TTL + LRU cache for CKAN responses, bounded by entry count and total bytes.
+
+    Expired entries are not served but are kept (until evicted) together with
+    their validators, so they can be revalidated upstream and renewed instead
+    of re-downloaded. Cached values are shared between callers and must be
+    treated as read-only.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttls: dict[str, float] | None = None,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.enabled = enabled
+        self._clock = clock
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.renewals = 0
+
+    def ttl_for(self, action: str) -> float:
+        """Return the TTL for an action, or 0 if it should not be cached."""
+        if not self.enabled:
+            return 0.0
+        return self.ttls.get(action, 0.0)
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """Return a fresh cached value, or None on a miss."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= self._clock():
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def peek(self, key: str) -> CacheEntry | None:
+        """Return an entry, fresh or expired, without touching counters or LRU order."""
+        return self._entries.get(key)
+
+    def set(
+        self,
+        key: str,
+        action: str,
+        value: dict[str, Any],
+        size: int,
+        ttl: float | None = None,
+        etag: str | None = None,
+        last_modified: str | None = None,
+        content_hash: str | None = None,
+    ) -> None:
+        """
+        Store a value if its action is cacheable and it fits in the byte budget.
+
+        ``ttl`` shortens the action's TTL, e.g. for a value loaded from a
+        longer-lived cache tier; it never extends it. ``etag``,
+        ``last_modified`` and ``content_hash`` are kept for revalidation.
+        """
+        ttl = self.ttl_for(action) if ttl is None else min(ttl, self.ttl_for(action))
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = CacheEntry(
+            action=action,
+            value=value,
+            size=size,
+            expires_at=self._clock() + ttl,
+            etag=etag,
+            last_modified=last_modified,
+            content_hash=content_hash,
+        )
+        self._bytes += size
+        self._evict()
+
+    def renew(self, key: str) -> dict[str, Any] | None:
+        """Restart an entry's TTL after the upstream confirmed it is unchanged."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        entry.expires_at = self._clock() + self.ttl_for(entry.action)
+        self._entries.move_to_end(key)
+        self.renewals += 1
+        return entry.value
+
+    def invalidate(self, action: str | None = None) -> None:
+        """Drop all entries, or only those for one action."""
+        if action is None:
+            self._entries.clear()
+            self._bytes = 0
+            return
+        for key in [k for k, e in self._entries.items() if e.action == action]:
+            self._remove(key)
+
+    def clear(self) -> None:
+        """Drop all entries and reset counters."""
+        self.invalidate()
+        self.hits = self.misses = self.evictions = self.expirations = self.renewals = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Return a snapshot of cache counters and occupancy."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "renewals": self.renewals,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _evict(self) -> None:
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+
+def _load_ttls() -> dict[str, float]:
+    """Apply ``DATAGOV_CACHE_TTL_<ACTION>`` overrides to the default TTLs."""
+    ttls = dict(DEFAULT_TTLS)
+    for action, default in DEFAULT_TTLS.items():
+        ttls[action] = env_float(f"DATAGOV_CACHE_TTL_{action.upper()}", default)
+    return ttls
+
+
+# Global cache instance used by ckan_api_call
+response_cache = ResponseCache(
+    max_entries=env_int("DATAGOV_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES),
+    max_bytes=env_int("DATAGOV_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES),
+    ttls=_load_ttls(),
+    enabled=env_bool("DATAGOV_CACHE_ENABLED", True),
+)
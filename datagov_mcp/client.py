@@ -1,50 +1,325 @@
 """HTTP client lifecycle management for CKAN API requests."""
 
+import asyncio
+import importlib.util
+import logging
+from collections import Counter
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any
 
 import httpx
 
+from datagov_mcp.config import env_bool, env_float, env_int, env_str
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HTTPClientConfig:
+    """Connection pool, protocol and timeout settings for the upstream HTTP client."""
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+    connect_timeout: float = 10.0
+    read_timeout: float = 30.0
+    write_timeout: float = 30.0
+    pool_timeout: float = 10.0
+    prewarm_connections: int = 2
+    refresh_interval: float = 900.0
+    accept_encoding: str = ""  # empty: negotiate every encoding that can be decoded
+
+    @classmethod
+    def from_env(cls) -> "HTTPClientConfig":
+        """Build a config from ``DATAGOV_HTTP_*`` environment variables."""
+        defaults = cls()
+        return cls(
+            max_connections=env_int("DATAGOV_HTTP_MAX_CONNECTIONS", defaults.max_connections),
+            max_keepalive_connections=env_int(
+                "DATAGOV_HTTP_MAX_KEEPALIVE", defaults.max_keepalive_connections
+            ),
+            keepalive_expiry=env_float("DATAGOV_HTTP_KEEPALIVE_EXPIRY", defaults.keepalive_expiry),
+            http2=env_bool("DATAGOV_HTTP2", defaults.http2),
+            connect_timeout=env_float("DATAGOV_HTTP_CONNECT_TIMEOUT", defaults.connect_timeout),
+            read_timeout=env_float("DATAGOV_HTTP_READ_TIMEOUT", defaults.read_timeout),
+            write_timeout=env_float("DATAGOV_HTTP_WRITE_TIMEOUT", defaults.write_timeout),
+            pool_timeout=env_float("DATAGOV_HTTP_POOL_TIMEOUT", defaults.pool_timeout),
+            prewarm_connections=env_int(
+                "DATAGOV_HTTP_PREWARM_CONNECTIONS", defaults.prewarm_connections
+            ),
+            refresh_interval=env_float("DATAGOV_HTTP_REFRESH_INTERVAL", defaults.refresh_interval),
+            accept_encoding=env_str("DATAGOV_HTTP_ACCEPT_ENCODING", defaults.accept_encoding),
+        )
+
+    def limits(self) -> httpx.Limits:
+        """Connection pool limits."""
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def timeout(self) -> httpx.Timeout:
+        """Per-phase request timeouts."""
+        return httpx.Timeout(
+            connect=self.connect_timeout,
+            read=self.read_timeout,
+            write=self.write_timeout,
+            pool=self.pool_timeout,
+        )
+
+
+def http2_available() -> bool:
+    """Return True if the optional ``h2`` package needed for HTTP/2 is installed."""
+    return importlib.util.find_spec("h2") is not None
+
+
+# Optional packages httpx decodes each content coding with (any one will do)
+OPTIONAL_DECODERS = {"zstd": ("zstandard",), "br": ("brotli", "brotlicffi")}
 
-class HTTPClient:
-    """Manages httpx.AsyncClient lifecycle for the MCP server."""
+
+def supported_encodings() -> list[str]:
+    """
+    Return the content codings responses can be decoded from, best first.
+
+    gzip and deflate are always available. zstd and brotli are offered only
+    when the optional ``zstandard`` and ``brotli`` (or ``brotlicffi``)
+    packages httpx decodes them with are installed.
+    """
+    return [
+        encoding
+        for encoding in ("zstd", "br", "gzip", "deflate")
+        if encoding not in OPTIONAL_DECODERS
+        or any(importlib.util.find_spec(m) is not None for m in OPTIONAL_DECODERS[encoding])
+    ]
+
+
+class TransferStats:
+    """
+    Per-action counters of bytes received on the wire and after decompression.
+
+    ``compressed_bytes`` is what the upstream sent (and what egress is billed
+    on); ``decompressed_bytes`` is the decoded body size.
+    """
 
     def __init__(self):
+        self._actions: dict[str, dict[str, Any]] = {}
+
+    def record(self, action: str, encoding: str, compressed: int, decompressed: int) -> None:
+        """Count one response for an action."""
+        counters = self._actions.get(action)
+        if counters is None:
+            counters = self._actions[action] = {
+                "responses": 0,
+                "compressed_bytes": 0,
+                "decompressed_bytes": 0,
+                "encodings": {},
+            }
+        counters["responses"] += 1
+        counters["compressed_bytes"] += compressed
+        counters["decompressed_bytes"] += decompressed
+        encoding = encoding or "identity"
+        counters["encodings"][encoding] = counters["encodings"].get(encoding, 0) + 1
+
+    def record_response(self, action: str, response: httpx.Response) -> None:
+        """Count a fully read response."""
+        self.record(
+            action,
+            response.headers.get("Content-Encoding", "identity"),
+            response.num_bytes_downloaded,
+            len(response.content),
+        )
+
+    def reset(self) -> None:
+        """Drop all counters."""
+        self._actions.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Return per-action counters with compression ratios, plus totals."""
+        actions = {}
+        total_compressed = total_decompressed = 0
+        for action, counters in sorted(self._actions.items()):
+            compressed = counters["compressed_bytes"]
+            decompressed = counters["decompressed_bytes"]
+            total_compressed += compressed
+            total_decompressed += decompressed
+            actions[action] = {
+                **counters,
+                "encodings": dict(counters["encodings"]),
+                "compression_ratio": decompressed / compressed if compressed else None,
+            }
+        return {
+            "compressed_bytes": total_compressed,
+            "decompressed_bytes": total_decompressed,
+            "actions": actions,
+        }
+
+
+class HTTPClient:
+    """
+    Manages httpx.AsyncClient lifecycle for the MCP server.
+
+    The client is created lazily on first use. When the server runs,
+    ``start()`` creates it up front, opens keepalive connections in the
+    background ahead of the first tool call and periodically replaces it with
+    a fresh client, and ``close()`` shuts it down.
+    """
+
+    def __init__(self, config: HTTPClientConfig | None = None):
+        self.config = config or HTTPClientConfig()
         self._client: httpx.AsyncClient | None = None
+        self._prewarm_task: asyncio.Task | None = None
+        self._refresh_task: asyncio.Task | None = None
+        # Requests in progress per client, and replaced clients waiting for theirs
+        self._uses: Counter[httpx.AsyncClient] = Counter()
+        self._retired: set[httpx.AsyncClient] = set()
+
+    def _build_client(self) -> httpx.AsyncClient:
+        http2 = self.config.http2
+        if http2 and not http2_available():
+            logger.warning(
+                "HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1. "
+                "Install with: pip install 'datagov-mcp[http2]'"
+            )
+            http2 = False
+        return httpx.AsyncClient(
+            timeout=self.config.timeout(),
+            limits=self.config.limits(),
+            http2=http2,
+            headers={
+                "User-Agent": "DataGovIL-MCP/0.3.0",
+                "Accept-Encoding": self.config.accept_encoding or ", ".join(supported_encodings()),
+            },
+            follow_redirects=True,
+        )
 
     @asynccontextmanager
     async def get_client(self) -> AsyncIterator[httpx.AsyncClient]:
         """Get or create an async HTTP client."""
         if self._client is None:
-            self._client = httpx.AsyncClient(
-                timeout=httpx.Timeout(30.0),
-                headers={
-                    "User-Agent": "DataGovIL-MCP/0.3.0",
-                },
-                follow_redirects=True,
-            )
+            self._client = self._build_client()
+        client = self._client
+        self._uses[client] += 1
         try:
-            yield self._client
+            yield client
         finally:
-            pass  # Don't close on each use, let lifecycle manage it
+            # Don't close on each use, let lifecycle manage it; a replaced
+            # client is closed once its last request is done
+            self._uses[client] -= 1
+            if not self._uses[client]:
+                del self._uses[client]
+                if client in self._retired:
+                    self._retired.discard(client)
+                    await client.aclose()
+
+    async def start(self, prewarm_url: str | None = None) -> None:
+        """
+        Create the client, start prewarming its pool and schedule periodic refreshes.
+
+        Prewarming runs in a background task, so a slow upstream doesn't delay
+        the server becoming ready.
+        """
+        if self._client is None:
+            self._client = self._build_client()
+        if prewarm_url and self._prewarm_task is None:
+            self._prewarm_task = asyncio.create_task(self.prewarm(prewarm_url))
+        if self.config.refresh_interval > 0 and self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop(prewarm_url))
+
+    async def prewarm(self, url: str, connections: int | None = None) -> int:
+        """
+        Open keepalive connections by sending concurrent requests to ``url``.
+
+        Failures are logged and ignored: prewarming only saves the DNS, TCP and
+        TLS setup cost of the first tool calls. Returns the number of requests
+        that succeeded.
+        """
+        count = self.config.prewarm_connections if connections is None else connections
+        count = min(count, self.config.max_keepalive_connections)
+        if count <= 0:
+            return 0
+        async with self.get_client() as client:
+            results = await asyncio.gather(
+                *(client.get(url) for _ in range(count)), return_exceptions=True
+            )
+        failures = [r for r in results if isinstance(r, BaseException)]
+        if failures:
+            logger.warning(
+                "Prewarming %d of %d connections failed: %s", len(failures), count, failures[0]
+            )
+        return count - len(failures)
+
+    async def refresh(self, prewarm_url: str | None = None) -> None:
+        """
+        Swap in a fresh client, closing the old one once in-flight requests finish.
+
+        Requests, including streamed responses, hold the client they started
+        on until they are done, however long that takes.
+        """
+        old, self._client = self._client, self._build_client()
+        if prewarm_url:
+            await self.prewarm(prewarm_url)
+        if old is not None:
+            if self._uses[old]:
+                self._retired.add(old)
+            else:
+                await old.aclose()
+
+    async def configure(self, config: HTTPClientConfig) -> None:
+        """Apply new settings, closing the current client so the next request uses them."""
+        await self.close()
+        self.config = config
 
     async def close(self):
-        """Close the HTTP client."""
+        """Stop prewarming and refreshing and close the HTTP client."""
+        for task in (self._prewarm_task, self._refresh_task):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self._prewarm_task = self._refresh_task = None
+        for client in list(self._retired):
+            await client.aclose()
+        self._retired.clear()
         if self._client is not None:
             await self._client.aclose()
             self._client = None
 
+    async def _refresh_loop(self, prewarm_url: str | None) -> None:
+        while True:
+            await asyncio.sleep(self.config.refresh_interval)
+            try:
+                await self.refresh(prewarm_url)
+            except Exception:
+                logger.exception("Failed to refresh HTTP client")
+
 
 # Global client instance
-_http_client = HTTPClient()
+_http_client = HTTPClient(HTTPClientConfig.from_env())
 
+# Global byte counters for upstream responses
+transfer_stats = TransferStats()
 
+
+@asynccontextmanager
 async def get_http_client() -> AsyncIterator[httpx.AsyncClient]:
     """Get the global HTTP client."""
     async with _http_client.get_client() as client:
         yield client
 
 
+async def start_http_client(prewarm_url: str | None = None) -> None:
+    """Start the global HTTP client: create, prewarm in the background and schedule refreshes."""
+    await _http_client.start(prewarm_url)
+
+
+async def configure_http_client(config: HTTPClientConfig) -> None:
+    """Replace the settings of the global HTTP client."""
+    await _http_client.configure(config)
+
+
 async def cleanup_http_client():
     """Cleanup the global HTTP client."""
     await _http_client.close()
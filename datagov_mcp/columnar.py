@@ -0,0 +1,537 @@
+"""Optional local column store of datastore resources, refreshed incrementally.
+
+Resources read by the visualization tools are materialized on disk, one
+directory per resource and one file per column: fixed-width ``array`` data
+for integer and float columns, and an offsets array plus a UTF-8 blob for
+text. Reads memory-map only the columns a tool uses, and repeated calls cost
+no network round trips.
+
+A stored resource is checked at most every ``refresh_interval`` seconds. If
+its ``last_modified`` (from ``resource_show``) changed, rows past the stored
+``_id`` high-water mark are fetched and appended. When the upstream row count
+shows that rows were changed or deleted rather than appended, the resource is
+fetched again in full.
+"""
+
+import array
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+import re
+import shutil
+import sys
+import time
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from datagov_mcp import json_codec
+from datagov_mcp.api import CKANAPIError, ckan_api_call
+from datagov_mcp.config import env_float, env_int, env_str
+from datagov_mcp.pagination import (
+    KEYSET_FIELD,
+    encode_cursor,
+    fetch_all_records,
+    sql_support,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+DEFAULT_REFRESH_INTERVAL = 300.0
+
+MANIFEST = "manifest.json"
+# Read timestamps, kept apart from the manifest so a stored version never changes
+ACCESS = "access.json"
+FORMAT_VERSION = 1
+
+# Times to retry swapping a directory in when other processes keep replacing it
+SWAP_ATTEMPTS = 3
+
+# array typecodes of fixed-width column kinds
+TYPECODES = {"int": "q", "float": "d"}
+INT64_MIN, INT64_MAX = -(2**63), 2**63 - 1
+
+
+def column_kind(values: list[Any]) -> str | None:
+    """
+    Storage kind for a column's values, or None if they are all null.
+
+    ``int`` and ``float`` are stored as fixed-width arrays, ``text`` as UTF-8,
+    and anything else (mixed types, booleans, objects) as JSON text.
+    """
+    kind = None
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            return "json"
+        if isinstance(value, int) and INT64_MIN <= value <= INT64_MAX:
+            current = "int"
+        elif isinstance(value, (int, float)):
+            current = "float" if isinstance(value, float) else "json"
+        elif isinstance(value, str):
+            current = "text"
+        else:
+            return "json"
+        if kind is None or kind == current:
+            kind = current
+        elif {kind, current} == {"int", "float"}:
+            kind = "float"
+        else:
+            return "json"
+    return kind
+
+
+def merge_kinds(stored: str | None, new: str | None) -> str | None:
+    """Kind able to hold values of both kinds."""
+    if stored is None or new is None or stored == new:
+        return stored or new
+    if {stored, new} == {"int", "float"}:
+        return "float"
+    return "json"
+
+
+def _encode(values: list[Any], kind: str | None, base: int = 0) -> dict[str, bytes]:
+    """Encode values as the contents of a column's ``valid``, ``data`` and ``offsets`` files."""
+    valid = bytes(value is not None for value in values)
+    if kind in TYPECODES:
+        data = array.array(TYPECODES[kind], (0 if v is None else v for v in values))
+        return {"valid": valid, "data": data.tobytes()}
+    blob = bytearray()
+    ends = array.array("q")
+    for value in values:
+        if value is not None:
+            blob += (value if kind == "text" else json_codec.dumps(value)).encode()
+        ends.append(base + len(blob))
+    return {"valid": valid, "data": bytes(blob), "offsets": ends.tobytes()}
+
+
+def _mapped(path: Path) -> mmap.mmap | None:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+@dataclass
+class StoredTable:
+    """A resource materialized in the column store."""
+
+    resource_id: str
+    directory: Path
+    manifest: dict[str, Any]
+
+    @property
+    def fields(self) -> list[dict[str, Any]]:
+        return self.manifest["fields"]
+
+    @property
+    def columns(self) -> list[str]:
+        return self.manifest["columns"]
+
+    @property
+    def rows(self) -> int:
+        return self.manifest["rows"]
+
+    @property
+    def truncated(self) -> str | None:
+        """Why the stored copy is incomplete (``"max_rows"``/``"max_bytes"``), or None."""
+        return self.manifest.get("truncated")
+
+    def column(self, name: str, limit: int | None = None) -> list[Any]:
+        """Values of one column, in ``_id`` order, read through a memory map."""
+        index = self.columns.index(name)
+        kind = self.manifest["kinds"][index]
+        rows = self.rows if limit is None else min(limit, self.rows)
+        if rows == 0:
+            return []
+        prefix = self.directory / str(index)
+        valid = _mapped(prefix.with_suffix(".valid"))
+        data = _mapped(prefix.with_suffix(".data"))
+        blob = data if data is not None else b""  # empty when every value is null or ""
+        try:
+            flags = valid[:rows]
+            if kind is None:
+                return [None] * rows
+            if kind in TYPECODES:
+                with memoryview(data) as raw, raw.cast(TYPECODES[kind]) as typed:
+                    values = typed[:rows].tolist()
+                return [v if ok else None for v, ok in zip(values, flags)]
+
+            offsets = _mapped(prefix.with_suffix(".offsets"))
+            try:
+                with memoryview(offsets) as raw, raw.cast("q") as typed:
+                    ends = typed[:rows].tolist()
+            finally:
+                offsets.close()
+            decode = bytes.decode if kind == "text" else _decode_json
+            values = []
+            start = 0
+            for end, ok in zip(ends, flags):
+                values.append(decode(blob[start:end]) if ok else None)
+                start = end
+            return values
+        finally:
+            valid.close()
+            if data is not None:
+                data.close()
+
+    def records(self, names: list[str] | None = None, limit: int | None = None) -> list[dict]:
+        """Rows as dicts of the given columns (default: all), in ``_id`` order."""
+        names = [n for n in names or self.columns if n in self.columns]
+        columns = [self.column(name, limit) for name in names]
+        return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def _decode_json(raw: bytes) -> Any:
+    return json_codec.loads(raw)
+
+
+class ColumnStore:
+    """
+    Directory of materialized resources with size-bounded eviction.
+
+    ``table`` returns a resource's stored copy, filling it on first access
+    and refreshing it incrementally afterwards. When stored data exceeds
+    ``max_bytes``, the least recently read resources are deleted. Files are
+    written in a worker thread. Fills and appends both build a complete copy
+    in a staging directory and rename it into place, and a directory's column
+    files and manifest never change afterwards (read times go to a separate
+    file), so several processes can share the store: each sees one whole
+    version of a resource, and the last one to finish a refresh wins.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.refresh_interval = refresh_interval
+        self._clock = clock
+        self._locks: dict[str, asyncio.Lock] = {}
+        self.fills = 0
+        self.appends = 0
+        self.hits = 0
+
+    def directory(self, resource_id: str) -> Path:
+        """Directory holding a resource's columns."""
+        safe = re.sub(r"[^A-Za-z0-9_-]", "_", resource_id)[:64]
+        digest = hashlib.sha1(resource_id.encode()).hexdigest()[:10]
+        return self.path / f"{safe}-{digest}"
+
+    async def table(self, resource_id: str) -> StoredTable:
+        """Return a resource's stored copy, filling or refreshing it as needed."""
+        lock = self._locks.setdefault(resource_id, asyncio.Lock())
+        async with lock:
+            stored = await asyncio.to_thread(self.load, resource_id)
+            now = self._clock()
+            if stored is not None and now - stored.manifest["checked_at"] < self.refresh_interval:
+                self.hits += 1
+                await asyncio.to_thread(self._touch, stored, checked=False)
+                return stored
+
+            last_modified = await _last_modified(resource_id)
+            if stored is None:
+                return await self._fill(resource_id, last_modified)
+            if stored.truncated is None and last_modified is not None:
+                if last_modified == stored.manifest["last_modified"]:
+                    self.hits += 1
+                    await asyncio.to_thread(self._touch, stored, checked=True)
+                    return stored
+            return await self._refresh(stored, last_modified)
+
+    def load(self, resource_id: str) -> StoredTable | None:
+        """Read a resource's manifest, or None if it isn't stored (or is unreadable)."""
+        directory = self.directory(resource_id)
+        try:
+            manifest = _read_manifest(directory)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable column store entry %s: %s", directory, e)
+            return None
+        if manifest.get("version") != FORMAT_VERSION or manifest.get("byteorder") != sys.byteorder:
+            return None
+        return StoredTable(resource_id, directory, manifest)
+
+    def stats(self) -> dict[str, Any]:
+        """Stored resources and bytes, and fill/append/hit counters."""
+        manifests = self._manifests()
+        return {
+            "path": str(self.path),
+            "resources": len(manifests),
+            "bytes": sum(m["bytes"] for _, m in manifests),
+            "max_bytes": self.max_bytes,
+            "fills": self.fills,
+            "appends": self.appends,
+            "hits": self.hits,
+        }
+
+    async def _fill(self, resource_id: str, last_modified: str | None) -> StoredTable:
+        fetched = await fetch_all_records(resource_id, use_cache=False)
+        self.fills += 1
+        return await asyncio.to_thread(self._write, resource_id, fetched, last_modified)
+
+    async def _refresh(self, stored: StoredTable, last_modified: str | None) -> StoredTable:
+        resource_id = stored.resource_id
+        response = await ckan_api_call(
+            "datastore_search", params={"resource_id": resource_id, "limit": 0}, use_cache=False
+        )
+        result = response.get("result", {})
+        total = result.get("total")
+        same_fields = [f.get("id") for f in result.get("fields", [])] == [
+            f.get("id") for f in stored.fields
+        ]
+        if not same_fields or total is None or total < stored.rows:
+            return await self._fill(resource_id, last_modified)
+
+        fetched = await self._fetch_after(stored)
+        rows = stored.rows + fetched["returned"]
+        changed = last_modified != stored.manifest["last_modified"]
+        # Rows appended past the high-water mark explain the change only when
+        # they account for every new row; anything else is an in-place update
+        appended = fetched["returned"] > 0 or stored.truncated is not None or not changed
+        if not appended or rows > total or (rows < total and fetched["truncated"] is None):
+            return await self._fill(resource_id, last_modified)
+        self.appends += 1
+        return await asyncio.to_thread(self._append, stored, fetched, last_modified)
+
+    async def _fetch_after(self, stored: StoredTable) -> dict[str, Any]:
+        """Fetch the rows past the stored high-water mark."""
+        resource_id = stored.resource_id
+        if sql_support.usable(resource_id):
+            cursor = encode_cursor({"after": stored.manifest["high_water"]})
+            try:
+                return await fetch_all_records(resource_id, cursor=cursor, use_cache=False)
+            except CKANAPIError:
+                if sql_support.usable(resource_id):
+                    raise
+        # Without keyset paging, rows past the stored count are the new ones
+        return await fetch_all_records(resource_id, offset=stored.rows, use_cache=False)
+
+    def _write(
+        self, resource_id: str, fetched: dict[str, Any], last_modified: str | None
+    ) -> StoredTable:
+        records = fetched["records"]
+        names = [f["id"] for f in fetched["fields"]]
+        staging = self.path / f".staging-{uuid.uuid4().hex}"
+        staging.mkdir(parents=True)
+        kinds = []
+        sizes = []
+        for index, name in enumerate(names):
+            values = [record.get(name) for record in records]
+            kind = column_kind(values)
+            kinds.append(kind)
+            files = _encode(values, kind)
+            for suffix, content in files.items():
+                (staging / f"{index}.{suffix}").write_bytes(content)
+            sizes.append(len(files["data"]))
+        manifest = self._manifest(fetched["fields"], kinds, sizes, len(records), records)
+        manifest.update(last_modified=last_modified, truncated=fetched["truncated"])
+        self._write_manifest(staging, manifest)
+        return self._swap(resource_id, staging, manifest)
+
+    def _append(
+        self, stored: StoredTable, fetched: dict[str, Any], last_modified: str | None
+    ) -> StoredTable:
+        manifest = dict(stored.manifest)
+        records = fetched["records"]
+        kinds = list(manifest["kinds"])
+        sizes = list(manifest["sizes"])
+        # Append to a copy, so the stored version stays whole until the swap
+        staging = self.path / f".staging-{uuid.uuid4().hex}"
+        shutil.copytree(
+            stored.directory, staging, ignore=shutil.ignore_patterns(f"{MANIFEST}*", f"{ACCESS}*")
+        )
+        for index, name in enumerate(manifest["columns"]):
+            values = [record.get(name) for record in records]
+            stored_kind = kinds[index]
+            kind = merge_kinds(stored_kind, column_kind(values))
+            prefix = staging / str(index)
+            if kind != stored_kind and (stored_kind is not None or kind in TYPECODES):
+                # The encoding changed (e.g. int widened to float): rewrite the column
+                files = _encode(stored.column(name) + values, kind)
+                for suffix in ("valid", "data", "offsets"):
+                    prefix.with_suffix(f".{suffix}").unlink(missing_ok=True)
+                for suffix, content in files.items():
+                    prefix.with_suffix(f".{suffix}").write_bytes(content)
+                sizes[index] = len(files["data"])
+            else:
+                files = _encode(values, kind, base=sizes[index])
+                expected = {"valid": stored.rows, "data": sizes[index], "offsets": stored.rows * 8}
+                for suffix, content in files.items():
+                    path = prefix.with_suffix(f".{suffix}")
+                    # Drop bytes past the manifest that older versions may have left
+                    _truncate(path, expected[suffix])
+                    with open(path, "ab") as f:
+                        f.write(content)
+                sizes[index] += len(files["data"])
+            kinds[index] = kind
+
+        rows = stored.rows + len(records)
+        high_water = manifest["high_water"]
+        if records:
+            high_water = records[-1].get(KEYSET_FIELD, high_water)
+        manifest.update(kinds=kinds, sizes=sizes, rows=rows, high_water=high_water)
+        manifest.update(
+            last_modified=last_modified,
+            truncated=fetched["truncated"],
+            bytes=_directory_bytes(staging),
+            checked_at=self._clock(),
+            accessed_at=self._clock(),
+        )
+        self._write_manifest(staging, manifest)
+        return self._swap(stored.resource_id, staging, manifest)
+
+    def _swap(self, resource_id: str, staging: Path, manifest: dict[str, Any]) -> StoredTable:
+        """
+        Rename a complete staging directory over a resource's current version.
+
+        Another process may swap in its own version between retiring the
+        current one and the rename; that version is retired in turn. If the
+        rename keeps losing, the other process's version is kept instead.
+        """
+        directory = self.directory(resource_id)
+        for _ in range(SWAP_ATTEMPTS):
+            retired = self.path / f".retired-{uuid.uuid4().hex}"
+            try:
+                directory.rename(retired)
+            except FileNotFoundError:
+                retired = None
+            try:
+                staging.rename(directory)
+            except OSError:
+                continue
+            finally:
+                if retired is not None:
+                    shutil.rmtree(retired, ignore_errors=True)
+            self._evict(keep=directory)
+            return StoredTable(resource_id, directory, manifest)
+
+        shutil.rmtree(staging, ignore_errors=True)
+        stored = self.load(resource_id)
+        if stored is None:
+            raise OSError(f"Could not store resource {resource_id} in {directory}")
+        return stored
+
+    def _manifest(
+        self,
+        fields: list[dict[str, Any]],
+        kinds: list[str | None],
+        sizes: list[int],
+        rows: int,
+        records: list[dict[str, Any]],
+    ) -> dict[str, Any]:
+        now = self._clock()
+        return {
+            "version": FORMAT_VERSION,
+            "byteorder": sys.byteorder,
+            "fields": fields,
+            "columns": [f["id"] for f in fields],
+            "kinds": kinds,
+            "sizes": sizes,
+            "rows": rows,
+            "high_water": records[-1].get(KEYSET_FIELD, rows) if records else 0,
+            "bytes": 0,
+            "checked_at": now,
+            "accessed_at": now,
+        }
+
+    def _write_manifest(self, directory: Path, manifest: dict[str, Any]) -> None:
+        if not manifest["bytes"]:
+            manifest["bytes"] = _directory_bytes(directory)
+        _write_json(directory / MANIFEST, manifest)
+
+    def _touch(self, table: StoredTable, checked: bool) -> None:
+        now = self._clock()
+        table.manifest["accessed_at"] = now
+        if checked:
+            table.manifest["checked_at"] = now
+        access = {key: table.manifest[key] for key in ("accessed_at", "checked_at")}
+        try:
+            _write_json(table.directory / ACCESS, access)
+        except OSError as e:
+            logger.warning("Failed to update column store access times: %s", e)
+
+    def _manifests(self) -> list[tuple[Path, dict[str, Any]]]:
+        manifests = []
+        if not self.path.exists():
+            return manifests
+        for directory in self.path.iterdir():
+            if directory.name.startswith("."):  # being written or removed
+                continue
+            try:
+                manifests.append((directory, _read_manifest(directory)))
+            except (OSError, ValueError):
+                continue
+        return manifests
+
+    def _evict(self, keep: Path) -> None:
+        manifests = sorted(self._manifests(), key=lambda item: item[1].get("accessed_at", 0))
+        total = sum(m.get("bytes", 0) for _, m in manifests)
+        for directory, manifest in manifests:
+            if total <= self.max_bytes:
+                break
+            if directory == keep:
+                continue
+            shutil.rmtree(directory, ignore_errors=True)
+            total -= manifest.get("bytes", 0)
+
+
+def _truncate(path: Path, size: int) -> None:
+    if path.exists() and path.stat().st_size > size:
+        os.truncate(path, size)
+
+
+def _directory_bytes(directory: Path) -> int:
+    return sum(
+        p.stat().st_size for p in directory.iterdir() if not p.name.startswith((MANIFEST, ACCESS))
+    )
+
+
+def _read_manifest(directory: Path) -> dict[str, Any]:
+    """A stored version's manifest, with its latest read times."""
+    manifest = json_codec.loads((directory / MANIFEST).read_bytes())
+    try:
+        manifest.update(json_codec.loads((directory / ACCESS).read_bytes()))
+    except (OSError, ValueError):
+        pass
+    return manifest
+
+
+def _write_json(path: Path, value: Any) -> None:
+    """Replace a file atomically with a JSON document."""
+    temporary = path.with_name(f"{path.name}.{uuid.uuid4().hex}")
+    temporary.write_bytes(json_codec.dumps_bytes(value))
+    os.replace(temporary, path)
+
+
+async def _last_modified(resource_id: str) -> str | None:
+    """The resource's ``last_modified`` (or ``metadata_modified``) from ``resource_show``."""
+    response = await ckan_api_call("resource_show", params={"id": resource_id})
+    resource = response.get("result", {})
+    return resource.get("last_modified") or resource.get("metadata_modified")
+
+
+def _from_env() -> ColumnStore | None:
+    path = env_str("DATAGOV_COLUMN_STORE_PATH")
+    if not path:
+        return None
+    return ColumnStore(
+        Path(path).expanduser(),
+        max_bytes=env_int("DATAGOV_COLUMN_STORE_MAX_BYTES", DEFAULT_MAX_BYTES),
+        refresh_interval=env_float("DATAGOV_COLUMN_STORE_REFRESH", DEFAULT_REFRESH_INTERVAL),
+    )
+
+
+# Global column store read by the visualization tools; None unless DATAGOV_COLUMN_STORE_PATH is set
+column_store = _from_env()
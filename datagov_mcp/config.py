@@ -0,0 +1,43 @@
+"""Environment-driven configuration helpers.
+
+Every tunable in the server can be set through a ``DATAGOV_*`` environment
+variable. Invalid values fall back to the documented default rather than
+preventing the server from starting.
+"""
+
+import os
+
+
+def env_str(name: str, default: str = "") -> str:
+    """Read a string setting from the environment."""
+    value = os.environ.get(name)
+    return value.strip() if value is not None else default
+
+
+def env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment."""
+    try:
+        return int(os.environ[name])
+    except (KeyError, ValueError):
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    """Read a float setting from the environment."""
+    try:
+        return float(os.environ[name])
+    except (KeyError, ValueError):
+        return default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """Read a boolean setting from the environment (1/0, true/false, yes/no, on/off)."""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    value = value.strip().lower()
+    if value in ("1", "true", "yes", "on"):
+        return True
+    if value in ("0", "false", "no", "off"):
+        return False
+    return default
@@ -0,0 +1,224 @@
+"""Optional persistent (SQLite) cache for CKAN API responses.
+
+Responses are stored as zlib-compressed JSON in a single SQLite file, so
+cached catalog metadata survives process restarts. The database runs in WAL
+mode with a busy timeout, which makes it safe to share between several worker
+processes on one machine.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from datagov_mcp import json_codec
+from datagov_mcp.config import env_float, env_int, env_str
+
+logger = logging.getLogger(__name__)
+
+# Default time-to-live (seconds) per action. Only large, slowly changing
+# catalog responses are persisted; search results and datastore pages stay in
+# the in-process cache only.
+DEFAULT_DISK_TTLS: dict[str, float] = {
+    "status_show": 3600.0,
+    "license_list": 86400.0,
+    "organization_list": 21600.0,
+    "package_list": 21600.0,
+    "organization_show": 3600.0,
+    "package_show": 3600.0,
+}
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    action TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+"""
+
+
+@dataclass
+class StoredResponse:
+    """A response read back from the persistent cache."""
+
+    value: dict[str, Any]
+    ttl: float  # seconds until expiry
+    size: int  # uncompressed JSON size in bytes
+
+
+class PersistentCache:
+    """
+    SQLite-backed response cache with per-action TTLs and size-bounded eviction.
+
+    When the stored payload size exceeds ``max_bytes``, the least recently
+    read entries are deleted. Blocking SQLite calls are available as ``get`` /
+    ``set``; the ``aget`` / ``aset`` variants run them in a worker thread.
+    Database errors are logged and treated as misses, never raised.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttls: dict[str, float] | None = None,
+        compress_level: int = 6,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_DISK_TTLS if ttls is None else ttls)
+        self.compress_level = compress_level
+        self._clock = clock
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def ttl_for(self, action: str) -> float:
+        """Return the TTL for an action, or 0 if it should not be persisted."""
+        return self.ttls.get(action, 0.0)
+
+    def get(self, key: str) -> StoredResponse | None:
+        """Return a fresh entry, or None."""
+        now = self._clock()
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT payload, expires_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None or row[1] <= now:
+                    if row is not None:
+                        with conn:
+                            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self.misses += 1
+                    return None
+                with conn:
+                    conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            raw = zlib.decompress(row[0])
+            value = json_codec.loads(raw)
+        except (sqlite3.Error, zlib.error, ValueError) as e:
+            logger.warning("Persistent cache read failed: %s", e)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return StoredResponse(value=value, ttl=row[1] - now, size=len(raw))
+
+    def set(self, key: str, action: str, value: dict[str, Any]) -> None:
+        """Store a value if its action is persisted and it fits in the size budget."""
+        ttl = self.ttl_for(action)
+        if ttl <= 0:
+            return
+        payload = zlib.compress(json_codec.dumps_bytes(value), self.compress_level)
+        if len(payload) > self.max_bytes:
+            return
+        now = self._clock()
+        try:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, action, payload, len(payload), now + ttl, now),
+                    )
+                    self._evict(conn, now)
+        except sqlite3.Error as e:
+            logger.warning("Persistent cache write failed: %s", e)
+
+    async def aget(self, key: str) -> StoredResponse | None:
+        """Async variant of ``get``."""
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, action: str, value: dict[str, Any]) -> None:
+        """Async variant of ``set``."""
+        await asyncio.to_thread(self.set, key, action, value)
+
+    def clear(self) -> None:
+        """Delete all entries and reset counters."""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM responses")
+        self.hits = self.misses = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Return a snapshot of cache counters and occupancy."""
+        with self._lock:
+            entries, size = (
+                self._connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses")
+            ).fetchone()
+        return {
+            "path": str(self.path),
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+
+
+def _load_ttls() -> dict[str, float]:
+    """Apply ``DATAGOV_DISK_CACHE_TTL_<ACTION>`` overrides to the default TTLs."""
+    return {
+        action: env_float(f"DATAGOV_DISK_CACHE_TTL_{action.upper()}", default)
+        for action, default in DEFAULT_DISK_TTLS.items()
+    }
+
+
+def _from_env() -> PersistentCache | None:
+    path = env_str("DATAGOV_DISK_CACHE_PATH")
+    if not path:
+        return None
+    return PersistentCache(
+        Path(path).expanduser(),
+        max_bytes=env_int("DATAGOV_DISK_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES),
+        ttls=_load_ttls(),
+    )
+
+
+# Global persistent cache used by ckan_api_call; None unless DATAGOV_DISK_CACHE_PATH is set
+persistent_cache = _from_env()
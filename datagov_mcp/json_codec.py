@@ -0,0 +1,131 @@
+"""Pluggable JSON codec: orjson when installed, the standard library otherwise.
+
+Decoding upstream responses and serializing multi-megabyte GeoJSON and
+Vega-Lite payloads are the main CPU costs on the event loop. orjson does both
+several times faster than ``json``. It is an optional dependency
+(``pip install 'datagov-mcp[fast-json]'``); set ``DATAGOV_JSON_CODEC`` to
+``json`` to force the standard library, e.g. to decode integers wider than
+64 bits exactly.
+
+Both codecs produce compact, UTF-8 (not ASCII-escaped) output.
+"""
+
+import importlib.util
+import json
+import logging
+from typing import Any
+
+from datagov_mcp.config import env_str
+
+logger = logging.getLogger(__name__)
+
+
+def orjson_available() -> bool:
+    """Return True if orjson is installed."""
+    return importlib.util.find_spec("orjson") is not None
+
+
+class StdlibCodec:
+    """JSON codec backed by the standard library ``json`` module."""
+
+    name = "json"
+
+    def __init__(self):
+        self._encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+    def loads(self, data: bytes | str) -> Any:
+        return json.loads(data)
+
+    def dumps(self, obj: Any) -> str:
+        return self._encoder.encode(obj)
+
+    def dumps_bytes(self, obj: Any) -> bytes:
+        return self._encoder.encode(obj).encode()
+
+
+class OrjsonCodec:
+    """
+    JSON codec backed by orjson.
+
+    Values orjson cannot serialize (e.g. integers beyond 64 bits) are encoded
+    with the standard library instead, so both codecs accept the same input.
+    Decoding falls back the same way for documents orjson rejects: ``NaN``,
+    ``Infinity`` and out-of-range floats such as ``1e400``, which CKAN
+    datastore responses can contain. Integers beyond 64 bits decode as
+    floats, as orjson reads them.
+    """
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+        self._options = orjson.OPT_NON_STR_KEYS
+        self._fallback = StdlibCodec()
+
+    def loads(self, data: bytes | str) -> Any:
+        try:
+            return self._orjson.loads(data)
+        except self._orjson.JSONDecodeError:
+            return self._fallback.loads(data)
+
+    def dumps(self, obj: Any) -> str:
+        return self.dumps_bytes(obj).decode()
+
+    def dumps_bytes(self, obj: Any) -> bytes:
+        try:
+            return self._orjson.dumps(obj, option=self._options)
+        except TypeError:
+            return self._fallback.dumps_bytes(obj)
+
+
+JSONCodec = StdlibCodec | OrjsonCodec
+
+
+def make_codec(name: str = "auto") -> JSONCodec:
+    """
+    Build a codec by name.
+
+    Args:
+        name: 'orjson', 'json', or 'auto' (orjson if installed)
+
+    Returns:
+        The codec; falls back to the standard library if orjson is missing
+    """
+    if name not in ("auto", "json", "orjson"):
+        logger.warning("Unknown JSON codec %r; using auto", name)
+        name = "auto"
+    if name == "json":
+        return StdlibCodec()
+    if orjson_available():
+        return OrjsonCodec()
+    if name == "orjson":
+        logger.warning("orjson requested but not installed; using the standard library")
+    return StdlibCodec()
+
+
+def set_codec(name: str) -> JSONCodec:
+    """Switch the process-wide codec and return it."""
+    global codec
+    codec = make_codec(name)
+    return codec
+
+
+def loads(data: bytes | str) -> Any:
+    """Decode JSON bytes or text with the active codec."""
+    return codec.loads(data)
+
+
+def dumps(obj: Any) -> str:
+    """Encode a value as compact JSON text with the active codec."""
+    return codec.dumps(obj)
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Encode a value as compact UTF-8 JSON bytes with the active codec."""
+    return codec.dumps_bytes(obj)
+
+
+# Global codec used for CKAN responses, the persistent cache and HTML embedding
+codec: JSONCodec = make_codec(env_str("DATAGOV_JSON_CODEC", "auto").lower())
@@ -0,0 +1,58 @@
+"""Lazy tool loading: register a tool's schema now, import its implementation on first call."""
+
+import functools
+import importlib
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+
+def lazy_tool(module: str) -> Callable[[F], F]:
+    """
+    Defer a tool's implementation to ``module`` until the tool is first called.
+
+    The decorated function is a stub that only carries the signature and
+    docstring FastMCP builds the tool schema from; calls are forwarded to the
+    function of the same name in ``module``, which is imported on the first
+    call. Keep heavy or optional dependencies in ``module`` so listing tools
+    never imports them.
+
+    Example:
+        @mcp.tool()
+        @lazy_tool("datagov_mcp.visualization_impl")
+        async def chart_generator(ctx: Context, resource_id: str) -> dict:
+            ...
+    """
+
+    def decorator(stub: F) -> F:
+        name = stub.__name__
+
+        @functools.wraps(stub)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            implementation = getattr(importlib.import_module(module), name)
+            return await implementation(*args, **kwargs)
+
+        wrapper.__lazy_module__ = module  # type: ignore[attr-defined]
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def lazy_attributes(module_name: str, implementation: str) -> Callable[[str], Any]:
+    """
+    Build a module ``__getattr__`` that resolves missing names from ``implementation``.
+
+    Lets a light tool module keep re-exporting helpers of its implementation
+    module without importing it up front.
+    """
+
+    def __getattr__(name: str) -> Any:
+        if name.startswith("__"):
+            raise AttributeError(f"module {module_name!r} has no attribute {name!r}")
+        try:
+            return getattr(importlib.import_module(implementation), name)
+        except AttributeError:
+            raise AttributeError(f"module {module_name!r} has no attribute {name!r}") from None
+
+    return __getattr__
@@ -0,0 +1,397 @@
+"""In-process metrics: latency histograms, counters and gauges.
+
+Tool calls, ``ckan_api_call`` invocations and individual upstream HTTP
+attempts are timed into fixed-bucket histograms; errors, retries, cache
+outcomes and in-flight requests are counted. ``snapshot()`` returns
+everything as a dict (served by the ``server_metrics`` tool) and
+``render_prometheus()`` in the Prometheus text exposition format (served at
+``/metrics`` over HTTP transport).
+
+Recording is a dict lookup, a ``bisect`` and a few integer updates per
+event; ``benchmarks/bench_metrics.py`` measures the overhead.
+"""
+
+import time
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Callable, Iterator
+from contextlib import nullcontext
+from typing import Any
+
+from datagov_mcp.cache import response_cache
+from datagov_mcp.client import transfer_stats
+from datagov_mcp.config import env_bool, env_str
+
+# Upper bounds (seconds) of the latency buckets; a final +Inf bucket is implied
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+class Histogram:
+    """Fixed-bucket histogram with count and sum, as in Prometheus."""
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record one observation."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float | None:
+        """Estimate a quantile by linear interpolation within its bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):  # +Inf bucket: the best bound is the last one
+                    return lower
+                upper = self.buckets[i]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return count, sum, mean and estimated p50/p95/p99."""
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+    def cumulative(self) -> Iterator[tuple[str, int]]:
+        """Yield ``(le, cumulative count)`` pairs, ending with ``+Inf``."""
+        total = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            total += bucket_count
+            yield (f"{bound:g}", total)
+        yield ("+Inf", self.count)
+
+
+class Metrics:
+    """
+    Registry of server metrics.
+
+    When ``enabled`` is False every recording method returns immediately.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._clock = clock
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop all recorded values."""
+        self.tool_latency: dict[str, Histogram] = {}
+        self.tool_errors: Counter[str] = Counter()
+        self.tools_in_flight: Counter[str] = Counter()
+        self.action_latency: dict[str, Histogram] = {}
+        self.action_errors: Counter[str] = Counter()
+        self.upstream_latency: dict[str, Histogram] = {}
+        self.upstream_responses: Counter[tuple[str, str]] = Counter()
+        self.upstream_in_flight: Counter[str] = Counter()
+        self.retries: Counter[str] = Counter()
+        self.cache_outcomes: Counter[tuple[str, str]] = Counter()
+
+    def track_tool(self, name: str) -> "_Timer | nullcontext":
+        """Time an MCP tool call, counting it as in flight and as an error if it raises."""
+        if not self.enabled:
+            return _NOOP
+        return _Timer(self, name, self.tool_latency, self.tool_errors, self.tools_in_flight)
+
+    def record_tool_error(self, name: str) -> None:
+        """Count a tool call that returned an error result instead of raising."""
+        if self.enabled:
+            self.tool_errors[name] += 1
+
+    def track_action(self, action: str) -> "_Timer | nullcontext":
+        """Time a ``ckan_api_call``, including cache hits, retries and backoff."""
+        if not self.enabled:
+            return _NOOP
+        return _Timer(self, action, self.action_latency, self.action_errors)
+
+    def upstream_started(self, action: str) -> float:
+        """Mark an upstream HTTP attempt as in flight; returns its start time."""
+        if not self.enabled:
+            return 0.0
+        self.upstream_in_flight[action] += 1
+        return self._clock()
+
+    def upstream_finished(self, action: str, started: float, status: int | None) -> None:
+        """Record an upstream attempt's latency and status (None for network errors)."""
+        if not self.enabled:
+            return
+        self.upstream_in_flight[action] -= 1
+        self._histogram(self.upstream_latency, action).observe(self._clock() - started)
+        self.upstream_responses[(action, "error" if status is None else str(status))] += 1
+
+    def record_retry(self, action: str) -> None:
+        """Count a retried upstream attempt."""
+        if self.enabled:
+            self.retries[action] += 1
+
+    def record_cache(self, action: str, outcome: str) -> None:
+        """Count how a call was served: hit, disk_hit, revalidated, miss or uncached."""
+        if self.enabled:
+            self.cache_outcomes[(action, outcome)] += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return all metrics as a JSON-serializable dict."""
+        tools = {
+            name: {
+                **hist.snapshot(),
+                "errors": self.tool_errors[name],
+                "in_flight": self.tools_in_flight[name],
+            }
+            for name, hist in sorted(self.tool_latency.items())
+        }
+        for name, in_flight in self.tools_in_flight.items():
+            tools.setdefault(name, {"count": 0, "errors": 0, "in_flight": in_flight})
+
+        actions: dict[str, dict[str, Any]] = {}
+        for action in sorted(set(self.action_latency) | set(self.upstream_latency)):
+            entry = actions[action] = {
+                **self._hist_snapshot(self.action_latency, action),
+                "errors": self.action_errors[action],
+                "retries": self.retries[action],
+                "upstream": {
+                    **self._hist_snapshot(self.upstream_latency, action),
+                    "in_flight": self.upstream_in_flight[action],
+                    "responses": {},
+                },
+                "cache": {},
+            }
+            for (name, status), count in sorted(self.upstream_responses.items()):
+                if name == action:
+                    entry["upstream"]["responses"][status] = count
+            for (name, outcome), count in sorted(self.cache_outcomes.items()):
+                if name == action:
+                    entry["cache"][outcome] = count
+        return {"enabled": self.enabled, "tools": tools, "actions": actions}
+
+    def render_prometheus(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        lines: list[str] = []
+        _histogram_family(
+            lines,
+            "datagov_tool_duration_seconds",
+            "MCP tool call latency",
+            "tool",
+            self.tool_latency,
+        )
+        _counter_family(
+            lines, "datagov_tool_errors_total", "MCP tool calls that raised", self.tool_errors
+        )
+        _gauge_family(
+            lines, "datagov_tools_in_flight", "MCP tool calls in progress", self.tools_in_flight
+        )
+        _histogram_family(
+            lines,
+            "datagov_ckan_call_duration_seconds",
+            "ckan_api_call latency, including cache hits and retries",
+            "action",
+            self.action_latency,
+        )
+        _counter_family(
+            lines,
+            "datagov_ckan_call_errors_total",
+            "ckan_api_call invocations that raised",
+            self.action_errors,
+            labels=("action",),
+        )
+        _histogram_family(
+            lines,
+            "datagov_upstream_request_duration_seconds",
+            "Latency of individual upstream HTTP attempts, including decoding",
+            "action",
+            self.upstream_latency,
+        )
+        _counter_family(
+            lines,
+            "datagov_upstream_responses_total",
+            "Upstream HTTP attempts by status code",
+            self.upstream_responses,
+            labels=("action", "status"),
+        )
+        _gauge_family(
+            lines,
+            "datagov_upstream_in_flight",
+            "Upstream HTTP attempts in progress",
+            self.upstream_in_flight,
+            label="action",
+        )
+        _counter_family(
+            lines,
+            "datagov_upstream_retries_total",
+            "Retried upstream attempts",
+            self.retries,
+            labels=("action",),
+        )
+        _counter_family(
+            lines,
+            "datagov_cache_outcomes_total",
+            "How ckan_api_call invocations were served",
+            self.cache_outcomes,
+            labels=("action", "outcome"),
+        )
+        transfer = transfer_stats.stats()["actions"]
+        _counter_family(
+            lines,
+            "datagov_upstream_bytes_total",
+            "Upstream response bytes on the wire (compressed) and decoded (decompressed)",
+            Counter(
+                {
+                    (action, kind): counters[f"{kind}_bytes"]
+                    for action, counters in transfer.items()
+                    for kind in ("compressed", "decompressed")
+                }
+            ),
+            labels=("action", "kind"),
+        )
+        cache = response_cache.stats()
+        _counter_family(
+            lines,
+            "datagov_response_cache_lookups_total",
+            "In-memory response cache lookups",
+            Counter({("hit",): cache["hits"], ("miss",): cache["misses"]}),
+            labels=("result",),
+        )
+        for gauge, help_text in (("entries", "entries"), ("bytes", "size in bytes")):
+            lines.append(
+                f"# HELP datagov_response_cache_{gauge} In-memory response cache {help_text}"
+            )
+            lines.append(f"# TYPE datagov_response_cache_{gauge} gauge")
+            lines.append(f"datagov_response_cache_{gauge} {cache[gauge]}")
+        return "\n".join(lines) + "\n"
+
+    def _histogram(self, histograms: dict[str, Histogram], name: str) -> Histogram:
+        hist = histograms.get(name)
+        if hist is None:
+            hist = histograms[name] = Histogram(self.buckets)
+        return hist
+
+    @staticmethod
+    def _hist_snapshot(histograms: dict[str, Histogram], name: str) -> dict[str, Any]:
+        hist = histograms.get(name)
+        return hist.snapshot() if hist is not None else {"count": 0}
+
+
+class _Timer:
+    """Context manager recording one timed operation into a registry."""
+
+    __slots__ = ("registry", "key", "histograms", "errors", "in_flight", "start")
+
+    def __init__(
+        self,
+        registry: Metrics,
+        key: str,
+        histograms: dict[str, Histogram],
+        errors: Counter,
+        in_flight: Counter | None = None,
+    ):
+        self.registry = registry
+        self.key = key
+        self.histograms = histograms
+        self.errors = errors
+        self.in_flight = in_flight
+
+    def __enter__(self) -> None:
+        if self.in_flight is not None:
+            self.in_flight[self.key] += 1
+        self.start = self.registry._clock()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        elapsed = self.registry._clock() - self.start
+        if exc_type is not None:
+            self.errors[self.key] += 1
+        if self.in_flight is not None:
+            self.in_flight[self.key] -= 1
+        self.registry._histogram(self.histograms, self.key).observe(elapsed)
+
+
+_NOOP = nullcontext()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}"
+
+
+def _histogram_family(
+    lines: list[str], name: str, help_text: str, label: str, histograms: dict[str, Histogram]
+) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for key, hist in sorted(histograms.items()):
+        for le, count in hist.cumulative():
+            bucket = 'le="' + le + '"'
+            lines.append(f"{name}_bucket{_labels((label,), (key,), bucket)} {count}")
+        lines.append(f"{name}_sum{_labels((label,), (key,))} {hist.sum}")
+        lines.append(f"{name}_count{_labels((label,), (key,))} {hist.count}")
+
+
+def _counter_family(
+    lines: list[str],
+    name: str,
+    help_text: str,
+    counter: Counter,
+    labels: tuple[str, ...] = ("tool",),
+) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} counter")
+    for key, value in sorted(counter.items()):
+        values = key if isinstance(key, tuple) else (key,)
+        lines.append(f"{name}{_labels(labels, values)} {value}")
+
+
+def _gauge_family(
+    lines: list[str], name: str, help_text: str, gauge: Counter, label: str = "tool"
+) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} gauge")
+    for key, value in sorted(gauge.items()):
+        lines.append(f"{name}{_labels((label,), (key,))} {value}")
+
+
+# Path of the Prometheus endpoint over HTTP transport; empty disables it
+PROMETHEUS_PATH = env_str("DATAGOV_METRICS_PATH", "/metrics")
+
+# Global metrics registry
+metrics = Metrics(enabled=env_bool("DATAGOV_METRICS_ENABLED", True))
@@ -0,0 +1,639 @@
+"""
+Paging through datastore resources: keyset cursors, concurrent full scans and caps.
+
+Offset paging (``datastore_search`` with ``offset``) costs the datastore a
+scan of every skipped row, so deep pages of large resources get slower and
+slower. Keyset paging instead asks ``datastore_search_sql`` for rows whose
+``_id`` follows the last one seen, which the ``_id`` index answers at the
+same cost on every page. It needs ``datastore_search_sql`` to be enabled and
+an ``_id`` order without full-text search; otherwise paging falls back to
+offsets. Either way callers continue with an opaque cursor.
+"""
+
+import asyncio
+import base64
+import binascii
+import math
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from datagov_mcp import json_codec
+from datagov_mcp.api import CKANAPIError, ckan_api_call
+from datagov_mcp.config import env_float, env_int
+
+# Largest page CKAN's datastore_search serves by default (ckan.datastore.search.rows_max)
+CKAN_MAX_PAGE_SIZE = 32_000
+
+# Monotonically increasing row id CKAN adds to every datastore table
+KEYSET_FIELD = "_id"
+
+# Status codes CKAN answers datastore_search_sql with when it is disabled or forbidden
+SQL_UNAVAILABLE_STATUS_CODES = frozenset({400, 403, 404})
+
+# Status code of an action CKAN doesn't serve at all ("Action name not known")
+SQL_DISABLED_STATUS_CODE = 400
+
+# Rows per page encoded to estimate its size against FetchLimits.max_bytes
+SIZE_SAMPLE_ROWS = 64
+
+Progress = Callable[[int, int], Awaitable[None]]
+
+
+@dataclass
+class FetchLimits:
+    """Paging settings and safety caps for fetching a whole resource."""
+
+    page_size: int = 10_000
+    concurrency: int = 4
+    max_rows: int = 250_000
+    max_bytes: int = 64 * 2**20
+
+
+class SQLSupport:
+    """
+    Remembers where the portal refuses ``datastore_search_sql``.
+
+    A refusal of the action itself (unknown action, or an error naming
+    ``datastore_search_sql``) marks SQL unavailable process-wide. Any other
+    refusal, such as a private or mistyped resource, only marks that
+    resource. Both expire after ``ttl`` seconds, so SQL is probed again.
+    """
+
+    def __init__(self, ttl: float = 600.0, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self.available: bool | None = None
+        self._retry_at = 0.0
+        self._refused: dict[str, float] = {}
+
+    def usable(self, resource_id: str | None = None) -> bool:
+        """Whether SQL is worth trying, for ``resource_id`` when given."""
+        now = self.clock()
+        if self.available is False and now < self._retry_at:
+            return False
+        return resource_id is None or self._refused.get(resource_id, 0.0) <= now
+
+    def refuse(self, error: CKANAPIError, resource_id: str | None = None) -> None:
+        """Record a refusal, process-wide or for the resource the statement read."""
+        retry_at = self.clock() + self.ttl
+        disabled = error.status_code == SQL_DISABLED_STATUS_CODE
+        if disabled or "datastore_search_sql" in str(error.message) or resource_id is None:
+            self.available = False
+            self._retry_at = retry_at
+        else:
+            self._refused[resource_id] = retry_at
+
+    def reset(self) -> None:
+        """Forget the result of earlier probes."""
+        self.available = None
+        self._retry_at = 0.0
+        self._refused.clear()
+
+
+def encode_cursor(position: dict[str, Any]) -> str:
+    """Encode a paging position as an opaque URL-safe cursor."""
+    raw = json_codec.dumps_bytes(position)
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str) -> dict[str, Any]:
+    """Decode a cursor from :func:`encode_cursor`, raising CKANAPIError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json_codec.loads(raw)
+    except (ValueError, binascii.Error):
+        raise CKANAPIError("Invalid cursor", status_code=400) from None
+    if not isinstance(position, dict) or not ({"after", "offset"} & position.keys()):
+        raise CKANAPIError("Invalid cursor", status_code=400)
+    for key in ("after", "offset"):
+        value = position.get(key, 0)
+        if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+            raise CKANAPIError("Invalid cursor", status_code=400)
+    return position
+
+
+def estimate_bytes(records: list[Any], sample: int = SIZE_SAMPLE_ROWS) -> int:
+    """
+    Estimate the encoded JSON size of a page of records from a sample of rows.
+
+    Encoding every page again only to measure it would cost as much as
+    decoding it did, so evenly spaced rows are encoded and scaled up.
+    """
+    if len(records) <= sample:
+        return len(json_codec.dumps_bytes(records))
+    sampled = records[:: len(records) // sample][:sample]
+    return len(json_codec.dumps_bytes(sampled)) * len(records) // len(sampled)
+
+
+def quote_identifier(name: str) -> str:
+    """Quote a PostgreSQL identifier (table or column name)."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def quote_literal(value: Any) -> str:
+    """Render a filter value as a PostgreSQL literal."""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def filter_conditions(filters: dict[str, Any] | None) -> list[str]:
+    """Translate ``datastore_search`` equality filters into SQL conditions."""
+    conditions = []
+    for field, value in (filters or {}).items():
+        column = quote_identifier(field)
+        if value is None:
+            conditions.append(f"{column} IS NULL")
+        elif isinstance(value, (list, tuple)):
+            values = ", ".join(quote_literal(v) for v in value)
+            conditions.append(f"{column} IN ({values})" if values else "FALSE")
+        else:
+            conditions.append(f"{column} = {quote_literal(value)}")
+    return conditions
+
+
+def keyset_possible(params: dict[str, Any]) -> bool:
+    """Whether a ``datastore_search`` query can be paged by ``_id`` instead of offset."""
+    sort = str(params.get("sort") or KEYSET_FIELD).strip().lower()
+    filters = params.get("filters")
+    return (
+        not params.get("q")
+        and not params.get("distinct")
+        and params.get("records_format", "objects") == "objects"
+        and sort in (KEYSET_FIELD, f"{KEYSET_FIELD} asc")
+        and (filters is None or isinstance(filters, dict))
+    )
+
+
+def keyset_sql(
+    resource_id: str,
+    columns: list[str],
+    filters: dict[str, Any] | None = None,
+    after: int | None = None,
+    upto: int | None = None,
+    limit: int | None = None,
+    offset: int = 0,
+) -> str:
+    """Build a ``datastore_search_sql`` statement selecting rows in an ``_id`` range."""
+    statement = (
+        f"SELECT {', '.join(quote_identifier(c) for c in columns)} "
+        f"FROM {quote_identifier(resource_id)}"
+        f"{_where(filters, after, upto)} ORDER BY {quote_identifier(KEYSET_FIELD)}"
+    )
+    if limit is not None:
+        statement += f" LIMIT {int(limit)}"
+    if offset:
+        statement += f" OFFSET {int(offset)}"
+    return statement
+
+
+def _where(filters: dict[str, Any] | None, after: int | None, upto: int | None = None) -> str:
+    conditions = filter_conditions(filters)
+    key = quote_identifier(KEYSET_FIELD)
+    if after is not None:
+        conditions.append(f"{key} > {int(after)}")
+    if upto is not None:
+        conditions.append(f"{key} <= {int(upto)}")
+    return " WHERE " + " AND ".join(conditions) if conditions else ""
+
+
+def plan_pages(start: int, end: int, page_size: int) -> list[tuple[int, int]]:
+    """Split the row range ``[start, end)`` into ``(offset, limit)`` pages."""
+    return [(offset, min(page_size, end - offset)) for offset in range(start, end, page_size)]
+
+
+def _clean_params(params: dict[str, Any] | None) -> dict[str, Any]:
+    return {k: v for k, v in (params or {}).items() if v not in ("", None)}
+
+
+def _requested_fields(params: dict[str, Any]) -> list[str]:
+    fields = params.get("fields") or []
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    return [f.strip() for f in fields if f.strip()]
+
+
+async def search_sql(
+    statement: str, use_cache: bool = True, resource_id: str | None = None
+) -> dict[str, Any] | None:
+    """
+    Run ``datastore_search_sql``, or return None if the portal doesn't serve it.
+
+    A refusal is remembered by ``sql_support``, for ``resource_id`` alone
+    unless it concerns the action itself; other errors propagate.
+    """
+    if not sql_support.usable(resource_id):
+        return None
+    try:
+        response = await ckan_api_call(
+            "datastore_search_sql", params={"sql": statement}, use_cache=use_cache
+        )
+    except CKANAPIError as e:
+        if e.status_code in SQL_UNAVAILABLE_STATUS_CODES:
+            sql_support.refuse(e, resource_id)
+            return None
+        raise
+    sql_support.available = True
+    return response.get("result", {})
+
+
+async def _keyset_columns(
+    resource_id: str, params: dict[str, Any], use_cache: bool = True
+) -> tuple[list[dict[str, Any]], list[str]]:
+    """Return the field descriptions to report and the columns a keyset query selects."""
+    response = await ckan_api_call(
+        "datastore_search", params={"resource_id": resource_id, "limit": 0}, use_cache=use_cache
+    )
+    fields = response.get("result", {}).get("fields", [])
+    requested = _requested_fields(params)
+    if requested:
+        fields = [f for f in fields if f.get("id") in requested]
+    columns = [f["id"] for f in fields]
+    if KEYSET_FIELD not in columns:
+        # The cursor needs _id even when the caller didn't ask for it
+        columns.append(KEYSET_FIELD)
+    return fields, columns
+
+
+def _strip_key(records: list[dict[str, Any]], fields: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Drop ``_id`` from records the caller didn't ask for it in.
+
+    The records come from the shared response cache, so copies are returned
+    rather than changing them in place.
+    """
+    if any(f.get("id") == KEYSET_FIELD for f in fields):
+        return records
+    return [{k: v for k, v in record.items() if k != KEYSET_FIELD} for record in records]
+
+
+async def search_page(
+    resource_id: str,
+    params: dict[str, Any] | None = None,
+    limit: int = 100,
+    offset: int = 0,
+    cursor: str = "",
+) -> dict[str, Any]:
+    """
+    Fetch one page of a datastore resource, keyset-paged when possible.
+
+    Starts at ``offset`` or continues from ``cursor``. Returns a
+    ``datastore_search``-shaped response whose result also carries ``paging``
+    (``"keyset"`` or ``"offset"``) and ``next_cursor`` (None on the last page).
+    Keyset pages don't include ``total``.
+    """
+    params = _clean_params(params)
+    position = decode_cursor(cursor) if cursor else {"offset": offset}
+
+    result = None
+    if keyset_possible(params):
+        result = await _keyset_page(
+            resource_id, params, limit, position.get("after"), position.get("offset", 0)
+        )
+    if result is None:
+        start = _require_offset(position)
+        response = await ckan_api_call(
+            "datastore_search",
+            params={**params, "resource_id": resource_id, "limit": limit, "offset": start},
+        )
+        result = dict(response.get("result", {}))
+        full = limit > 0 and len(result.get("records", [])) >= limit
+        result["paging"] = "offset"
+        result["next_cursor"] = encode_cursor({"offset": start + limit}) if full else None
+
+    return {"success": True, "result": result}
+
+
+def _require_offset(position: dict[str, Any]) -> int:
+    if "offset" not in position:
+        raise CKANAPIError(
+            "Cursor needs keyset paging, which is not available for this query",
+            status_code=400,
+        )
+    return int(position["offset"])
+
+
+async def _keyset_page(
+    resource_id: str, params: dict[str, Any], limit: int, after: int | None, offset: int
+) -> dict[str, Any] | None:
+    if not sql_support.usable(resource_id):
+        return None
+    fields, columns = await _keyset_columns(resource_id, params)
+    statement = keyset_sql(
+        resource_id, columns, params.get("filters"), after=after, limit=limit, offset=offset
+    )
+    result = await search_sql(statement, resource_id=resource_id)
+    if result is None:
+        return None
+    records = result.get("records", [])
+    last = records[-1][KEYSET_FIELD] if records else None
+    full = bool(records) and len(records) >= limit
+    records = _strip_key(records, fields)
+    return {
+        "resource_id": resource_id,
+        "fields": fields,
+        "records": records,
+        "limit": limit,
+        "paging": "keyset",
+        "next_cursor": encode_cursor({"after": last}) if full else None,
+    }
+
+
+async def fetch_all_records(
+    resource_id: str,
+    params: dict[str, Any] | None = None,
+    offset: int = 0,
+    cursor: str = "",
+    max_rows: int = 0,
+    page_size: int = 0,
+    limits: FetchLimits | None = None,
+    progress: Progress | None = None,
+    use_cache: bool = False,
+) -> dict[str, Any]:
+    """
+    Fetch every row of a datastore resource, up to the row and byte caps.
+
+    When the query can be keyset-paged, the ``_id`` range is split into
+    slices read concurrently with ``datastore_search_sql``, at a cost per
+    page independent of depth. Otherwise the first page is requested with
+    ``include_total`` and the remaining offset range is fetched concurrently
+    with ``datastore_search``. At most ``limits.concurrency`` requests run
+    at a time, each through ``ckan_api_call`` so it is retried and coalesced
+    like any other call, and pages are reassembled in order. Bulk pages skip
+    the response cache unless ``use_cache`` is set, so a large fetch doesn't
+    evict the metadata responses it exists for.
+    ``max_rows`` and ``page_size`` are clamped to the configured limits.
+
+    Args:
+        resource_id: ID of the datastore resource
+        params: Extra ``datastore_search`` parameters (``q``, ``fields``, ``sort``, ...)
+        offset: First row to fetch (starting past row 0 uses offset paging)
+        cursor: ``next_cursor`` of an earlier truncated fetch to continue from
+        max_rows: Maximum rows to return (0 for the configured cap)
+        page_size: Rows per request (0 for the configured page size)
+        limits: Paging limits (defaults to ``fetch_limits``)
+        progress: Awaited with ``(rows_fetched, rows_expected)`` after each page
+        use_cache: Serve pages from and store them into the response cache
+
+    Returns:
+        Records in resource order with ``fields``, ``total``, ``paging``,
+        ``truncated`` (``"max_rows"``, ``"max_bytes"`` or None) and, when
+        truncated, ``next_cursor`` and ``next_offset`` to resume from
+    """
+    limits = limits or fetch_limits
+    max_rows = min(max_rows or limits.max_rows, limits.max_rows)
+    page_size = max(1, min(page_size or limits.page_size, CKAN_MAX_PAGE_SIZE, max_rows))
+    params = _clean_params(params)
+    params.setdefault("sort", KEYSET_FIELD)
+    position = decode_cursor(cursor) if cursor else {"offset": offset}
+
+    result = None
+    if keyset_possible(params) and not position.get("offset"):
+        result = await _fetch_all_keyset(
+            resource_id,
+            params,
+            position.get("after"),
+            max_rows,
+            page_size,
+            limits,
+            progress,
+            use_cache,
+        )
+    if result is None:
+        result = await _fetch_all_offset(
+            resource_id,
+            params,
+            _require_offset(position),
+            max_rows,
+            page_size,
+            limits,
+            progress,
+            use_cache,
+        )
+    return result
+
+
+async def _fetch_all_keyset(
+    resource_id: str,
+    params: dict[str, Any],
+    after: int | None,
+    max_rows: int,
+    page_size: int,
+    limits: FetchLimits,
+    progress: Progress | None,
+    use_cache: bool = True,
+) -> dict[str, Any] | None:
+    if not sql_support.usable(resource_id):
+        return None
+    fields, columns = await _keyset_columns(resource_id, params, use_cache)
+    filters = params.get("filters")
+    key = quote_identifier(KEYSET_FIELD)
+    stats = await search_sql(
+        f"SELECT count(*) AS total, min({key}) AS lo, max({key}) AS hi "
+        f"FROM {quote_identifier(resource_id)}{_where(filters, after)}",
+        use_cache,
+        resource_id,
+    )
+    if stats is None:
+        return None
+    row = (stats.get("records") or [{}])[0]
+    remaining = int(row.get("total") or 0)
+    expected = min(remaining, max_rows)
+
+    pages: list[dict[str, Any]] = []
+    fetched = size = 0
+    complete = True
+    if remaining and row.get("lo") is not None:
+        low, high = int(row["lo"]), int(row["hi"])
+        # Size slices of the _id range to hold about page_size rows each. Ids
+        # are unique, so a slice never holds more rows than its width, which
+        # keeps it within CKAN's row limit.
+        density = remaining / (high - low + 1)
+        width = max(1, min(math.ceil(page_size / density), CKAN_MAX_PAGE_SIZE))
+        semaphore = asyncio.Semaphore(max(1, limits.concurrency))
+
+        async def fetch(lo: int, hi: int) -> dict[str, Any]:
+            nonlocal fetched
+            statement = keyset_sql(resource_id, columns, filters, after=lo, upto=hi)
+            async with semaphore:
+                result = await search_sql(statement, use_cache, resource_id)
+            if result is None:
+                raise CKANAPIError("datastore_search_sql became unavailable during a scan")
+            records = result.get("records", [])
+            fetched += len(records)
+            if progress is not None:
+                await progress(min(fetched, expected), expected)
+            return {"records": records, "bytes": estimate_bytes(records)}
+
+        start = low - 1
+        while start < high and fetched < max_rows and size <= limits.max_bytes:
+            # Plan only as many slices as the row cap can still use
+            slices = min(limits.concurrency * 2, math.ceil((max_rows - fetched) / page_size))
+            bounds = [
+                (lo, min(lo + width, high))
+                for lo in range(start, min(start + max(slices, 1) * width, high), width)
+            ]
+            pages += await _gather_in_order([fetch(lo, hi) for lo, hi in bounds])
+            size = sum(page["bytes"] for page in pages)
+            start = bounds[-1][1]
+        complete = start >= high
+
+    records: list[Any] = []
+    size = 0
+    truncated = None
+    for page in pages:
+        size += page["bytes"]
+        if size > limits.max_bytes and records:
+            truncated = "max_bytes"
+            break
+        records.extend(page["records"])
+    if len(records) > max_rows:
+        records = records[:max_rows]
+        truncated = "max_rows"
+    elif truncated is None and not complete:
+        truncated = "max_rows" if len(records) >= max_rows else "max_bytes"
+
+    last = records[-1][KEYSET_FIELD] if records else after
+    records = _strip_key(records, fields)
+    return {
+        "resource_id": resource_id,
+        "fields": fields,
+        "records": records,
+        "total": remaining,
+        "returned": len(records),
+        "pages": len(pages),
+        "paging": "keyset",
+        "next_cursor": encode_cursor({"after": last}) if truncated else None,
+        "next_offset": len(records) if truncated and after is None else None,
+        "truncated": truncated,
+    }
+
+
+async def _fetch_all_offset(
+    resource_id: str,
+    params: dict[str, Any],
+    offset: int,
+    max_rows: int,
+    page_size: int,
+    limits: FetchLimits,
+    progress: Progress | None,
+    use_cache: bool = True,
+) -> dict[str, Any]:
+    base = {**params, "resource_id": resource_id}
+    first = await _fetch_page(base, offset, page_size, True, use_cache)
+    total = first["total"]
+    end = offset + max_rows if total is None else min(total, offset + max_rows)
+    if first["records"]:
+        # Skip pages the byte cap would drop anyway, estimating from the first page
+        per_row = first["bytes"] / len(first["records"])
+        end = min(end, offset + int(limits.max_bytes / per_row) + page_size)
+    expected = max(end - offset, 0)
+    fetched = len(first["records"])
+    if progress is not None:
+        await progress(fetched, expected)
+
+    pages = [first]
+    if len(first["records"]) == page_size:
+        plan = plan_pages(offset + page_size, end, page_size)
+        if total is not None:
+            semaphore = asyncio.Semaphore(max(1, limits.concurrency))
+
+            async def fetch(page_offset: int, limit: int) -> dict[str, Any]:
+                nonlocal fetched
+                async with semaphore:
+                    page = await _fetch_page(base, page_offset, limit, use_cache=use_cache)
+                fetched += len(page["records"])
+                if progress is not None:
+                    await progress(fetched, expected)
+                return page
+
+            pages += await _gather_in_order([fetch(o, n) for o, n in plan])
+        else:
+            # Without a total the end is unknown: page sequentially until a short page
+            for page_offset, limit in plan:
+                page = await _fetch_page(base, page_offset, limit, use_cache=use_cache)
+                pages.append(page)
+                fetched += len(page["records"])
+                if progress is not None:
+                    await progress(fetched, expected)
+                if len(page["records"]) < limit:
+                    break
+
+    records: list[Any] = []
+    size = 0
+    truncated = None
+    ended = False
+    for page in pages:
+        size += page["bytes"]
+        if size > limits.max_bytes and records:
+            truncated = "max_bytes"
+            break
+        records.extend(page["records"])
+        if len(page["records"]) < page["limit"]:
+            ended = True  # End of resource, or rows deleted while fetching
+            break
+    next_offset = offset + len(records)
+    if truncated is None and not ended and (total is None or next_offset < total):
+        truncated = "max_rows" if len(records) >= max_rows else "max_bytes"
+
+    return {
+        "resource_id": resource_id,
+        "fields": first["fields"],
+        "records": records,
+        "total": total,
+        "offset": offset,
+        "returned": len(records),
+        "pages": len(pages),
+        "paging": "offset",
+        "next_cursor": encode_cursor({"offset": next_offset}) if truncated else None,
+        "next_offset": next_offset if truncated else None,
+        "truncated": truncated,
+    }
+
+
+async def _fetch_page(
+    base: dict[str, Any],
+    offset: int,
+    limit: int,
+    include_total: bool = False,
+    use_cache: bool = True,
+) -> dict[str, Any]:
+    params = {**base, "offset": offset, "limit": limit, "include_total": include_total}
+    if isinstance(params.get("filters"), dict):
+        params["filters"] = json_codec.dumps(params["filters"])
+    response = await ckan_api_call("datastore_search", params=params, use_cache=use_cache)
+    result = response.get("result", {})
+    records = result.get("records", [])
+    return {
+        "records": records,
+        "fields": result.get("fields", []),
+        "total": result.get("total"),
+        "limit": limit,
+        "bytes": estimate_bytes(records),
+    }
+
+
+async def _gather_in_order(coroutines: list[Awaitable[Any]]) -> list[Any]:
+    """Run coroutines concurrently, cancelling the rest if one fails."""
+    tasks = [asyncio.ensure_future(c) for c in coroutines]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+fetch_limits = FetchLimits(
+    page_size=env_int("DATAGOV_FETCH_PAGE_SIZE", 10_000),
+    concurrency=env_int("DATAGOV_FETCH_CONCURRENCY", 4),
+    max_rows=env_int("DATAGOV_FETCH_MAX_ROWS", 250_000),
+    max_bytes=env_int("DATAGOV_FETCH_MAX_BYTES", 64 * 2**20),
+)
+
+# Process-wide record of where datastore_search_sql is refused
+sql_support = SQLSupport(ttl=env_float("DATAGOV_SQL_RECHECK_INTERVAL", 600.0))
@@ -0,0 +1,191 @@
+"""
+Minimal upstream requests for the visualization tools.
+
+A :class:`ScanPlan` names the columns a tool reads and the predicates its
+rows must satisfy. Projection and equality filters go into
+``datastore_search`` (``fields`` and ``filters``). Ranges, such as a map's
+bounding box, can only be expressed in ``datastore_search_sql``, so a plan
+with ranges is pushed there whole when the portal serves SQL and the
+statement succeeds. Predicates that weren't pushed upstream, such as
+non-empty coordinates on the ``datastore_search`` path, are applied to the
+fetched rows, and further pages are fetched until ``limit`` rows pass them,
+so a plan selects the same rows wherever it runs.
+"""
+
+from collections.abc import AsyncIterator, Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from datagov_mcp import columnar, json_codec
+from datagov_mcp.aggregation import NUMBER_PATTERN, run_aggregate, to_number
+from datagov_mcp.api import CKANAPIError
+from datagov_mcp.pagination import (
+    CKAN_MAX_PAGE_SIZE,
+    KEYSET_FIELD,
+    fetch_limits,
+    filter_conditions,
+    quote_identifier,
+    quote_literal,
+)
+from datagov_mcp.records import search_columns
+from datagov_mcp.streaming import stream_records
+
+Bounds = tuple[float | None, float | None]
+
+
+@dataclass
+class ScanPlan:
+    """Columns and row predicates of one tool's read of a resource."""
+
+    resource_id: str
+    fields: list[str]
+    filters: dict[str, Any] = field(default_factory=dict)
+    not_null: list[str] = field(default_factory=list)
+    ranges: dict[str, Bounds] = field(default_factory=dict)
+
+    def sql(self, limit: int) -> str:
+        """The whole plan as one ``datastore_search_sql`` statement."""
+        conditions = filter_conditions(self.filters)
+        for name in self.not_null:
+            column = quote_identifier(name)
+            conditions.append(f"{column} IS NOT NULL AND {column}::text <> ''")
+        for name, (low, high) in self.ranges.items():
+            text = f"{quote_identifier(name)}::text"
+            number = (
+                f"(CASE WHEN {text} ~ {quote_literal(NUMBER_PATTERN)} THEN {text}::numeric END)"
+            )
+            if low is not None:
+                conditions.append(f"{number} >= {float(low)!r}")
+            if high is not None:
+                conditions.append(f"{number} <= {float(high)!r}")
+        columns = ", ".join(quote_identifier(name) for name in self.fields)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return (
+            f"SELECT {columns} FROM {quote_identifier(self.resource_id)}{where} "
+            f"ORDER BY {quote_identifier(KEYSET_FIELD)} LIMIT {int(limit)}"
+        )
+
+    def matches(self, record: dict[str, Any], check_filters: bool = False) -> bool:
+        """Whether a row satisfies the predicates (equality filters only if ``check_filters``)."""
+        for name in self.not_null:
+            if record.get(name) in (None, ""):
+                return False
+        for name, (low, high) in self.ranges.items():
+            number = to_number(record.get(name))
+            if number is None or (low is not None and number < low):
+                return False
+            if high is not None and number > high:
+                return False
+        if check_filters:
+            for name, expected in self.filters.items():
+                if not _equals(record.get(name), expected):
+                    return False
+        return True
+
+
+def _equals(value: Any, expected: Any) -> bool:
+    # Compare as text too, since CKAN casts filter values to the column type
+    if isinstance(expected, (list, tuple)):
+        return any(_equals(value, e) for e in expected)
+    if expected is None or value is None:
+        return value is expected
+    return value == expected or str(value) == str(expected)
+
+
+def plan_scan(
+    resource_id: str,
+    columns: Iterable[str],
+    filters: dict[str, Any] | None = None,
+    not_null: Iterable[str] = (),
+    ranges: dict[str, Bounds] | None = None,
+) -> ScanPlan:
+    """Plan a read of ``columns`` and of the columns predicates need, deduplicated."""
+    if filters is not None and not isinstance(filters, dict):
+        raise CKANAPIError("filters must be an object of field: value", status_code=400)
+    fields = list(dict.fromkeys(name for name in columns if name))
+    return ScanPlan(resource_id, fields, dict(filters or {}), list(not_null), dict(ranges or {}))
+
+
+def bbox_ranges(lat_field: str, lon_field: str, bbox: list[float] | None) -> dict[str, Bounds]:
+    """Ranges of a ``[min_lon, min_lat, max_lon, max_lat]`` bounding box (GeoJSON order)."""
+    if not bbox:
+        return {}
+    try:
+        west, south, east, north = (float(v) for v in bbox)
+    except (TypeError, ValueError):
+        raise CKANAPIError(
+            "bbox must be four numbers: [min_lon, min_lat, max_lon, max_lat]", status_code=400
+        )
+    if west > east or south > north:
+        raise CKANAPIError("bbox minimums must not exceed its maximums", status_code=400)
+    return {lat_field: (south, north), lon_field: (west, east)}
+
+
+async def scan(
+    plan: ScanPlan, limit: int, table: columnar.StoredTable | None = None
+) -> list[dict[str, Any]]:
+    """
+    Read up to ``limit`` rows of a plan, as dicts of the planned fields.
+
+    Reads ``table``, a resource's local copy, when given. Otherwise plans
+    with ranges run in SQL where the portal serves it, and the rest as
+    projected, filtered ``datastore_search`` pages, read until ``limit`` rows
+    pass the remaining predicates or ``fetch_limits.max_rows`` rows were read.
+    """
+    if table is not None:
+        records = table.records(list(dict.fromkeys([*plan.fields, *plan.filters])))
+        selected = [r for r in records if plan.matches(r, check_filters=True)][:limit]
+        return [{name: r.get(name) for name in plan.fields} for r in selected]
+    if plan.ranges:
+        rows = await run_aggregate(plan.sql(limit), plan.resource_id)
+        if rows is not None:
+            return [{name: row.get(name) for name in plan.fields} for row in rows]
+    selected: list[dict[str, Any]] = []
+    offset = 0
+    page_size = max(1, limit)
+    while len(selected) < limit and offset < fetch_limits.max_rows:
+        page = await search_columns(
+            plan.resource_id, page_size, offset, fields=plan.fields, filters=plan.filters
+        )
+        records = page.records(plan.fields)
+        selected += [r for r in records if plan.matches(r)]
+        offset += len(records)
+        if len(records) < page_size:
+            break
+        # Rows are being filtered out: read larger pages for the rest
+        page_size = min(page_size * 2, CKAN_MAX_PAGE_SIZE)
+    return selected[:limit]
+
+
+async def stream_scan(plan: ScanPlan, limit: int) -> AsyncIterator[list[dict[str, Any]]]:
+    """
+    Read up to ``limit`` rows of a plan as streamed batches of matching rows.
+
+    The streaming counterpart of :func:`scan`'s ``datastore_search`` path, for
+    large limits: raw and decoded pages are never all held at once. Pages are
+    requested until ``limit`` rows pass the plan's predicates, a short page
+    arrives or ``fetch_limits.max_rows`` rows were read.
+    """
+    selected = 0
+    offset = 0
+    page_size = min(max(1, limit), CKAN_MAX_PAGE_SIZE)
+    while selected < limit and offset < fetch_limits.max_rows:
+        params = {
+            "resource_id": plan.resource_id,
+            "limit": page_size,
+            "offset": offset,
+            "fields": ",".join(plan.fields),
+        }
+        if plan.filters:
+            params["filters"] = json_codec.dumps(plan.filters)
+        received = 0
+        async for batch in stream_records("datastore_search", params):
+            received += len(batch)
+            batch = [record for record in batch if plan.matches(record)][: limit - selected]
+            selected += len(batch)
+            if batch:
+                yield batch
+        offset += received
+        if received < page_size:
+            break
+        page_size = min(page_size * 2, CKAN_MAX_PAGE_SIZE)
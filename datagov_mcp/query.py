@@ -0,0 +1,294 @@
+"""
+Filter, group-by and aggregate queries over a locally materialized resource.
+
+Answers the aggregate questions agents otherwise piece together from many
+``datastore_search`` calls, in one tool call. The resource is read from the
+local column store when it is enabled, or fetched through
+:func:`fetch_all_records` otherwise. Queries run a
+column at a time: each condition narrows a list of selected row indices, and
+only the columns a query names are read.
+
+A query is a small declarative spec::
+
+    {
+        "where": [{"field": "city", "op": "eq", "value": "חיפה"}],
+        "group_by": ["year"],
+        "aggregates": [{"op": "sum", "field": "amount", "as": "total"}],
+        "order_by": "total desc",
+        "limit": 10,
+    }
+"""
+
+import json
+import time
+from collections.abc import Callable
+from itertools import compress
+from typing import Any
+
+from datagov_mcp import columnar
+from datagov_mcp.aggregation import sort_key, to_number
+from datagov_mcp.api import CKANAPIError
+from datagov_mcp.pagination import fetch_all_records
+
+OPERATORS = (
+    "eq",
+    "ne",
+    "lt",
+    "le",
+    "gt",
+    "ge",
+    "in",
+    "not_in",
+    "contains",
+    "is_null",
+    "not_null",
+)
+AGGREGATE_OPS = ("count", "count_distinct", "sum", "mean", "min", "max")
+
+
+def _invalid(message: str) -> CKANAPIError:
+    return CKANAPIError(f"Invalid query: {message}", status_code=400)
+
+
+def _comparable(value: Any) -> Any:
+    """Compare numeric-looking text as numbers, as data.gov.il stores most values as text."""
+    number = to_number(value)
+    return number if number is not None else value
+
+
+def _hashable(value: Any) -> Any:
+    """Key for sets and groups; JSON arrays and objects become canonical JSON text."""
+    if isinstance(value, (list, dict)):
+        # Tagged, so an array never equals a text value that spells it
+        return ("json", json.dumps(value, sort_keys=True, ensure_ascii=False))
+    return value
+
+
+def predicate(op: str, value: Any = None) -> Callable[[Any], bool]:
+    """Build the test one ``where`` condition applies to a column value."""
+    if op == "is_null":
+        return lambda v: v is None or v == ""
+    if op == "not_null":
+        return lambda v: v is not None and v != ""
+    if op in ("in", "not_in"):
+        if not isinstance(value, list):
+            raise _invalid(f"'{op}' needs a list value")
+        members = {_hashable(_comparable(v)) for v in value}
+        if op == "in":
+            return lambda v: _hashable(_comparable(v)) in members
+        return lambda v: _hashable(_comparable(v)) not in members
+    if op == "contains":
+        needle = str(value).lower()
+        return lambda v: v is not None and needle in str(v).lower()
+
+    target = _comparable(value)
+    numeric = isinstance(target, float)
+    if op == "eq":
+        return lambda v: _comparable(v) == target
+    if op == "ne":
+        return lambda v: _comparable(v) != target
+
+    def ordered(v: Any) -> Any:
+        # Order numbers with numbers and text with text; other rows never match
+        comparable = _comparable(v)
+        if isinstance(comparable, float):
+            return comparable if numeric else None
+        if isinstance(comparable, str):
+            return None if numeric else comparable
+        return None  # None, booleans, JSON arrays and objects
+
+    compare = {
+        "lt": lambda a: a < target,
+        "le": lambda a: a <= target,
+        "gt": lambda a: a > target,
+        "ge": lambda a: a >= target,
+    }.get(op)
+    if compare is None:
+        raise _invalid(f"unknown operator '{op}' (expected one of {', '.join(OPERATORS)})")
+    if not numeric:
+        target = str(target)
+    return lambda v: (a := ordered(v)) is not None and compare(a)
+
+
+def parse_order(order_by: str) -> list[tuple[str, bool]]:
+    """Parse ``"field desc, other"`` into ``(field, descending)`` pairs."""
+    keys = []
+    for part in order_by.split(","):
+        words = part.split()
+        if not words:
+            continue
+        descending = len(words) > 1 and words[-1].lower() == "desc"
+        if len(words) > 1 and words[-1].lower() in ("asc", "desc"):
+            words = words[:-1]
+        keys.append((" ".join(words), descending))
+    return keys
+
+
+def aggregate(op: str, values: list[Any]) -> Any:
+    """Compute one aggregate over a group's values of a column."""
+    if op == "count":
+        return sum(1 for v in values if v is not None)
+    if op == "count_distinct":
+        return len({_hashable(v) for v in values if v is not None})
+    numbers = [n for n in map(to_number, values) if n is not None]
+    if not numbers:
+        return None
+    if op == "sum":
+        return sum(numbers)
+    if op == "mean":
+        return sum(numbers) / len(numbers)
+    return min(numbers) if op == "min" else max(numbers)
+
+
+def execute(
+    columns: dict[str, list[Any]],
+    rows: int,
+    select: list[str] | None = None,
+    where: list[dict[str, Any]] | None = None,
+    group_by: list[str] | None = None,
+    aggregates: list[dict[str, Any]] | None = None,
+    order_by: str = "",
+    limit: int = 100,
+    offset: int = 0,
+) -> dict[str, Any]:
+    """
+    Run a query over materialized ``columns`` of ``rows`` rows.
+
+    Returns the output ``columns``, ``rows`` as dicts, and ``matched``: the
+    number of rows passing ``where`` (without aggregates) or of groups.
+    """
+    if limit < 0 or offset < 0:
+        raise _invalid("limit and offset must not be negative")
+    indices: list[int] = list(range(rows))
+    for condition in where or []:
+        field = condition.get("field", "")
+        column = _column(columns, field)
+        test = predicate(condition.get("op", "eq"), condition.get("value"))
+        indices = list(compress(indices, [test(column[i]) for i in indices]))
+
+    if group_by or aggregates:
+        output, results = _grouped(columns, indices, group_by or [], aggregates or [])
+    else:
+        output = select or list(columns)
+        selected = [_column(columns, name) for name in output]
+        results = [dict(zip(output, (c[i] for c in selected))) for i in indices]
+
+    for field, descending in reversed(parse_order(order_by)):
+        if field not in output:
+            raise _invalid(f"can't order by '{field}', which is not an output column")
+        nulls = [r for r in results if r[field] is None]
+        present = sorted(
+            (r for r in results if r[field] is not None),
+            key=lambda r: sort_key(r[field]),
+            reverse=descending,
+        )
+        results = present + nulls  # Nulls last either way
+    return {
+        "columns": output,
+        "rows": results[offset : offset + limit],
+        "matched": len(results),
+    }
+
+
+def _column(columns: dict[str, list[Any]], field: str) -> list[Any]:
+    if field not in columns:
+        raise _invalid(f"unknown field '{field}'")
+    return columns[field]
+
+
+def _grouped(
+    columns: dict[str, list[Any]],
+    indices: list[int],
+    group_by: list[str],
+    aggregates: list[dict[str, Any]],
+) -> tuple[list[str], list[dict[str, Any]]]:
+    keys = [_column(columns, name) for name in group_by]
+    groups: dict[tuple, list[int]] = {}
+    labels: dict[tuple, tuple] = {}  # A group's key values as they appear in the rows
+    for i in indices:
+        values = tuple(k[i] for k in keys)
+        key = tuple(map(_hashable, values))
+        if key not in groups:
+            groups[key] = []
+            labels[key] = values
+        groups[key].append(i)
+    if not group_by:
+        groups, labels = {(): indices}, {(): ()}
+
+    specs = []
+    for spec in aggregates or [{"op": "count"}]:
+        op = spec.get("op", "")
+        if op not in AGGREGATE_OPS:
+            raise _invalid(f"unknown aggregate '{op}' (expected one of {', '.join(AGGREGATE_OPS)})")
+        field = spec.get("field", "")
+        if not field and op != "count":
+            raise _invalid(f"aggregate '{op}' needs a field")
+        name = spec.get("as") or (f"{op}_{field}" if field else op)
+        specs.append((name, op, _column(columns, field) if field else None))
+
+    results = []
+    for key, members in groups.items():
+        row = dict(zip(group_by, labels[key]))
+        for name, op, column in specs:
+            if column is None:
+                row[name] = len(members)
+            else:
+                row[name] = aggregate(op, [column[i] for i in members])
+        results.append(row)
+    return group_by + [name for name, _, _ in specs], results
+
+
+def referenced_fields(
+    select: list[str] | None,
+    where: list[dict[str, Any]] | None,
+    group_by: list[str] | None,
+    aggregates: list[dict[str, Any]] | None,
+) -> list[str]:
+    """Source columns a query reads (empty when it selects every column)."""
+    if not (select or group_by or aggregates):
+        return []
+    names = list(select or []) + list(group_by or [])
+    names += [c.get("field", "") for c in where or []]
+    names += [a.get("field", "") for a in aggregates or []]
+    return list(dict.fromkeys(n for n in names if n))
+
+
+async def run_query(
+    resource_id: str,
+    select: list[str] | None = None,
+    where: list[dict[str, Any]] | None = None,
+    group_by: list[str] | None = None,
+    aggregates: list[dict[str, Any]] | None = None,
+    order_by: str = "",
+    limit: int = 100,
+    offset: int = 0,
+) -> dict[str, Any]:
+    """Materialize the columns a query needs and run it; see :func:`execute`."""
+    names = referenced_fields(select, where, group_by, aggregates)
+    store = columnar.column_store
+    if store is not None:
+        table = await store.table(resource_id)
+        available = list(table.columns)
+        wanted = [n for n in names or available if n in table.columns]
+        columns = {name: table.column(name) for name in wanted}
+        rows, source, truncated = table.rows, "local", table.truncated
+    else:
+        fetched = await fetch_all_records(resource_id, params={"fields": ",".join(names)})
+        available = [f["id"] for f in fetched["fields"]]
+        wanted = [n for n in names or available if n in available]
+        records = fetched["records"]
+        columns = {name: [r.get(name) for r in records] for name in wanted}
+        rows, source, truncated = len(records), "fetched", fetched["truncated"]
+    # Unknown fields are left out of ``columns`` for execute() to reject
+
+    started = time.perf_counter()
+    result = execute(columns, rows, select, where, group_by, aggregates, order_by, limit, offset)
+    return {
+        "resource_id": resource_id,
+        **result,
+        "returned": len(result["rows"]),
+        "scanned": rows,
+        "source": source,
+        "truncated": truncated,
+        "query_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
@@ -0,0 +1,165 @@
+"""
+Datastore pages fetched in a compact ``records_format`` and decoded to columns.
+
+The default ``records_format="objects"`` repeats every field name in every
+row and decodes into one dict per row. The tools request ``"lists"`` (or
+``"csv"``) instead and decode the rows straight into one list per column,
+using the response's ``fields`` as the schema. Row dicts are only built by
+:meth:`ColumnPage.records`, when a tool's output needs them.
+
+``"lists"`` is the default because it keeps JSON types. ``"csv"`` is smaller
+still, but values come back as text: numbers and booleans are converted
+using the field types, and empty text can't be told apart from null, so both
+decode as ``""`` in text columns and as None elsewhere.
+"""
+
+import csv
+import io
+from typing import Any
+
+from datagov_mcp import json_codec
+from datagov_mcp.api import ckan_api_call
+from datagov_mcp.config import env_str
+
+RECORDS_FORMATS = ("lists", "csv")
+INT_TYPES = ("int", "int2", "int4", "int8", "integer", "bigint", "smallint")
+FLOAT_TYPES = ("numeric", "float", "float4", "float8", "double precision", "real")
+
+
+class ColumnPage:
+    """
+    Rows of a datastore response held as one list per column.
+
+    Has the read interface of :class:`columnar.StoredTable` (``fields``,
+    ``columns``, ``rows``, ``column()`` and ``records()``), so the tools read
+    either the same way.
+    """
+
+    def __init__(
+        self,
+        fields: list[dict[str, Any]],
+        values: list[list[Any]],
+        total: int | None = None,
+    ):
+        self.fields = fields
+        self.columns = [f["id"] for f in fields]
+        self.values = dict(zip(self.columns, values))
+        self.rows = len(values[0]) if values else 0
+        self.total = total
+
+    @classmethod
+    def from_records(
+        cls, fields: list[dict[str, Any]], records: Any, total: int | None = None
+    ) -> "ColumnPage":
+        """Decode a ``records`` payload of any format into columns."""
+        if not fields and records and isinstance(records[0], dict):
+            fields = [{"id": name} for name in dict.fromkeys(k for r in records for k in r)]
+        return cls(fields, decode_records(fields, records), total)
+
+    def column(self, name: str, limit: int | None = None) -> list[Any]:
+        """Values of one column, in response order."""
+        values = self.values[name]
+        return values if limit is None else values[:limit]
+
+    def records(self, names: list[str] | None = None, limit: int | None = None) -> list[dict]:
+        """Rows as dicts of the given columns (default: all), in response order."""
+        names = [n for n in names or self.columns if n in self.values]
+        columns = [self.column(name, limit) for name in names]
+        return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def decode_records(fields: list[dict[str, Any]], records: Any) -> list[list[Any]]:
+    """
+    Decode ``records`` into one list per field.
+
+    Dispatches on the payload rather than the requested format, so an
+    ``"objects"`` response (from a portal ignoring ``records_format``) decodes too.
+    """
+    names = [f["id"] for f in fields]
+    if isinstance(records, str):
+        return decode_csv(fields, records)
+    if records and isinstance(records[0], dict):
+        return [[record.get(name) for record in records] for name in names]
+    if not records:
+        return [[] for _ in names]
+    return [list(column) for column in zip(*records)]
+
+
+def decode_csv(fields: list[dict[str, Any]], text: str) -> list[list[Any]]:
+    """Decode a headerless ``"csv"`` payload into typed columns."""
+    rows = list(csv.reader(io.StringIO(text)))
+    if not rows:
+        return [[] for _ in fields]
+    columns = zip(*rows)
+    return [
+        [convert(v) for v in column]
+        for convert, column in zip((_converter(f.get("type", "")) for f in fields), columns)
+    ]
+
+
+def _converter(db_type: str):
+    def number(kind):
+        def convert(value: str) -> Any:
+            if value == "":
+                return None
+            try:
+                return kind(value)
+            except ValueError:
+                return value
+
+        return convert
+
+    db_type = db_type.lower()
+    if db_type in INT_TYPES:
+        return number(int)
+    if db_type in FLOAT_TYPES:
+        return number(float)
+    if db_type in ("bool", "boolean"):
+        return lambda v: None if v == "" else v.lower() in ("t", "true")
+    if db_type == "text":
+        return lambda v: v
+    return lambda v: v or None
+
+
+async def search_columns(
+    resource_id: str,
+    limit: int = 100,
+    offset: int = 0,
+    fields: list[str] | None = None,
+    filters: dict[str, Any] | None = None,
+    records_format: str = "",
+) -> ColumnPage:
+    """
+    Fetch one ``datastore_search`` page decoded to columns.
+
+    Args:
+        resource_id: ID of the datastore resource
+        limit: Maximum rows to fetch
+        offset: First row to fetch
+        fields: Fields to fetch (default: all)
+        filters: ``datastore_search`` equality filters
+        records_format: ``"lists"`` or ``"csv"`` (default: ``DATAGOV_RECORDS_FORMAT``)
+    """
+    params: dict[str, Any] = {
+        "resource_id": resource_id,
+        "limit": limit,
+        "records_format": records_format or default_records_format,
+    }
+    if offset:
+        params["offset"] = offset
+    if fields:
+        params["fields"] = ",".join(fields)
+    if filters:
+        params["filters"] = json_codec.dumps(filters)
+    result = (await ckan_api_call("datastore_search", params=params)).get("result", {})
+    return ColumnPage.from_records(
+        result.get("fields", []), result.get("records", []), result.get("total")
+    )
+
+
+def _records_format() -> str:
+    value = env_str("DATAGOV_RECORDS_FORMAT", "lists").lower()
+    return value if value in RECORDS_FORMATS else "lists"
+
+
+default_records_format = _records_format()
@@ -0,0 +1,211 @@
+"""
+In-memory index from datasets to the datastore resources that serve their rows.
+
+``fetch_data`` used to call ``package_show`` on every invocation and take the
+first resource, which is often a PDF or XLSX that was never loaded into the
+datastore. The index keeps, per dataset, its datastore-active resources
+ranked best first, so repeated lookups are served from memory and a lookup
+needs a single ``datastore_search`` upstream.
+
+Entries are keyed by dataset name and ID and expire after a TTL. Packages
+seen in ``package_show`` and ``package_search`` responses refresh the index
+as they pass through, replacing an entry whose ``metadata_modified`` changed.
+"""
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+from datagov_mcp.api import ckan_api_call
+from datagov_mcp.config import env_float, env_int
+
+# Preferred formats of resources with a datastore copy; others rank after these
+FORMAT_RANKS = {"csv": 0, "tsv": 0, "xlsx": 1, "xls": 1, "json": 2, "geojson": 2}
+
+DEFAULT_TTL = 900.0
+DEFAULT_MAX_ENTRIES = 1024
+
+
+@dataclass
+class DatasetEntry:
+    """A dataset's datastore resources, best first, and when to look again."""
+
+    dataset_id: str
+    name: str
+    metadata_modified: str | None
+    resources: list[dict[str, Any]]
+    formats: list[str] = field(default_factory=list)
+    expires_at: float = 0.0
+
+    @property
+    def best(self) -> dict[str, Any] | None:
+        """The resource ``fetch_data`` reads, or None without a datastore resource."""
+        return self.resources[0] if self.resources else None
+
+
+def _timestamp(value: Any) -> float:
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return 0.0
+
+
+def _size(value: Any) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def rank_resources(resources: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    Summarize a package's datastore resources, best first.
+
+    Resources are ranked by format, then most recently modified, then
+    largest, then position in the package, so the choice is deterministic.
+    A package whose resources don't report ``datastore_active`` (older CKAN)
+    has all of them considered.
+    """
+    reported = any("datastore_active" in r for r in resources)
+    candidates = [
+        (position, r)
+        for position, r in enumerate(resources)
+        if r.get("id") and (r.get("datastore_active") or not reported)
+    ]
+
+    def key(item: tuple[int, dict[str, Any]]) -> tuple:
+        position, resource = item
+        rank = FORMAT_RANKS.get(str(resource.get("format") or "").lower(), len(FORMAT_RANKS))
+        modified = _timestamp(resource.get("last_modified") or resource.get("created"))
+        return (rank, -modified, -_size(resource.get("size")), position)
+
+    return [
+        {
+            "id": resource["id"],
+            "name": resource.get("name"),
+            "format": resource.get("format"),
+            "size": resource.get("size"),
+            "last_modified": resource.get("last_modified"),
+            "datastore_active": resource.get("datastore_active"),
+        }
+        for _, resource in sorted(candidates, key=key)
+    ]
+
+
+class ResourceIndex:
+    """
+    TTL + LRU index of datasets' datastore resources, bounded by entry count.
+
+    Looked up by dataset name or ID; both resolve to one entry.
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: OrderedDict[str, DatasetEntry] = OrderedDict()
+        self._aliases: dict[str, str] = {}
+        self.hits = self.misses = self.invalidations = self.evictions = 0
+
+    def lookup(self, name_or_id: str) -> DatasetEntry | None:
+        """The dataset's unexpired entry, or None."""
+        key = self._aliases.get(name_or_id)
+        entry = self._entries.get(key) if key is not None else None
+        if entry is None or entry.expires_at <= self.clock():
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    async def resolve(self, name_or_id: str, refresh: bool = False) -> DatasetEntry:
+        """
+        Return a dataset's entry, calling ``package_show`` on a miss.
+
+        With ``refresh``, the entry is rebuilt from an uncached ``package_show``.
+        """
+        entry = None if refresh else self.lookup(name_or_id)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        response = await ckan_api_call(
+            "package_show", params={"id": name_or_id}, use_cache=not refresh
+        )
+        return self.observe(response.get("result", {}), alias=name_or_id)
+
+    def observe(self, package: dict[str, Any], alias: str | None = None) -> DatasetEntry:
+        """Index a package from a ``package_show`` or ``package_search`` response."""
+        resources = package.get("resources") or []
+        name = package.get("name") or alias or ""
+        dataset_id = package.get("id") or name
+        current = self._entries.get(dataset_id)
+        modified = package.get("metadata_modified")
+        if current is not None and current.metadata_modified != modified:
+            self.invalidations += 1
+        entry = DatasetEntry(
+            dataset_id=dataset_id,
+            name=name,
+            metadata_modified=modified,
+            resources=rank_resources(resources),
+            formats=list(dict.fromkeys(str(r.get("format") or "") for r in resources)),
+            expires_at=self.clock() + self.ttl,
+        )
+        self._entries[dataset_id] = entry
+        self._entries.move_to_end(dataset_id)
+        for key in (dataset_id, name, alias):
+            if key:
+                self._aliases[key] = dataset_id
+        self._evict()
+        return entry
+
+    def observe_all(self, packages: Iterable[dict[str, Any]]) -> None:
+        """Index every package of a ``package_search`` result."""
+        for package in packages:
+            if package.get("resources") is not None:
+                self.observe(package)
+
+    def invalidate(self, name_or_id: str) -> None:
+        """Forget a dataset, so its next lookup calls ``package_show``."""
+        key = self._aliases.get(name_or_id)
+        if key is not None and self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        """Drop all entries and reset counters."""
+        self._entries.clear()
+        self._aliases.clear()
+        self.hits = self.misses = self.invalidations = self.evictions = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Return a snapshot of index counters and occupancy."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+        }
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        if len(self._aliases) > 4 * max(self.max_entries, 1):
+            self._aliases = {k: v for k, v in self._aliases.items() if v in self._entries}
+
+
+# Global index used by fetch_data
+resource_index = ResourceIndex(
+    ttl=env_float("DATAGOV_RESOLVER_TTL", DEFAULT_TTL),
+    max_entries=env_int("DATAGOV_RESOLVER_MAX_ENTRIES", DEFAULT_MAX_ENTRIES),
+)
@@ -0,0 +1,143 @@
+"""Retry policy for upstream CKAN requests: backoff, Retry-After and a retry budget."""
+
+import random
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any
+
+from datagov_mcp.config import env_float
+
+# HTTP status codes worth retrying. 429 and 503 may carry a Retry-After header.
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+RETRY_AFTER_STATUS_CODES = frozenset({429, 503})
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter.
+
+    The delay before retry ``n`` (0-based) is drawn uniformly from
+    ``[0, min(max_delay, base_delay * 2**n)]``. A server-supplied Retry-After
+    takes precedence, capped at ``max_retry_after``.
+    """
+
+    base_delay: float = 0.25
+    max_delay: float = 8.0
+    max_retry_after: float = 30.0
+
+    def backoff(self, attempt: int, rng: Callable[[], float] = random.random) -> float:
+        """Return the jittered backoff delay before retry number ``attempt``."""
+        ceiling = min(self.max_delay, self.base_delay * (2**attempt))
+        return ceiling * rng()
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float:
+        """Return the delay before a retry, honoring Retry-After when given."""
+        if retry_after is not None:
+            return min(max(retry_after, 0.0), self.max_retry_after)
+        return self.backoff(attempt)
+
+
+def parse_retry_after(value: str | None, now: float | None = None) -> float | None:
+    """
+    Parse a Retry-After header into seconds from now.
+
+    Accepts both delay-seconds and HTTP-date forms. Returns None if the header
+    is missing or malformed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+    return max(retry_at - (time.time() if now is None else now), 0.0)
+
+
+class RetryBudget:
+    """
+    Process-wide token bucket limiting retries to a fraction of requests.
+
+    Every request deposits ``ratio`` tokens and every retry withdraws one, so
+    in steady state at most ``ratio`` retries are sent per original request.
+    A floor of ``min_per_second`` tokens accrues over time so that low-traffic
+    periods can still retry. The balance is capped at ``max_tokens``.
+    """
+
+    def __init__(
+        self,
+        ratio: float = 0.2,
+        min_per_second: float = 1.0,
+        max_tokens: float = 100.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._clock = clock
+        self._balance = max_tokens
+        self._last_refill = clock()
+        self.requests = 0
+        self.retries = 0
+        self.exhausted = 0
+
+    def record_request(self) -> None:
+        """Deposit tokens for one original (non-retry) request."""
+        self.requests += 1
+        self._deposit(self.ratio)
+
+    def try_spend(self) -> bool:
+        """Withdraw one token for a retry. Returns False if the budget is exhausted."""
+        self._refill()
+        if self._balance >= 1.0:
+            self._balance -= 1.0
+            self.retries += 1
+            return True
+        self.exhausted += 1
+        return False
+
+    def reset(self) -> None:
+        """Refill the bucket and reset counters."""
+        self._balance = self.max_tokens
+        self._last_refill = self._clock()
+        self.requests = self.retries = self.exhausted = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Return a snapshot of budget counters."""
+        self._refill()
+        return {
+            "balance": self._balance,
+            "requests": self.requests,
+            "retries": self.retries,
+            "exhausted": self.exhausted,
+        }
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        if elapsed > 0:
+            self._deposit(elapsed * self.min_per_second)
+
+    def _deposit(self, tokens: float) -> None:
+        self._balance = min(self.max_tokens, self._balance + tokens)
+
+
+# Global policy and budget used by ckan_api_call
+retry_policy = RetryPolicy(
+    base_delay=env_float("DATAGOV_RETRY_BASE_DELAY", 0.25),
+    max_delay=env_float("DATAGOV_RETRY_MAX_DELAY", 8.0),
+    max_retry_after=env_float("DATAGOV_RETRY_MAX_RETRY_AFTER", 30.0),
+)
+retry_budget = RetryBudget(
+    ratio=env_float("DATAGOV_RETRY_BUDGET_RATIO", 0.2),
+    min_per_second=env_float("DATAGOV_RETRY_BUDGET_MIN_PER_SECOND", 1.0),
+    max_tokens=env_float("DATAGOV_RETRY_BUDGET_MAX_TOKENS", 100.0),
+)
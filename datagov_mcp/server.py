@@ -1,11 +1,73 @@
 """Main MCP server implementation with CKAN tools."""
 
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
 from fastmcp import Context, FastMCP
+from fastmcp.server.middleware import CallNext, Middleware, MiddlewareContext
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+
+from datagov_mcp import columnar, disk_cache, tracing
+from datagov_mcp.api import BASE_URL, CKANAPIError, ckan_api_call
+from datagov_mcp.batch import show_packages
+from datagov_mcp.breaker import circuit_breakers
+from datagov_mcp.cache import response_cache
+from datagov_mcp.client import cleanup_http_client, start_http_client, transfer_stats
+from datagov_mcp.metrics import PROMETHEUS_PATH, Metrics, metrics
+from datagov_mcp.pagination import fetch_all_records, search_page
+from datagov_mcp.query import run_query
+from datagov_mcp.records import search_columns
+from datagov_mcp.resolver import resource_index
+from datagov_mcp.retry import retry_budget
+from datagov_mcp.singleflight import inflight_requests
+
+
+@asynccontextmanager
+async def lifespan(server: FastMCP) -> AsyncIterator[dict]:
+    """Open (and prewarm) the shared HTTP client on startup and close it on shutdown."""
+    await start_http_client(prewarm_url=f"{BASE_URL}/action/status_show")
+    try:
+        yield {}
+    finally:
+        await cleanup_http_client()
+        if disk_cache.persistent_cache is not None:
+            disk_cache.persistent_cache.close()
+
+
+class MetricsMiddleware(Middleware):
+    """Times every tool call into a ``Metrics`` registry, counting error results as errors."""
+
+    def __init__(self, registry: Metrics):
+        self.registry = registry
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next: CallNext) -> Any:
+        name = context.message.name
+        with self.registry.track_tool(name):
+            result = await call_next(context)
+        # Several tools report CKAN failures as {"error": ...} rather than raising
+        content = getattr(result, "structured_content", None)
+        if isinstance(content, dict) and "error" in content:
+            self.registry.record_tool_error(name)
+        return result
+
+
+class TracingMiddleware(Middleware):
+    """Opens a root span for every tool call."""
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next: CallNext) -> Any:
+        name = context.message.name
+        with tracing.span(f"tool {name}", tool=name):
+            return await call_next(context)
 
-from datagov_mcp.api import CKANAPIError, ckan_api_call
 
 # Create an MCP server
-mcp = FastMCP("DataGovIL")
+mcp = FastMCP(
+    "DataGovIL",
+    lifespan=lifespan,
+    middleware=[MetricsMiddleware(metrics), TracingMiddleware()],
+)
 
 # Import visualization tools to register them
 from datagov_mcp import visualization  # noqa: E402, F401
@@ -78,7 +140,9 @@ async def package_search(
             "start": start,
             "include_private": include_private,
         }
-        return await ckan_api_call("package_search", params=params)
+        response = await ckan_api_call("package_search", params=params)
+        resource_index.observe_all(response.get("result", {}).get("results", []))
+        return response
     except CKANAPIError as e:
         await ctx.error(f"Failed to search packages: {e.message}")
         raise
@@ -97,12 +161,42 @@ async def package_show(ctx: Context, id: str) -> dict:
     """
     await ctx.info(f"Fetching metadata for package: {id}")
     try:
-        return await ckan_api_call("package_show", params={"id": id})
+        response = await ckan_api_call("package_show", params={"id": id})
+        resource_index.observe(response.get("result", {}), alias=id)
+        return response
     except CKANAPIError as e:
         await ctx.error(f"Failed to fetch package: {e.message}")
         raise
 
 
+@mcp.tool()
+async def package_show_many(ctx: Context, ids: list[str], concurrency: int = 0) -> dict:
+    """
+    Get metadata about several packages (datasets) in one call.
+
+    Packages are fetched concurrently, and ones fetched recently are served
+    from the cache. A package that can't be fetched is reported under
+    ``errors`` without failing the others.
+
+    Args:
+        ids: IDs or names of the packages (at most the server's batch cap)
+        concurrency: Packages fetched at once (default and ceiling: server setting)
+
+    Returns:
+        Package metadata by ID under results, and error messages by ID under errors
+    """
+    await ctx.info(f"Fetching metadata for {len(ids)} packages")
+
+    async def progress(fetched: int, expected: int) -> None:
+        await ctx.report_progress(fetched, expected)
+
+    try:
+        return await show_packages(ids, concurrency, progress=progress)
+    except CKANAPIError as e:
+        await ctx.error(f"Failed to fetch packages: {e.message}")
+        return {"error": str(e.message)}
+
+
 @mcp.tool()
 async def organization_list(ctx: Context) -> dict:
     """Get names of all organizations."""
@@ -180,10 +274,19 @@ async def datastore_search(
     sort: str = "",
     include_total: bool = True,
     records_format: str = "objects",
+    paging: str = "offset",
+    cursor: str = "",
 ) -> dict:
     """
     Search a datastore resource.
 
+    With ``paging='keyset'`` pages follow the row ``_id`` instead of skipping
+    ``offset`` rows, so deep pages cost the same as the first one. Pass the
+    returned ``next_cursor`` as ``cursor`` to get the next page. Queries that
+    can't be keyset-paged (full-text ``q``, ``distinct``, non-``_id`` sort,
+    non-object records) or portals without ``datastore_search_sql`` fall back
+    to offset paging behind the same cursor.
+
     Args:
         resource_id: ID of the resource to search
         q: Full-text query string
@@ -195,12 +298,24 @@ async def datastore_search(
         sort: Comma-separated list of fields to sort by
         include_total: Include total result count
         records_format: Format of records ('objects', 'lists', or 'csv')
+        paging: 'offset' (default) or 'keyset' for deep scans of large resources
+        cursor: next_cursor of the previous page (implies keyset paging)
 
     Returns:
-        Datastore search results with records
+        Datastore search results with records; keyset paging adds paging and next_cursor
     """
     await ctx.info(f"Searching datastore for resource: {resource_id}")
     try:
+        if paging == "keyset" or cursor:
+            params = {
+                "q": q,
+                "distinct": distinct,
+                "plain": plain,
+                "fields": fields,
+                "sort": sort,
+                "records_format": records_format,
+            }
+            return await search_page(resource_id, params, limit, offset, cursor)
         params = {
             "resource_id": resource_id,
             "q": q,
@@ -230,7 +345,9 @@ async def fetch_data(
     Fetch data from public API based on a dataset name query.
 
     This is a convenience tool that combines package_show and datastore_search.
-    It finds the first resource of a dataset and returns its data.
+    It picks the dataset's best datastore resource (preferring CSV, then the
+    most recently modified) and returns its data. Datasets are resolved from
+    an in-memory index after the first lookup.
 
     Args:
         dataset_name: Name or ID of the dataset
@@ -238,37 +355,172 @@ async def fetch_data(
         offset: Starting index for pagination
 
     Returns:
-        Records from the first resource of the dataset
+        Records of the chosen resource, its ID and a summary of it
     """
     await ctx.info(f"Fetching data for dataset: {dataset_name}")
     try:
-        # First, get the dataset metadata
-        package_data = await ckan_api_call("package_show", params={"id": dataset_name})
-        resources = package_data.get("result", {}).get("resources", [])
-
-        if not resources:
-            return {"error": f"No resources found in dataset '{dataset_name}'"}
-
-        # Use the first resource
-        resource_id = resources[0]["id"]
-        await ctx.info(f"Using resource: {resource_id}")
-
-        # Fetch data from the datastore
-        result = await ckan_api_call(
-            "datastore_search",
-            params={
-                "resource_id": resource_id,
-                "limit": limit,
-                "offset": offset,
-            },
+        for attempt in range(2):
+            # Find the resource through the index, calling package_show on a miss
+            entry = await resource_index.resolve(dataset_name, refresh=attempt > 0)
+            if entry.best is None:
+                if not entry.formats:
+                    return {"error": f"No resources found in dataset '{dataset_name}'"}
+                formats = ", ".join(f for f in entry.formats if f) or "unknown"
+                return {
+                    "error": f"No datastore resources found in dataset '{dataset_name}' "
+                    f"(resource formats: {formats})"
+                }
+            resource_id = entry.best["id"]
+            await ctx.info(f"Using resource: {resource_id}")
+
+            # Fetch data from the datastore; return just the records for convenience
+            try:
+                page = await search_columns(resource_id, limit, offset)
+            except CKANAPIError as e:
+                # The resource was deleted or left the datastore since it was indexed
+                if attempt or e.status_code != 404:
+                    raise
+                continue
+            return {"records": page.records(), "resource_id": resource_id, "resource": entry.best}
+
+    except CKANAPIError as e:
+        await ctx.error(f"Failed to fetch data: {e.message}")
+        return {"error": str(e.message)}
+
+
+@mcp.tool()
+async def datastore_fetch_all(
+    ctx: Context,
+    resource_id: str,
+    q: str = "",
+    fields: str = "",
+    sort: str = "",
+    offset: int = 0,
+    max_rows: int = 0,
+    page_size: int = 0,
+    cursor: str = "",
+) -> dict:
+    """
+    Fetch all rows of a datastore resource, paging concurrently.
+
+    Gets the row count, splits the resource into pages and fetches them in
+    parallel, returning the records in order. Pages are ``_id`` ranges read
+    with ``datastore_search_sql`` when the portal allows it, and offset pages
+    otherwise. Stops at the configured row and byte caps; continue from
+    ``next_cursor`` when ``truncated`` is set.
+
+    Args:
+        resource_id: ID of the resource to fetch
+        q: Full-text query string
+        fields: Comma-separated list of fields to return
+        sort: Comma-separated list of fields to sort by (default: _id)
+        offset: First row to fetch
+        max_rows: Maximum rows to return (default and ceiling: server cap)
+        page_size: Rows per upstream request (default: server setting)
+        cursor: next_cursor of a truncated fetch to continue from
+
+    Returns:
+        Records, fields, total, paging, next_cursor and truncated
+        ('max_rows', 'max_bytes' or null)
+    """
+    await ctx.info(f"Fetching all rows of resource: {resource_id}")
+
+    async def progress(fetched: int, expected: int) -> None:
+        await ctx.report_progress(fetched, expected)
+
+    try:
+        return await fetch_all_records(
+            resource_id,
+            params={"q": q, "fields": fields, "sort": sort},
+            offset=offset,
+            cursor=cursor,
+            max_rows=max_rows,
+            page_size=page_size,
+            progress=progress,
         )
+    except CKANAPIError as e:
+        await ctx.error(f"Failed to fetch resource: {e.message}")
+        return {"error": str(e.message)}
 
-        # Return just the records for convenience
-        if result.get("success"):
-            return {"records": result["result"]["records"], "resource_id": resource_id}
-        else:
-            return {"error": "Failed to fetch data from datastore"}
 
+@mcp.tool()
+async def resource_query(
+    ctx: Context,
+    resource_id: str,
+    select: list[str] | None = None,
+    where: list[dict[str, Any]] | None = None,
+    group_by: list[str] | None = None,
+    aggregates: list[dict[str, Any]] | None = None,
+    order_by: str = "",
+    limit: int = 100,
+    offset: int = 0,
+) -> dict:
+    """
+    Filter, group and aggregate the rows of a datastore resource locally.
+
+    Answers questions like "total amount per city in 2023" in one call instead
+    of many datastore_search calls. The resource is read from the local column
+    store when it is enabled and fetched whole otherwise, so follow-up queries
+    on the same resource don't go back to the portal.
+
+    Args:
+        resource_id: ID of the resource to query
+        select: Fields to return (default: all; ignored when grouping)
+        where: Conditions that must all hold, as {"field", "op", "value"} with
+            op one of eq, ne, lt, le, gt, ge, in, not_in, contains, is_null, not_null
+        group_by: Fields to group rows by
+        aggregates: Per-group values, as {"op", "field", "as"} with op one of
+            count, count_distinct, sum, mean, min, max (default: count)
+        order_by: Comma-separated output columns, each optionally "desc"
+        limit: Maximum rows to return
+        offset: Number of result rows to skip
+
+    Returns:
+        Output columns and rows, matched rows (or groups), rows scanned,
+        source ('local' or 'fetched') and truncated
+    """
+    await ctx.info(f"Querying resource: {resource_id}")
+    try:
+        return await run_query(
+            resource_id, select, where, group_by, aggregates, order_by, limit, offset
+        )
     except CKANAPIError as e:
-        await ctx.error(f"Failed to fetch data: {e.message}")
+        await ctx.error(f"Failed to query resource: {e.message}")
         return {"error": str(e.message)}
+
+
+@mcp.tool()
+async def server_metrics(ctx: Context) -> dict:
+    """
+    Get a snapshot of server performance metrics.
+
+    Returns:
+        Latency histograms (count, mean, p50/p95/p99) per tool and per CKAN
+        action, error/retry/in-flight counters, cache outcomes, transfer sizes,
+        and the state of the caches, column store, resource index, circuit breakers
+        and retry budget
+    """
+    await ctx.info("Collecting server metrics...")
+    store = disk_cache.persistent_cache
+    columns = columnar.column_store
+    return {
+        **metrics.snapshot(),
+        "response_cache": response_cache.stats(),
+        "persistent_cache": store.stats() if store is not None else None,
+        "column_store": columns.stats() if columns is not None else None,
+        "resource_index": resource_index.stats(),
+        "transfer": transfer_stats.stats(),
+        "circuit_breakers": circuit_breakers.stats(),
+        "retry_budget": retry_budget.stats(),
+        "coalescing": inflight_requests.stats(),
+    }
+
+
+if PROMETHEUS_PATH:
+
+    @mcp.custom_route(PROMETHEUS_PATH, methods=["GET"], include_in_schema=False)
+    async def prometheus_metrics(request: Request) -> PlainTextResponse:
+        """Serve metrics in the Prometheus text format (HTTP transport only)."""
+        return PlainTextResponse(
+            metrics.render_prometheus(), media_type="text/plain; version=0.0.4"
+        )
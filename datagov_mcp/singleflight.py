@@ -0,0 +1,63 @@
+"""Single-flight coalescing of concurrent identical upstream requests."""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Registry of in-flight calls keyed by request identity.
+
+    The first caller for a key starts the call as a task; concurrent callers
+    with the same key await that task and receive its result or its exception.
+    The task is shielded, so a cancelled caller does not cancel the shared call
+    for the others. The key is released as soon as the call completes.
+    """
+
+    def __init__(self):
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run ``fn`` once for all concurrent callers sharing ``key``."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, key=key: self._release(key, t))
+            self.leaders += 1
+        else:
+            self.followers += 1
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        """Return the number of distinct calls currently in flight."""
+        return len(self._inflight)
+
+    def stats(self) -> dict[str, Any]:
+        """Return a snapshot of coalescing counters."""
+        return {
+            "in_flight": len(self._inflight),
+            "leaders": self.leaders,
+            "followers": self.followers,
+        }
+
+    def clear(self) -> None:
+        """Forget in-flight calls and reset counters."""
+        self._inflight.clear()
+        self.leaders = self.followers = 0
+
+    def _release(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved when every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+
+# Global registry used by ckan_api_call
+inflight_requests = SingleFlight()
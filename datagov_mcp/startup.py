@@ -0,0 +1,166 @@
+"""
+Startup-time measurement: per-module import cost and time to the first ``tools/list``.
+
+Runs a fresh interpreter with ``-X importtime`` that imports the server and
+lists its tools over an in-memory MCP session, the same work a desktop
+client waits for when it spawns a stdio server. Connection prewarming is
+disabled in the probe so no network time is included.
+
+Usage:
+    python server.py --measure-startup [--top 15] [--json]
+    python -m datagov_mcp.startup
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any
+
+PROBE = """
+import asyncio, json, sys, time
+
+start = time.perf_counter()
+from datagov_mcp.server import mcp
+imported = time.perf_counter()
+
+
+async def list_tools():
+    from fastmcp import Client
+
+    async with Client(mcp) as client:
+        listed = await client.list_tools()
+    tools = await mcp.get_tools()
+    return listed, tools
+
+
+listed, tools = asyncio.run(list_tools())
+done = time.perf_counter()
+deferred = sorted({m for t in tools.values() if (m := getattr(t.fn, "__lazy_module__", None))})
+print(json.dumps({
+    "import_s": imported - start,
+    "tools_list_s": done - imported,
+    "tools": len(listed),
+    "deferred_modules": deferred,
+    "deferred_loaded": [m for m in deferred if m in sys.modules],
+}))
+"""
+
+
+@dataclass
+class ImportTime:
+    """One line of ``-X importtime`` output."""
+
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> list[ImportTime]:
+    """Parse the ``-X importtime`` lines out of a process's stderr."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line.split("|", 2)
+        entries.append(
+            ImportTime(
+                module=name.strip(),
+                self_us=int(self_us.removeprefix("import time:")),
+                cumulative_us=int(cumulative_us),
+                depth=(len(name) - len(name.lstrip()) - 1) // 2,
+            )
+        )
+    return entries
+
+
+def summarize(entries: list[ImportTime], top: int = 15) -> dict[str, Any]:
+    """Total import cost, cost per top-level package and per ``datagov_mcp`` module."""
+    by_package: dict[str, int] = defaultdict(int)
+    for entry in entries:
+        by_package[entry.module.split(".")[0]] += entry.self_us
+    packages = sorted(by_package.items(), key=lambda item: item[1], reverse=True)
+    return {
+        "total_import_ms": sum(e.self_us for e in entries) / 1000,
+        "modules_imported": len(entries),
+        "packages": [{"package": name, "self_ms": us / 1000} for name, us in packages[:top]],
+        "datagov_mcp": [
+            {
+                "module": e.module,
+                "self_ms": e.self_us / 1000,
+                "cumulative_ms": e.cumulative_us / 1000,
+            }
+            for e in entries
+            if e.module.split(".")[0] == "datagov_mcp"
+        ],
+    }
+
+
+def measure_startup(top: int = 15) -> dict[str, Any]:
+    """Spawn a fresh interpreter, import the server, list tools and report the costs."""
+    env = {
+        **os.environ,
+        "DATAGOV_HTTP_REFRESH_INTERVAL": "0",
+    }
+    started = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    wall = time.perf_counter() - started
+    if process.returncode != 0:
+        raise RuntimeError(f"Startup probe failed:\n{process.stderr[-2000:]}")
+    probe = json.loads(process.stdout.strip().splitlines()[-1])
+    return {
+        "process_ms": wall * 1000,
+        "import_ms": probe["import_s"] * 1000,
+        "tools_list_ms": probe["tools_list_s"] * 1000,
+        "tools": probe["tools"],
+        "deferred_modules": probe["deferred_modules"],
+        "deferred_loaded": probe["deferred_loaded"],
+        **summarize(parse_importtime(process.stderr), top),
+    }
+
+
+def format_report(report: dict[str, Any]) -> str:
+    """Render a startup report as text."""
+    lines = [
+        f"Process start to tools/list: {report['process_ms']:.0f} ms",
+        f"  import datagov_mcp.server: {report['import_ms']:.0f} ms "
+        f"({report['modules_imported']} modules)",
+        f"  first tools/list:          {report['tools_list_ms']:.0f} ms ({report['tools']} tools)",
+        "",
+        "Deferred until first call: " + (", ".join(report["deferred_modules"]) or "none"),
+    ]
+    if report["deferred_loaded"]:
+        lines.append("  WARNING: loaded at startup: " + ", ".join(report["deferred_loaded"]))
+    lines += ["", f"{'package':<32}{'self ms':>10}"]
+    lines += [f"{p['package']:<32}{p['self_ms']:>10.1f}" for p in report["packages"]]
+    lines += ["", f"{'datagov_mcp module':<32}{'self ms':>10}{'cumul. ms':>11}"]
+    lines += [
+        f"{m['module']:<32}{m['self_ms']:>10.1f}{m['cumulative_ms']:>11.1f}"
+        for m in report["datagov_mcp"]
+    ]
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--measure-startup", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--top", type=int, default=15, help="Packages to list")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = measure_startup(args.top)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""Streaming, incremental decoding of large datastore responses.
+
+``datastore_search`` returns every record inside one JSON document. Decoding
+it with ``response.json()`` holds the raw body, the decoded text and the full
+object graph in memory at the same time. ``RecordStreamParser`` instead scans
+the body as it arrives and decodes ``result.records`` one record at a time,
+keeping only the text of the record currently being read. Everything outside
+the records array (``fields``, ``total``, ...) is collected separately and
+decoded at the end.
+"""
+
+import codecs
+import json
+import re
+from collections.abc import AsyncIterator
+from typing import Any
+
+import httpx
+
+from datagov_mcp.api import BASE_URL, CircuitOpenError, CKANAPIError
+from datagov_mcp.breaker import circuit_breakers
+from datagov_mcp.client import get_http_client, transfer_stats
+from datagov_mcp.config import env_int
+from datagov_mcp.metrics import metrics
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_MAX_BUFFER_BYTES = 8 * 1024 * 1024
+
+# Responses with more rows than this are streamed by tools that support it
+STREAMING_THRESHOLD_ROWS = env_int("DATAGOV_STREAM_THRESHOLD_ROWS", 1000)
+MAX_BUFFER_BYTES = env_int("DATAGOV_STREAM_MAX_BUFFER_BYTES", DEFAULT_MAX_BUFFER_BYTES)
+
+_STRUCTURAL = re.compile(r'[{}\[\]",:]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_SEPARATORS = re.compile(r"[\s,]*")
+
+# Path of the array whose elements are streamed
+_RECORDS_PATH = ("result", "records")
+
+
+class _Container:
+    __slots__ = ("kind", "key", "expect_key")
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.key: str | None = None
+        self.expect_key = kind == "{"
+
+
+class RecordStreamParser:
+    """
+    Incremental parser that extracts ``result.records`` elements from a CKAN body.
+
+    Feed raw byte chunks with ``feed()``; it returns the records completed by
+    that chunk. After the last chunk, ``finish()`` returns the rest of the
+    document with ``result.records`` emptied.
+
+    Outside the records array the document is scanned structurally to track
+    the current key path. Inside it, each element is decoded directly with
+    the C JSON decoder; an element cut off at the end of a chunk is retried
+    when more data arrives. At most ``max_buffer_bytes`` of undecoded input
+    are held at any time; a single record or the non-record part of the
+    document exceeding that raises ``CKANAPIError``.
+    """
+
+    def __init__(self, max_buffer_bytes: int = DEFAULT_MAX_BUFFER_BYTES):
+        self.max_buffer_bytes = max_buffer_bytes
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._stack: list[_Container] = []
+        self._in_string = False
+        self._string_start = 0
+        self._last_string: str | None = None
+        self._in_records = False
+        self._skeleton: list[str] = []
+        self._skeleton_size = 0
+        self._skeleton_from = 0
+
+    def feed(self, chunk: bytes) -> list[Any]:
+        """Consume a chunk and return the records it completed."""
+        self._buf += self._text.decode(chunk)
+        records: list[Any] = []
+        buf = self._buf
+        end = len(buf)
+        pos = self._pos
+        while pos < end:
+            if self._in_records:
+                pos = _SEPARATORS.match(buf, pos).end()
+                self._skeleton_from = pos
+                if pos >= end:
+                    break
+                if buf[pos] == "]":
+                    self._in_records = False
+                    continue
+                try:
+                    record, pos = self._decoder.raw_decode(buf, pos)
+                except ValueError:
+                    break  # incomplete element; wait for more data
+                records.append(record)
+                self._skeleton_from = pos
+                continue
+
+            if self._in_string:
+                match = _STRING_SPECIAL.search(buf, pos)
+                if match is None:
+                    pos = end
+                    break
+                pos = match.start()
+                if buf[pos] == "\\":  # backslash escapes the next character
+                    if pos + 1 >= end:
+                        break
+                    pos += 2
+                    continue
+                self._in_string = False
+                self._end_string(pos)
+                pos += 1
+                continue
+
+            match = _STRUCTURAL.search(buf, pos)
+            if match is None:
+                pos = end
+                break
+            pos = match.start()
+            char = buf[pos]
+            top = self._stack[-1] if self._stack else None
+            if char == '"':
+                self._in_string = True
+                self._string_start = pos
+            elif char == "{" or char == "[":
+                self._stack.append(_Container(char))
+                if char == "[" and self._path() == _RECORDS_PATH:
+                    self._in_records = True
+                    self._flush_skeleton(pos + 1)
+            elif char == "}" or char == "]":
+                if top is None:
+                    raise CKANAPIError("Invalid JSON response: unbalanced brackets")
+                self._stack.pop()
+            elif char == ":":
+                if top is not None and top.kind == "{":
+                    top.key = self._last_string
+                    top.expect_key = False
+            elif top is not None and top.kind == "{":  # comma
+                top.expect_key = True
+            pos += 1
+        self._pos = pos
+        self._compact()
+        return records
+
+    def finish(self) -> dict[str, Any]:
+        """Return the document without its records, after the last chunk was fed."""
+        self.feed(b"")
+        self._buf += self._text.decode(b"", final=True)
+        if self._in_records and self._pos < len(self._buf):
+            try:
+                self._decoder.raw_decode(self._buf, self._pos)
+            except ValueError as e:
+                raise CKANAPIError(f"Invalid JSON record: {str(e)}")
+        if self._stack or self._in_string:
+            raise CKANAPIError("Truncated JSON response")
+        self._flush_skeleton(len(self._buf))
+        try:
+            return json.loads("".join(self._skeleton))
+        except ValueError as e:
+            raise CKANAPIError(f"Invalid JSON response: {str(e)}")
+
+    def _path(self) -> tuple[str | None, ...]:
+        stack = self._stack
+        if len(stack) != len(_RECORDS_PATH) + 1 or any(c.kind != "{" for c in stack[:-1]):
+            return ()
+        return tuple(c.key for c in stack[:-1])
+
+    def _end_string(self, pos: int) -> None:
+        top = self._stack[-1] if self._stack else None
+        if top is not None and top.kind == "{" and top.expect_key:
+            self._last_string = json.loads(self._buf[self._string_start : pos + 1])
+
+    def _flush_skeleton(self, upto: int) -> None:
+        if upto > self._skeleton_from:
+            piece = self._buf[self._skeleton_from : upto]
+            self._skeleton.append(piece)
+            self._skeleton_size += len(piece)
+            self._skeleton_from = upto
+
+    def _compact(self) -> None:
+        boundary = self._string_start if self._in_string else self._pos
+        if not self._in_records:
+            self._flush_skeleton(boundary)
+        if boundary:
+            self._buf = self._buf[boundary:]
+            self._pos -= boundary
+            self._string_start -= boundary
+            self._skeleton_from -= boundary
+        if len(self._buf) > self.max_buffer_bytes or self._skeleton_size > self.max_buffer_bytes:
+            raise CKANAPIError(
+                f"Streaming buffer exceeded {self.max_buffer_bytes} bytes; "
+                "a single record or the response metadata is too large"
+            )
+
+
+class RecordStream:
+    """
+    Async iterator over batches of ``result.records`` from a streamed CKAN call.
+
+    Iterating yields lists of up to ``batch_size`` records. Once iteration is
+    complete, ``metadata`` holds the rest of the ``result`` object (``fields``,
+    ``total``, ...). Streamed calls bypass the response cache and are not
+    retried, because records already handed to the caller cannot be replayed.
+    They are still guarded by the circuit breaker.
+    """
+
+    def __init__(
+        self,
+        action: str,
+        params: dict[str, Any],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_buffer_bytes: int | None = None,
+    ):
+        self.action = action
+        self.params = params
+        self.batch_size = batch_size
+        self.max_buffer_bytes = MAX_BUFFER_BYTES if max_buffer_bytes is None else max_buffer_bytes
+        self.metadata: dict[str, Any] | None = None
+
+    async def __aiter__(self) -> AsyncIterator[list[Any]]:
+        breaker = circuit_breakers.for_action(self.action)
+        if not breaker.allow():
+            raise CircuitOpenError(
+                f"Circuit breaker for {breaker.name} API is open; "
+                f"retry in {breaker.retry_in():.0f}s",
+                status_code=503,
+            )
+
+        parser = RecordStreamParser(self.max_buffer_bytes)
+        url = f"{BASE_URL}/action/{self.action}"
+        healthy = None
+        status = None
+        started = metrics.upstream_started(self.action)
+        try:
+            async with get_http_client() as client:
+                async with client.stream("GET", url, params=self.params) as response:
+                    status = response.status_code
+                    healthy = status < 500
+                    if response.is_error:
+                        body = await response.aread()
+                        transfer_stats.record_response(self.action, response)
+                        raise CKANAPIError(
+                            f"HTTP {response.status_code}: {body.decode(errors='replace')}",
+                            status_code=response.status_code,
+                        )
+                    batch: list[Any] = []
+                    decompressed = 0
+                    try:
+                        async for chunk in response.aiter_bytes():
+                            decompressed += len(chunk)
+                            batch.extend(parser.feed(chunk))
+                            while len(batch) >= self.batch_size:
+                                yield batch[: self.batch_size]
+                                batch = batch[self.batch_size :]
+                    finally:
+                        transfer_stats.record(
+                            self.action,
+                            response.headers.get("Content-Encoding", "identity"),
+                            response.num_bytes_downloaded,
+                            decompressed,
+                        )
+        except httpx.RequestError as e:
+            healthy = False
+            raise CKANAPIError(f"Request error: {str(e)}")
+        finally:
+            breaker.record(healthy)
+            metrics.upstream_finished(self.action, started, status)
+
+        document = parser.finish()
+        if not document.get("success", False):
+            error_msg = document.get("error", {})
+            if isinstance(error_msg, dict):
+                error_msg = error_msg.get("message", str(error_msg))
+            raise CKANAPIError(f"CKAN API error: {error_msg}")
+        result = document.get("result", {})
+        result.pop("records", None)
+        self.metadata = result
+        if batch:
+            yield batch
+
+
+def stream_records(
+    action: str,
+    params: dict[str, Any],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_buffer_bytes: int | None = None,
+) -> RecordStream:
+    """Stream ``result.records`` of a CKAN call in batches. See ``RecordStream``."""
+    return RecordStream(action, params, batch_size, max_buffer_bytes)
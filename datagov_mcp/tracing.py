@@ -0,0 +1,253 @@
+"""Lightweight tracing: nested spans for tool calls, CKAN requests and processing.
+
+Code opens spans with ``with span("name", key=value):``. The active tracer
+decides what happens:
+
+- ``NoopTracer`` (default): spans are a shared no-op object.
+- ``RecordingTracer``: finished spans are kept in memory, and optionally
+  logged, with parent/child links and durations.
+- ``OpenTelemetryTracer``: spans are forwarded to the OpenTelemetry API, and
+  exported by whatever SDK and exporter the process configures
+  (``pip install 'datagov-mcp[tracing]'``).
+
+The current span is held in a ``ContextVar``, so it propagates into asyncio
+tasks created while it is active. Work coalesced by ``SingleFlight`` is
+therefore traced under the caller that started it.
+"""
+
+import importlib.util
+import logging
+import os
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any
+
+from datagov_mcp.config import env_int, env_str
+
+logger = logging.getLogger(__name__)
+
+AttributeValue = str | int | float | bool
+
+
+class _NoopSpan:
+    """Span that records nothing; returned by ``NoopTracer``."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+    def set_attribute(self, key: str, value: AttributeValue) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class NoopTracer:
+    """Tracer that discards everything."""
+
+    name = "off"
+
+    def start_span(self, name: str, attributes: dict[str, AttributeValue]) -> _NoopSpan:
+        return NOOP_SPAN
+
+    def current_span(self) -> _NoopSpan:
+        return NOOP_SPAN
+
+
+class Span:
+    """A timed operation recorded by ``RecordingTracer``."""
+
+    __slots__ = (
+        "name",
+        "attributes",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start",
+        "end",
+        "error",
+        "_tracer",
+        "_token",
+    )
+
+    def __init__(
+        self,
+        tracer: "RecordingTracer",
+        name: str,
+        attributes: dict[str, AttributeValue],
+        parent: "Span | None",
+    ):
+        self.name = name
+        self.attributes = dict(attributes)
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start = 0.0
+        self.end: float | None = None
+        self.error: str | None = None
+        self._tracer = tracer
+        self._token = None
+
+    @property
+    def duration(self) -> float | None:
+        """Seconds between entering and leaving the span, once finished."""
+        return None if self.end is None else self.end - self.start
+
+    def set_attribute(self, key: str, value: AttributeValue) -> None:
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end = time.perf_counter()
+        if exc is not None:
+            self.error = f"{type(exc).__name__}: {exc}"
+        _current_span.reset(self._token)
+        self._tracer._finish(self)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "duration": self.duration,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+_current_span: ContextVar[Span | None] = ContextVar("datagov_current_span", default=None)
+
+
+class RecordingTracer:
+    """
+    Tracer that keeps the most recent finished spans in memory.
+
+    With ``log=True`` every finished span is also logged at INFO level with
+    its duration, which is enough to see where a slow tool call spends time
+    without an OpenTelemetry backend.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_spans: int = 10_000, log: bool = False):
+        self.spans: deque[Span] = deque(maxlen=max_spans)
+        self.log = log
+        if log:
+            self.name = "log"
+
+    def start_span(self, name: str, attributes: dict[str, AttributeValue]) -> Span:
+        return Span(self, name, attributes, _current_span.get())
+
+    def current_span(self) -> Span | _NoopSpan:
+        return _current_span.get() or NOOP_SPAN
+
+    def clear(self) -> None:
+        """Drop recorded spans."""
+        self.spans.clear()
+
+    def _finish(self, span: Span) -> None:
+        self.spans.append(span)
+        if self.log:
+            logger.info(
+                "span %s %.1fms trace=%s parent=%s %s%s",
+                span.name,
+                span.duration * 1000,
+                span.trace_id[:8],
+                span.parent_id or "-",
+                span.attributes,
+                f" error={span.error}" if span.error else "",
+            )
+
+
+class OpenTelemetryTracer:
+    """Tracer that forwards spans to the OpenTelemetry API."""
+
+    name = "otel"
+
+    def __init__(self):
+        from opentelemetry import trace
+
+        self._trace = trace
+        self._tracer = trace.get_tracer("datagov_mcp")
+
+    def start_span(self, name: str, attributes: dict[str, AttributeValue]) -> Any:
+        return self._tracer.start_as_current_span(name, attributes=attributes)
+
+    def current_span(self) -> Any:
+        return self._trace.get_current_span()
+
+
+Tracer = NoopTracer | RecordingTracer | OpenTelemetryTracer
+
+
+def opentelemetry_available() -> bool:
+    """Return True if the OpenTelemetry API is installed."""
+    return importlib.util.find_spec("opentelemetry") is not None
+
+
+def make_tracer(name: str = "off") -> Tracer:
+    """
+    Build a tracer by name.
+
+    Args:
+        name: 'off', 'memory', 'log' or 'otel'
+
+    Returns:
+        The tracer; 'otel' falls back to 'off' if OpenTelemetry is not installed
+    """
+    if name == "memory":
+        return RecordingTracer(max_spans=env_int("DATAGOV_TRACING_MAX_SPANS", 10_000))
+    if name == "log":
+        return RecordingTracer(max_spans=env_int("DATAGOV_TRACING_MAX_SPANS", 10_000), log=True)
+    if name == "otel":
+        if opentelemetry_available():
+            return OpenTelemetryTracer()
+        logger.warning(
+            "OpenTelemetry tracing requested but opentelemetry-api is not installed. "
+            "Install with: pip install 'datagov-mcp[tracing]'"
+        )
+    elif name not in ("", "off"):
+        logger.warning("Unknown tracer %r; tracing disabled", name)
+    return NoopTracer()
+
+
+def set_tracer(tracer: Tracer) -> Tracer:
+    """Install a tracer process-wide and return it."""
+    global _tracer
+    _tracer = tracer
+    return tracer
+
+
+def get_tracer() -> Tracer:
+    """Return the active tracer."""
+    return _tracer
+
+
+def span(name: str, **attributes: AttributeValue) -> Any:
+    """
+    Open a span as a context manager: ``with span("ckan.request", action=a):``.
+
+    Nested spans become children of the current span, including across
+    asyncio tasks started inside it.
+    """
+    return _tracer.start_span(name, attributes)
+
+
+def current_span() -> Any:
+    """Return the current span, to add attributes; a no-op span if there is none."""
+    return _tracer.current_span()
+
+
+# Global tracer, selected with DATAGOV_TRACING=off|memory|log|otel
+_tracer: Tracer = make_tracer(env_str("DATAGOV_TRACING", "off").lower())
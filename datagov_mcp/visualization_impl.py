@@ -0,0 +1,548 @@
+"""
+Implementation of the visualization and data profiling tools.
+
+Imported on the first call of a visualization tool rather than at server
+startup; see :mod:`datagov_mcp.visualization` for the tool definitions.
+"""
+
+from typing import Any
+
+from fastmcp import Context
+
+from datagov_mcp import columnar, json_codec
+from datagov_mcp.aggregation import (
+    AGGREGATES,
+    fetch_columns,
+    group_values,
+    histogram_bins,
+    profile_stats,
+    resource_groups,
+    resource_histogram,
+)
+from datagov_mcp.api import CKANAPIError
+from datagov_mcp.pushdown import bbox_ranges, plan_scan, scan, stream_scan
+from datagov_mcp.records import ColumnPage, search_columns
+from datagov_mcp.streaming import STREAMING_THRESHOLD_ROWS
+from datagov_mcp.tracing import span
+
+# Bins of histograms computed before charting; Vega-Lite's own default is 10
+HISTOGRAM_BINS = 10
+
+
+def infer_field_type(values: list[Any]) -> str:
+    """Infer the type of a field from sample values."""
+    if not values:
+        return "unknown"
+
+    # Remove None values
+    non_null = [v for v in values if v is not None]
+    if not non_null:
+        return "null"
+
+    # Check if numeric
+    try:
+        numeric_values = [float(v) for v in non_null if v != ""]
+        if len(numeric_values) > len(non_null) * 0.8:  # 80% numeric
+            # Check if integer
+            if all(v == int(v) for v in numeric_values):
+                return "integer"
+            return "number"
+    except (ValueError, TypeError):
+        pass
+
+    # Check for lat/lon patterns
+    sample_str = str(non_null[0]).lower()
+    if any(
+        keyword in sample_str for keyword in ["lat", "latitude", "lng", "lon", "longitude", "coord"]
+    ):
+        return "coordinate"
+
+    return "string"
+
+
+def calculate_stats(values: list[Any], field_type: str) -> dict[str, Any]:
+    """Calculate statistics for a field based on its type."""
+    stats = {"count": len(values), "null_count": sum(1 for v in values if v is None)}
+
+    non_null = [v for v in values if v is not None]
+    if not non_null:
+        return stats
+
+    if field_type in ["integer", "number"]:
+        try:
+            numeric = [float(v) for v in non_null if v != ""]
+            if numeric:
+                stats.update(
+                    {
+                        "min": min(numeric),
+                        "max": max(numeric),
+                        "mean": sum(numeric) / len(numeric),
+                    }
+                )
+        except (ValueError, TypeError):
+            pass
+    elif field_type == "string":
+        # Top values for categorical
+        from collections import Counter
+
+        counter = Counter(str(v) for v in non_null)
+        stats["unique_count"] = len(counter)
+        stats["top_values"] = dict(counter.most_common(5))
+
+    return stats
+
+
+def record_to_feature(
+    record: dict[str, Any], lat_field: str, lon_field: str
+) -> dict[str, Any] | None:
+    """Convert a record to a GeoJSON point feature, or None if its coordinates are invalid."""
+    try:
+        lat = float(record.get(lat_field, 0))
+        lon = float(record.get(lon_field, 0))
+    except (ValueError, TypeError):
+        return None
+
+    if not (lat and lon):  # Skip invalid coordinates
+        return None
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [lon, lat]},
+        "properties": {k: v for k, v in record.items() if k not in [lat_field, lon_field]},
+    }
+
+
+def records_to_features(
+    records: list[dict[str, Any]], lat_field: str, lon_field: str
+) -> list[dict[str, Any]]:
+    """Convert records to GeoJSON point features, skipping invalid coordinates."""
+    features = []
+    for record in records:
+        feature = record_to_feature(record, lat_field, lon_field)
+        if feature is not None:
+            features.append(feature)
+    return features
+
+
+def build_chart_spec(
+    records: list[dict[str, Any]],
+    chart_type: str,
+    x_field: str,
+    y_field: str = "",
+    title: str = "",
+) -> dict[str, Any] | None:
+    """Build a Vega-Lite spec with inline data, or None for an unsupported chart type."""
+    spec = {
+        "$schema": "https://vega.github.io/schema/vega-lite/v5.json",
+        "title": title or f"{chart_type.capitalize()} Chart",
+        "data": {"values": records},
+        "width": 600,
+        "height": 400,
+    }
+
+    # Chart-specific configurations
+    if chart_type == "histogram":
+        spec["mark"] = "bar"
+        spec["encoding"] = {
+            "x": {"field": x_field, "bin": True, "title": x_field},
+            "y": {"aggregate": "count", "title": "Count"},
+        }
+    elif chart_type == "bar":
+        spec["mark"] = "bar"
+        spec["encoding"] = {
+            "x": {"field": x_field, "title": x_field},
+            "y": {"field": y_field, "type": "quantitative", "title": y_field},
+        }
+    elif chart_type == "line":
+        spec["mark"] = {"type": "line", "point": True}
+        spec["encoding"] = {
+            "x": {"field": x_field, "title": x_field},
+            "y": {"field": y_field, "type": "quantitative", "title": y_field},
+        }
+    elif chart_type == "scatter":
+        spec["mark"] = "point"
+        spec["encoding"] = {
+            "x": {"field": x_field, "type": "quantitative", "title": x_field},
+            "y": {"field": y_field, "type": "quantitative", "title": y_field},
+        }
+    else:
+        return None
+    return spec
+
+
+def build_binned_histogram_spec(
+    bins: list[dict[str, Any]], x_field: str, title: str = ""
+) -> dict[str, Any]:
+    """Build a Vega-Lite histogram spec from precomputed ``{bin_start, bin_end, count}`` rows."""
+    return {
+        "$schema": "https://vega.github.io/schema/vega-lite/v5.json",
+        "title": title or "Histogram Chart",
+        "data": {"values": bins},
+        "width": 600,
+        "height": 400,
+        "mark": "bar",
+        "encoding": {
+            "x": {"field": "bin_start", "bin": {"binned": True}, "title": x_field},
+            "x2": {"field": "bin_end"},
+            "y": {"field": "count", "type": "quantitative", "title": "Count"},
+        },
+    }
+
+
+def build_grouped_chart_spec(
+    groups: list[dict[str, Any]],
+    chart_type: str,
+    x_field: str,
+    y_field: str,
+    aggregate: str,
+    title: str = "",
+) -> dict[str, Any] | None:
+    """Build a bar or line spec from aggregated ``{x, y}`` rows."""
+    y_name = y_field if aggregate != "count" else "count"
+    records = [{x_field: row["x"], y_name: row["y"]} for row in groups]
+    spec = build_chart_spec(records, chart_type, x_field, y_name, title)
+    if spec is not None:
+        spec["encoding"]["y"]["title"] = f"{aggregate} of {y_field}" if y_field else "Count"
+    return spec
+
+
+def profile_fields(
+    table: ColumnPage | columnar.StoredTable,
+    types: dict[str, str] | None = None,
+    limit: int | None = None,
+) -> list[dict[str, Any]]:
+    """Profile each field (except ``_id``) of a table's first rows, inferring types unless given."""
+    field_profiles = []
+    for field_name in table.columns:
+        if field_name == "_id" or (types and field_name not in types):  # Skip internal ID
+            continue
+
+        values = table.column(field_name, limit)
+        field_type = types[field_name] if types else infer_field_type(values)
+        field_profiles.append(
+            field_profile(field_name, field_type, calculate_stats(values, field_type))
+        )
+    return field_profiles
+
+
+def field_profile(name: str, field_type: str, stats: dict[str, Any]) -> dict[str, Any]:
+    """Assemble the profile of one field from its statistics."""
+    return {
+        "name": name,
+        "type": field_type,
+        "stats": stats,
+        "missingness": stats["null_count"] / stats["count"] if stats["count"] > 0 else 0,
+    }
+
+
+def render_chart_html(spec: dict[str, Any]) -> str:
+    """Render a standalone HTML page embedding a Vega-Lite spec."""
+    spec_json = json_codec.dumps(spec)
+    return f"""
+<!DOCTYPE html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <script src="https://cdn.jsdelivr.net/npm/vega@5"></script>
+  <script src="https://cdn.jsdelivr.net/npm/vega-lite@5"></script>
+  <script src="https://cdn.jsdelivr.net/npm/vega-embed@6"></script>
+</head>
+<body>
+  <div id="vis"></div>
+  <script type="text/javascript">
+    var spec = {spec_json};
+    vegaEmbed('#vis', spec);
+  </script>
+</body>
+</html>
+"""
+
+
+def map_center(features: list[dict[str, Any]]) -> tuple[float, float]:
+    """Mean latitude and longitude of point features."""
+    lats = [f["geometry"]["coordinates"][1] for f in features]
+    lons = [f["geometry"]["coordinates"][0] for f in features]
+    return sum(lats) / len(lats), sum(lons) / len(lons)
+
+
+def render_map_html(geojson: dict[str, Any], center_lat: float, center_lon: float) -> str:
+    """Render a standalone Leaflet HTML page for a GeoJSON feature collection."""
+    geojson_json = json_codec.dumps(geojson)
+    return f"""
+<!DOCTYPE html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css"/>
+  <script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
+  <style>
+    #map {{ height: 600px; width: 100%; }}
+  </style>
+</head>
+<body>
+  <div id="map"></div>
+  <script>
+    var map = L.map('map').setView([{center_lat}, {center_lon}], 10);
+    L.tileLayer('https://{{s}}.tile.openstreetmap.org/{{z}}/{{x}}/{{y}}.png', {{
+      attribution: '© OpenStreetMap contributors'
+    }}).addTo(map);
+    
+    var geojson = {geojson_json};
+    L.geoJSON(geojson, {{
+      onEachFeature: function(feature, layer) {{
+        if (feature.properties) {{
+          var popup = Object.entries(feature.properties)
+            .map(([k,v]) => `<b>${{k}}</b>: ${{v}}`)
+            .join('<br>');
+          layer.bindPopup(popup);
+        }}
+      }}
+    }}).addTo(map);
+  </script>
+</body>
+</html>
+"""
+
+
+async def local_table(resource_id: str) -> columnar.StoredTable | None:
+    """The resource's copy in the local column store, or None when the store is disabled."""
+    store = columnar.column_store
+    if store is None:
+        return None
+    with span("column_store.table", resource_id=resource_id):
+        return await store.table(resource_id)
+
+
+async def dataset_profile(
+    ctx: Context, resource_id: str, sample_size: int = 100, whole_resource: bool = False
+) -> dict:
+    """Profile a sample or the whole of a resource; see ``visualization.dataset_profile``."""
+    await ctx.info(f"Profiling resource: {resource_id}")
+
+    try:
+        table = await local_table(resource_id)
+        # Fetch sample data
+        sample = table if table is not None else await search_columns(resource_id, sample_size)
+        rows = min(sample.rows, sample_size)
+
+        if not rows:
+            return {"error": "No records found in resource"}
+
+        with span("dataset_profile.analyze", records=rows, fields=len(sample.fields)):
+            field_profiles = profile_fields(sample, limit=sample_size)
+
+        profile = {
+            "resource_id": resource_id,
+            "sample_size": rows,
+            "total_fields": len(field_profiles),
+            "fields": field_profiles,
+        }
+        if whole_resource:
+            profile.update(
+                await _profile_resource(resource_id, sample.fields, field_profiles, table)
+            )
+        return profile
+
+    except CKANAPIError as e:
+        await ctx.error(f"Failed to profile dataset: {e.message}")
+        return {"error": str(e.message)}
+
+
+async def _profile_resource(
+    resource_id: str,
+    fields: list[dict[str, Any]],
+    sample_profiles: list[dict[str, Any]],
+    table: columnar.StoredTable | None = None,
+) -> dict[str, Any]:
+    """Recompute field statistics over every row, keeping the types inferred from the sample."""
+    types = {p["name"]: p["type"] for p in sample_profiles}
+    if table is not None:
+        with span("dataset_profile.analyze", records=table.rows, fields=len(types)):
+            field_profiles = profile_fields(table, types)
+        return {
+            "fields": field_profiles,
+            "row_count": table.rows,
+            "computed": "local",
+            "truncated": table.truncated,
+        }
+
+    db_types = {f.get("id"): f.get("type", "") for f in fields}
+    specs = [(name, kind, db_types.get(name, "")) for name, kind in types.items()]
+
+    stats = await profile_stats(resource_id, specs)
+    if stats is not None:
+        field_profiles = [field_profile(name, types[name], stats[name]) for name in types]
+        rows = field_profiles[0]["stats"]["count"] if field_profiles else 0
+        return {"fields": field_profiles, "row_count": rows, "computed": "sql"}
+
+    fetched = await fetch_columns(resource_id, list(types))
+    with span("dataset_profile.analyze", records=fetched["returned"], fields=len(types)):
+        field_profiles = profile_fields(
+            ColumnPage.from_records(fetched["fields"], fetched["records"]), types
+        )
+    return {
+        "fields": field_profiles,
+        "row_count": fetched["returned"],
+        "computed": "client",
+        "truncated": fetched["truncated"],
+    }
+
+
+async def chart_generator(
+    ctx: Context,
+    resource_id: str,
+    chart_type: str,
+    x_field: str,
+    y_field: str = "",
+    title: str = "",
+    limit: int = 100,
+    aggregate: str = "",
+    whole_resource: bool = False,
+    filters: dict[str, Any] | None = None,
+) -> dict:
+    """Build a Vega-Lite chart; see ``visualization.chart_generator``."""
+    await ctx.info(f"Generating {chart_type} chart for resource: {resource_id}")
+
+    if aggregate and aggregate not in AGGREGATES:
+        return {"error": f"Unsupported aggregate: {aggregate}"}
+    if aggregate and chart_type not in ("bar", "line"):
+        return {"error": "aggregate applies to bar and line charts"}
+    if whole_resource and chart_type not in ("histogram", "bar", "line"):
+        return {"error": f"whole_resource is not supported for {chart_type} charts"}
+
+    try:
+        plan = plan_scan(resource_id, [x_field, y_field], filters)
+        table = await local_table(resource_id)
+        if whole_resource:
+            return await _chart_resource(
+                resource_id, chart_type, x_field, y_field, title, limit, aggregate, table, filters
+            )
+
+        # Fetch only the charted columns of matching rows
+        records = await scan(plan, limit, table)
+
+        if not records:
+            return {"error": "No records found in resource"}
+
+        if aggregate:
+            order = "key" if chart_type == "line" else "value"
+            groups = group_values(records, x_field, y_field, aggregate, order, limit)
+            spec = build_grouped_chart_spec(groups, chart_type, x_field, y_field, aggregate, title)
+        else:
+            spec = build_chart_spec(records, chart_type, x_field, y_field, title)
+        if spec is None:
+            return {"error": f"Unsupported chart type: {chart_type}"}
+
+        # Generate HTML rendering
+        with span("chart_generator.render", records=len(records)):
+            html = render_chart_html(spec)
+
+        return {"vega_lite_spec": spec, "html": html}
+
+    except CKANAPIError as e:
+        await ctx.error(f"Failed to generate chart: {e.message}")
+        return {"error": str(e.message)}
+
+
+async def _chart_resource(
+    resource_id: str,
+    chart_type: str,
+    x_field: str,
+    y_field: str,
+    title: str,
+    limit: int,
+    aggregate: str,
+    table: columnar.StoredTable | None = None,
+    filters: dict[str, Any] | None = None,
+) -> dict:
+    """Chart aggregates over every (matching) row instead of the first ``limit`` records."""
+    local = {"computed": "local", "truncated": table.truncated} if table is not None else None
+    if table is not None:
+        records = await scan(plan_scan(resource_id, [x_field, y_field], filters), table.rows, table)
+    if chart_type == "histogram":
+        if table is not None:
+            values = (record.get(x_field) for record in records)
+            bins, computed = histogram_bins(values, HISTOGRAM_BINS), local
+        else:
+            bins, computed = await resource_histogram(resource_id, x_field, HISTOGRAM_BINS, filters)
+        if not bins:
+            return {"error": f"No numeric values found in field: {x_field}"}
+        spec = build_binned_histogram_spec(bins, x_field, title)
+    else:
+        aggregate = aggregate or ("sum" if y_field else "count")
+        order = "key" if chart_type == "line" else "value"
+        if table is not None:
+            groups = group_values(records, x_field, y_field, aggregate, order, limit)
+            computed = local
+        else:
+            groups, computed = await resource_groups(
+                resource_id, x_field, y_field, aggregate, order, limit, filters
+            )
+        if not groups:
+            return {"error": "No records found in resource"}
+        spec = build_grouped_chart_spec(groups, chart_type, x_field, y_field, aggregate, title)
+
+    with span("chart_generator.render", records=len(spec["data"]["values"])):
+        html = render_chart_html(spec)
+    return {"vega_lite_spec": spec, "html": html, "aggregation": computed}
+
+
+async def map_generator(
+    ctx: Context,
+    resource_id: str,
+    lat_field: str,
+    lon_field: str,
+    limit: int = 500,
+    popup_fields: list[str] | None = None,
+    bbox: list[float] | None = None,
+    filters: dict[str, Any] | None = None,
+) -> dict:
+    """Build a GeoJSON map; see ``visualization.map_generator``."""
+    await ctx.info(f"Generating map for resource: {resource_id}")
+
+    try:
+        plan = plan_scan(
+            resource_id,
+            [lat_field, lon_field, *(popup_fields or [])],
+            filters,
+            not_null=[lat_field, lon_field],
+            ranges=bbox_ranges(lat_field, lon_field, bbox),
+        )
+        features = []
+        record_count = 0
+        table = await local_table(resource_id)
+
+        if table is None and not plan.ranges and limit > STREAMING_THRESHOLD_ROWS:
+            # Stream large responses so raw and decoded records are never all held at once
+            with span("map_generator.stream", limit=limit):
+                async for batch in stream_scan(plan, limit):
+                    record_count += len(batch)
+                    features.extend(records_to_features(batch, lat_field, lon_field))
+        else:
+            records = await scan(plan, limit, table)
+            record_count = len(records)
+            with span("map_generator.features", records=record_count):
+                features = records_to_features(records, lat_field, lon_field)
+
+        if not record_count:
+            return {"error": "No records found in resource"}
+
+        if not features:
+            return {"error": "No valid geographic coordinates found"}
+
+        geojson = {"type": "FeatureCollection", "features": features}
+
+        with span("map_generator.render", features=len(features)):
+            # Center the map on the mean coordinates
+            center_lat, center_lon = map_center(features)
+            html = render_map_html(geojson, center_lat, center_lon)
+
+        return {
+            "geojson": geojson,
+            "html": html,
+            "point_count": len(features),
+            "center": {"lat": center_lat, "lon": center_lon},
+        }
+
+    except CKANAPIError as e:
+        await ctx.error(f"Failed to generate map: {e.message}")
+        return {"error": str(e.message)}
@@ -7,9 +7,21 @@ This file maintains backward compatibility for existing users who run:
     fastmcp install claude desktop server.py
 
 The actual implementation is in the datagov_mcp package.
+
+Run ``python server.py --measure-startup`` to report per-module import cost
+and the time to the first ``tools/list``.
 """
 
-from datagov_mcp.server import mcp
+import sys
+
+if __name__ == "__main__" and "--measure-startup" in sys.argv[1:]:
+    # Checked before importing the server so the report measures a cold start
+    from datagov_mcp.startup import main
+
+    main(sys.argv[1:])
+    sys.exit()
+
+from datagov_mcp.server import mcp  # noqa: E402
 
 if __name__ == "__main__":
     # This code only runs when the file is executed directly
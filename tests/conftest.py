@@ -0,0 +1,69 @@
+"""Shared fixtures for the test suite."""
+
+import httpx
+import pytest
+
+from benchmarks.fake_ckan import FakeCKAN, FakeCKANConfig
+from datagov_mcp import api, columnar, disk_cache
+from datagov_mcp.breaker import circuit_breakers
+from datagov_mcp.cache import response_cache
+from datagov_mcp.client import _http_client, transfer_stats
+from datagov_mcp.metrics import metrics
+from datagov_mcp.pagination import sql_support
+from datagov_mcp.resolver import resource_index
+from datagov_mcp.retry import retry_budget, retry_policy
+from datagov_mcp.singleflight import inflight_requests
+
+FAKE_URL = "http://fake-ckan/api/3"
+
+
+class ManualClock:
+    """Clock that only moves when a test sets or advances ``now``."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def reset_shared_state(monkeypatch):
+    """Reset process-wide state so tests don't observe each other's responses."""
+    response_cache.clear()
+    inflight_requests.clear()
+    retry_budget.reset()
+    circuit_breakers.reset()
+    transfer_stats.reset()
+    metrics.reset()
+    sql_support.reset()
+    resource_index.clear()
+    monkeypatch.setattr(disk_cache, "persistent_cache", None)
+    monkeypatch.setattr(columnar, "column_store", None)
+    # Retry immediately so retry tests don't sleep
+    monkeypatch.setattr(retry_policy, "base_delay", 0.0)
+    monkeypatch.setattr(retry_policy, "max_retry_after", 0.0)
+    yield
+    response_cache.clear()
+    inflight_requests.clear()
+
+
+@pytest.fixture
+def clock() -> ManualClock:
+    """A manually advanced clock for TTL, refill and open-duration tests."""
+    return ManualClock()
+
+
+@pytest.fixture
+def fake(request, monkeypatch):
+    """A fake CKAN wired in as the server's upstream.
+
+    Configure it with ``@pytest.mark.fake_ckan(**options)``, where the options are
+    ``FakeCKANConfig`` fields; the closest marker wins.
+    """
+    marker = request.node.get_closest_marker("fake_ckan")
+    fake = FakeCKAN(FakeCKANConfig(**(marker.kwargs if marker else {})))
+    monkeypatch.setattr(api, "BASE_URL", FAKE_URL)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake.app()))
+    monkeypatch.setattr(_http_client, "_client", client)
+    return fake
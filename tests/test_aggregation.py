@@ -0,0 +1,234 @@
+"""Tests for aggregates computed in the datastore, and their client-side fallbacks."""
+
+import httpx
+import pytest
+import respx
+
+from datagov_mcp.aggregation import (
+    group_sql,
+    group_values,
+    histogram_bins,
+    histogram_sql,
+    numeric_expression,
+    profile_sql,
+)
+from datagov_mcp.api import BASE_URL
+from datagov_mcp.visualization import chart_generator, dataset_profile
+
+RECORDS = [
+    {"_id": 1, "city": "חיפה", "value": "10"},
+    {"_id": 2, "city": "חיפה", "value": "30"},
+    {"_id": 3, "city": "ירושלים", "value": None},
+    {"_id": 4, "city": None, "value": "20.5"},
+]
+FIELDS = [
+    {"id": "_id", "type": "int"},
+    {"id": "city", "type": "text"},
+    {"id": "value", "type": "text"},
+]
+
+
+class MockContext:
+    """Mock Context for testing."""
+
+    def __init__(self):
+        self.info_messages = []
+        self.error_messages = []
+
+    async def info(self, message: str):
+        self.info_messages.append(message)
+
+    async def error(self, message: str):
+        self.error_messages.append(message)
+
+
+def ok(result):
+    return httpx.Response(200, json={"success": True, "result": result})
+
+
+def mock_datastore_search():
+    return respx.get(f"{BASE_URL}/action/datastore_search").mock(
+        return_value=ok({"records": RECORDS, "fields": FIELDS})
+    )
+
+
+def mock_sql(answer):
+    """Route datastore_search_sql to ``answer(sql)``, recording the statements."""
+    statements = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        statements.append(request.url.params["sql"])
+        return answer(statements[-1])
+
+    respx.get(f"{BASE_URL}/action/datastore_search_sql").mock(side_effect=handler)
+    return statements
+
+
+class TestCompile:
+    """Test compiling aggregates to SQL."""
+
+    def test_numeric_expression(self):
+        assert numeric_expression("n", "int4") == '"n"'
+        assert numeric_expression("n", "text").startswith('CASE WHEN "n" ~ ')
+        assert numeric_expression("n", "timestamp") is None
+
+    def test_profile_sql(self):
+        sql = profile_sql("r1", [("city", "string", "text"), ("n", "integer", "int4")])
+        assert sql == (
+            'SELECT count(*) AS "rows", count("city") AS "n0", '
+            'count(DISTINCT "city") AS "unique0", count("n") AS "n1", '
+            'min("n") AS "min1", max("n") AS "max1", avg("n") AS "mean1" FROM "r1"'
+        )
+
+    def test_histogram_and_group_sql(self):
+        assert histogram_sql("r1", "when", "timestamp", 10) is None
+        assert "least(floor((x - lo) * 10 / nullif(hi - lo, 0)), 9)" in histogram_sql(
+            "r1", "n", "int4", 10
+        )
+        assert group_sql("r1", "city", "", "", "count", limit=5) == (
+            'SELECT "city" AS "x", count(*) AS "y" FROM "r1" '
+            "GROUP BY 1 ORDER BY 2 DESC NULLS LAST, 1 LIMIT 5"
+        )
+        assert group_sql("r1", "year", "n", "int4", "mean", order="key").startswith(
+            'SELECT "year" AS "x", avg("n") AS "y"'
+        )
+
+
+class TestClientSide:
+    """Test the client-side equivalents."""
+
+    def test_histogram_bins(self):
+        bins = histogram_bins([0, "5", 10, None, "", "x", 10], bins=2)
+        assert bins == [
+            {"bin_start": 0.0, "bin_end": 5.0, "count": 1},
+            {"bin_start": 5.0, "bin_end": 10.0, "count": 3},
+        ]
+        assert histogram_bins([3, 3], bins=4) == [{"bin_start": 3.0, "bin_end": 3.0, "count": 2}]
+        assert histogram_bins([None], bins=4) == []
+
+    def test_group_values(self):
+        assert group_values(RECORDS, "city", "value", "sum") == [
+            {"x": "חיפה", "y": 40.0},
+            {"x": None, "y": 20.5},
+            {"x": "ירושלים", "y": None},
+        ]
+        assert group_values(RECORDS, "city", "", "count", order="key", limit=2) == [
+            {"x": "חיפה", "y": 2},
+            {"x": "ירושלים", "y": 1},
+        ]
+
+
+@pytest.mark.asyncio
+class TestPushdown:
+    """Test the tools computing aggregates in SQL or client-side."""
+
+    @respx.mock
+    async def test_profile_whole_resource_in_sql(self):
+        mock_datastore_search()
+
+        def answer(sql):
+            if sql.startswith('SELECT "f"'):
+                return ok({"records": [{"f": 0, "value": "חיפה", "n": 600}]})
+            profile = {"rows": 1000, "n0": 900, "unique0": 7}
+            profile.update({"n1": 950, "min1": "1", "max1": "99.5", "mean1": "42.25"})
+            return ok({"records": [profile]})
+
+        statements = mock_sql(answer)
+
+        result = await dataset_profile.fn(MockContext(), resource_id="r1", whole_resource=True)
+
+        assert result["computed"] == "sql"
+        assert result["row_count"] == 1000
+        city, value = result["fields"]
+        assert city["stats"] == {
+            "count": 1000,
+            "null_count": 100,
+            "unique_count": 7,
+            "top_values": {"חיפה": 600},
+        }
+        assert value["type"] == "number"
+        assert value["stats"]["mean"] == 42.25
+        assert value["missingness"] == 0.05
+        assert len(statements) == 2
+
+    @respx.mock
+    async def test_profile_falls_back_without_sql(self):
+        search = mock_datastore_search()
+        mock_sql(lambda sql: httpx.Response(400, json={"success": False, "error": {}}))
+
+        result = await dataset_profile.fn(MockContext(), resource_id="r1", whole_resource=True)
+
+        assert result["computed"] == "client"
+        assert result["truncated"] is None
+        city, value = result["fields"]
+        assert city["stats"]["top_values"] == {"חיפה": 2, "ירושלים": 1}
+        assert value["stats"]["max"] == 30.0
+        assert search.calls.last.request.url.params["fields"] == "city,value"
+
+    @respx.mock
+    async def test_histogram_in_sql(self):
+        mock_datastore_search()
+        mock_sql(
+            lambda sql: ok(
+                {
+                    "records": [
+                        {"bucket": 0, "n": 5, "lo": "0", "hi": "100"},
+                        {"bucket": 9, "n": 2, "lo": "0", "hi": "100"},
+                    ]
+                }
+            )
+        )
+
+        result = await chart_generator.fn(
+            MockContext(),
+            resource_id="r1",
+            chart_type="histogram",
+            x_field="value",
+            whole_resource=True,
+        )
+
+        spec = result["vega_lite_spec"]
+        assert result["aggregation"] == {"computed": "sql"}
+        assert spec["encoding"]["x"]["bin"] == {"binned": True}
+        assert [b["count"] for b in spec["data"]["values"]] == [5, 0, 0, 0, 0, 0, 0, 0, 0, 2]
+        assert spec["data"]["values"][9]["bin_end"] == 100.0
+
+    @respx.mock
+    async def test_grouped_bar_falls_back_when_statement_fails(self):
+        mock_datastore_search()
+
+        def answer(sql):
+            if "GROUP BY" in sql:
+                return httpx.Response(409, json={"success": False, "error": {}})
+            # The keyset scan fetching the rows to aggregate client-side
+            if sql.startswith("SELECT count(*)"):
+                return ok({"records": [{"total": 4, "lo": 1, "hi": 4}]})
+            return ok({"records": RECORDS})
+
+        mock_sql(answer)
+
+        result = await chart_generator.fn(
+            MockContext(),
+            resource_id="r1",
+            chart_type="bar",
+            x_field="city",
+            y_field="value",
+            aggregate="mean",
+            whole_resource=True,
+        )
+
+        spec = result["vega_lite_spec"]
+        assert result["aggregation"]["computed"] == "client"
+        assert spec["data"]["values"][:2] == [
+            {"city": None, "value": 20.5},
+            {"city": "חיפה", "value": 20.0},
+        ]
+        assert spec["encoding"]["y"]["title"] == "mean of value"
+
+    async def test_rejects_unsupported_aggregates(self):
+        ctx = MockContext()
+        bad = await chart_generator.fn(ctx, "r1", "bar", "city", aggregate="median")
+        scatter = await chart_generator.fn(ctx, "r1", "scatter", "a", "b", whole_resource=True)
+
+        assert bad == {"error": "Unsupported aggregate: median"}
+        assert "not supported" in scatter["error"]
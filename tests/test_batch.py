@@ -0,0 +1,111 @@
+"""Tests for batched package lookups."""
+
+import asyncio
+
+import httpx
+import pytest
+import respx
+
+from datagov_mcp.api import BASE_URL, CKANAPIError
+from datagov_mcp.batch import BatchLimits, show_packages
+from datagov_mcp.resolver import resource_index
+from datagov_mcp.server import package_show_many
+
+
+class MockContext:
+    """Mock Context for testing."""
+
+    def __init__(self):
+        self.info_messages = []
+        self.error_messages = []
+        self.progress = []
+
+    async def info(self, message: str):
+        self.info_messages.append(message)
+
+    async def error(self, message: str):
+        self.error_messages.append(message)
+
+    async def report_progress(self, progress, total=None, message=None):
+        self.progress.append((progress, total))
+
+
+def packages(missing=()):
+    """respx side effect serving ``package_show``, tracking peak concurrency."""
+    stats = {"active": 0, "peak": 0, "calls": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        package_id = request.url.params["id"]
+        stats["calls"] += 1
+        stats["active"] += 1
+        stats["peak"] = max(stats["peak"], stats["active"])
+        await asyncio.sleep(0.01)
+        stats["active"] -= 1
+        if package_id in missing:
+            return httpx.Response(404, json={"success": False, "error": {"message": "Not found"}})
+        result = {
+            "id": f"id-{package_id}",
+            "name": package_id,
+            "resources": [{"id": f"res-{package_id}", "format": "CSV", "datastore_active": True}],
+        }
+        return httpx.Response(200, json={"success": True, "result": result})
+
+    respx.get(f"{BASE_URL}/action/package_show").mock(side_effect=handler)
+    return stats
+
+
+@pytest.mark.asyncio
+class TestShowPackages:
+    """Test the internal batch API."""
+
+    @respx.mock
+    async def test_bounded_concurrency_in_request_order(self):
+        stats = packages(missing={"d3"})
+        ids = [f"d{i}" for i in range(10)]
+
+        result = await show_packages(ids + ["d0", ""], limits=BatchLimits(concurrency=3))
+
+        assert list(result["results"]) == [i for i in ids if i != "d3"]
+        assert result["errors"]["d3"]["status_code"] == 404
+        assert stats["calls"] == 10
+        assert stats["peak"] == 3
+        assert resource_index.lookup("d5").best["id"] == "res-d5"
+
+    @respx.mock
+    async def test_reuses_cached_packages(self):
+        stats = packages()
+        await show_packages(["a", "b"])
+
+        result = await show_packages(["a", "b", "c"], concurrency=1)
+
+        assert list(result["results"]) == ["a", "b", "c"]
+        assert stats["calls"] == 3
+
+    async def test_rejects_too_many_ids(self):
+        with pytest.raises(CKANAPIError) as exc:
+            await show_packages(["a", "b", "c"], limits=BatchLimits(max_ids=2))
+        assert exc.value.status_code == 400
+
+
+@pytest.mark.asyncio
+class TestPackageShowManyTool:
+    """Test the package_show_many tool."""
+
+    @respx.mock
+    async def test_returns_results_errors_and_progress(self):
+        packages(missing={"gone"})
+        ctx = MockContext()
+
+        result = await package_show_many.fn(ctx, ids=["a", "gone"])
+
+        assert result["results"]["a"]["name"] == "a"
+        assert list(result["errors"]) == ["gone"]
+        assert result["errors"]["gone"]["status_code"] == 404
+        assert sorted(ctx.progress) == [(1, 2), (2, 2)]
+
+    async def test_reports_oversized_batches(self):
+        ctx = MockContext()
+        result = await package_show_many.fn(ctx, ids=[str(i) for i in range(1000)])
+
+        assert "Too many package IDs" in result["error"]
+        assert ctx.error_messages
@@ -0,0 +1,60 @@
+"""Tests for the processing micro-benchmark harness."""
+
+from benchmarks.bench_processing import build_cases, compare, make_table, run
+
+
+class TestBenchProcessing:
+    """Test table generation, measurement and regression checks."""
+
+    def test_make_table_is_mixed_and_deterministic(self):
+        table = make_table(100)
+
+        assert table == make_table(100)
+        assert any(r["value"] is None for r in table)
+        assert any(r["lon"] == "" for r in table)
+        assert any("ירושלים" in r["name"] for r in table)
+
+    def test_cases_run(self):
+        cases = build_cases(make_table(50))
+
+        assert set(cases) == {
+            "infer_field_type",
+            "calculate_stats",
+            "map_features",
+            "chart_spec_html",
+        }
+        for fn in cases.values():
+            fn()
+
+    def test_run_measures_time_and_allocations(self):
+        results = run([20], repeat=1, only=["map_features"], log=lambda line: None)
+
+        assert list(results) == ["map_features/20"]
+        assert results["map_features/20"]["time_ms"] > 0
+        assert results["map_features/20"]["peak_kib"] > 0
+
+    def test_compare_flags_regressions(self):
+        baseline = {
+            "calibration_ms": 10.0,
+            "cases": {
+                "a/100": {"time_ms": 10.0, "peak_kib": 100.0},
+                "b/100": {"time_ms": 10.0, "peak_kib": 100.0},
+            },
+        }
+        results = {
+            "a/100": {"time_ms": 12.0, "peak_kib": 110.0},  # within 30%
+            "b/100": {"time_ms": 20.0, "peak_kib": 200.0},
+            "c/100": {"time_ms": 99.0, "peak_kib": 999.0},  # no baseline
+        }
+
+        regressions = compare(results, baseline, threshold=0.3)
+
+        assert len(regressions) == 2
+        assert all(line.startswith("b/100:") for line in regressions)
+
+    def test_compare_normalizes_by_calibration(self):
+        baseline = {"calibration_ms": 10.0, "cases": {"a/1": {"time_ms": 10.0, "peak_kib": 1.0}}}
+        results = {"a/1": {"time_ms": 20.0, "peak_kib": 1.0}}
+
+        assert compare(results, baseline, 0.3)
+        assert not compare(results, baseline, 0.3, calibration_ms=20.0)
@@ -0,0 +1,161 @@
+"""Tests for the per-family circuit breaker."""
+
+from collections.abc import Callable
+
+import pytest
+import respx
+from httpx import Response
+
+from datagov_mcp.api import BASE_URL, CircuitOpenError, ckan_api_call
+from datagov_mcp.breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    action_family,
+    circuit_breakers,
+)
+
+
+def make_breaker(clock: Callable[[], float]) -> CircuitBreaker:
+    return CircuitBreaker(
+        "test",
+        failure_rate_threshold=0.5,
+        window_size=4,
+        min_calls=4,
+        open_duration=10.0,
+        clock=clock,
+    )
+
+
+class TestActionFamily:
+    """Test action family mapping."""
+
+    def test_datastore_actions(self):
+        assert action_family("datastore_search") == "datastore"
+        assert action_family("datastore_search_sql") == "datastore"
+
+    def test_catalog_actions(self):
+        assert action_family("package_show") == "catalog"
+        assert action_family("status_show") == "catalog"
+
+
+class TestCircuitBreaker:
+    """Test breaker state transitions."""
+
+    def test_opens_at_failure_rate_threshold(self, clock):
+        breaker = make_breaker(clock)
+        for success in (True, False, True):
+            assert breaker.allow()
+            breaker.record(success)
+        assert breaker.state == CLOSED  # below min_calls
+
+        assert breaker.allow()
+        breaker.record(False)
+        assert breaker.state == OPEN
+        assert breaker.allow() is False
+        assert breaker.stats()["rejected"] == 1
+
+    def test_stays_closed_below_threshold(self, clock):
+        breaker = make_breaker(clock)
+        for success in (True, True, True, False):
+            breaker.allow()
+            breaker.record(success)
+        assert breaker.state == CLOSED
+
+    def test_half_open_probe_success_closes(self, clock):
+        breaker = make_breaker(clock)
+        for _ in range(4):
+            breaker.allow()
+            breaker.record(False)
+        assert breaker.retry_in() == 10.0
+
+        clock.now = 10.0
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow() is True
+        assert breaker.allow() is False  # only one probe at a time
+        breaker.record(True)
+        assert breaker.state == CLOSED
+
+    def test_half_open_probe_failure_reopens(self, clock):
+        breaker = make_breaker(clock)
+        for _ in range(4):
+            breaker.allow()
+            breaker.record(False)
+
+        clock.now = 10.0
+        assert breaker.allow() is True
+        breaker.record(False)
+        assert breaker.state == OPEN
+        assert breaker.stats()["opened"] == 2
+
+    def test_released_probe_frees_slot(self, clock):
+        breaker = make_breaker(clock)
+        for _ in range(4):
+            breaker.allow()
+            breaker.record(False)
+
+        clock.now = 10.0
+        assert breaker.allow() is True
+        breaker.record(None)
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow() is True
+
+    def test_disabled_breaker_always_allows(self):
+        breaker = CircuitBreaker("test", min_calls=1, enabled=False)
+        breaker.record(False)
+        assert breaker.allow() is True
+
+
+@pytest.mark.asyncio
+class TestBreakerInAPICall:
+    """Test circuit breaking in ckan_api_call."""
+
+    @respx.mock
+    async def test_open_breaker_fails_fast(self, monkeypatch):
+        breaker = circuit_breakers.for_action("datastore_search")
+        monkeypatch.setattr(breaker, "min_calls", 2)
+        route = respx.get(f"{BASE_URL}/action/datastore_search").mock(
+            return_value=Response(502, text="Bad Gateway")
+        )
+
+        for _ in range(2):
+            with pytest.raises(Exception):
+                await ckan_api_call("datastore_search", params={"resource_id": "r"}, max_retries=0)
+        assert breaker.state == OPEN
+
+        with pytest.raises(CircuitOpenError) as exc_info:
+            await ckan_api_call("datastore_search", params={"resource_id": "r"})
+
+        assert exc_info.value.status_code == 503
+        assert route.call_count == 2
+
+    @respx.mock
+    async def test_families_are_independent(self, monkeypatch):
+        breaker = circuit_breakers.for_action("datastore_search")
+        monkeypatch.setattr(breaker, "min_calls", 1)
+        respx.get(f"{BASE_URL}/action/datastore_search").mock(
+            return_value=Response(500, text="error")
+        )
+        respx.get(f"{BASE_URL}/action/package_show").mock(
+            return_value=Response(200, json={"success": True, "result": {}})
+        )
+
+        with pytest.raises(Exception):
+            await ckan_api_call("datastore_search", params={"resource_id": "r"}, max_retries=0)
+
+        result = await ckan_api_call("package_show", params={"id": "x"})
+        assert result["success"] is True
+
+    @respx.mock
+    async def test_client_errors_do_not_trip(self, monkeypatch):
+        breaker = circuit_breakers.for_action("package_show")
+        monkeypatch.setattr(breaker, "min_calls", 1)
+        respx.get(f"{BASE_URL}/action/package_show").mock(
+            return_value=Response(404, text="Not Found")
+        )
+
+        with pytest.raises(Exception):
+            await ckan_api_call("package_show", params={"id": "x"})
+
+        assert breaker.state == CLOSED
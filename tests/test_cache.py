@@ -0,0 +1,160 @@
+"""Tests for the CKAN response cache."""
+
+import pytest
+import respx
+from httpx import Response
+
+from datagov_mcp.api import BASE_URL, ckan_api_call
+from datagov_mcp.cache import ResponseCache, make_cache_key, response_cache
+
+
+class TestCacheKey:
+    """Test cache key normalization."""
+
+    def test_param_order_is_ignored(self):
+        assert make_cache_key("package_search", "GET", {"q": "a", "rows": 10}) == make_cache_key(
+            "package_search", "GET", {"rows": 10, "q": "a"}
+        )
+
+    def test_get_params_normalized_to_query_string(self):
+        assert make_cache_key("package_search", "GET", {"rows": 10}) == make_cache_key(
+            "package_search", "GET", {"rows": "10"}
+        )
+        assert make_cache_key("x", "GET", {"flag": True}) == make_cache_key(
+            "x", "GET", {"flag": "true"}
+        )
+
+    def test_none_values_dropped(self):
+        assert make_cache_key("x", "GET", {"a": None}) == make_cache_key("x", "GET", {})
+
+    def test_method_and_action_distinguish_keys(self):
+        assert make_cache_key("x", "GET", {}) != make_cache_key("x", "POST", {})
+        assert make_cache_key("x", "GET", {}) != make_cache_key("y", "GET", {})
+
+
+class TestResponseCache:
+    """Test TTL and LRU behavior of ResponseCache."""
+
+    def test_hit_and_miss_counters(self):
+        cache = ResponseCache(ttls={"a": 10})
+        assert cache.get("k") is None
+        cache.set("k", "a", {"v": 1}, size=10)
+        assert cache.get("k") == {"v": 1}
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_ttl_expiry(self, clock):
+        cache = ResponseCache(ttls={"a": 10}, clock=clock)
+        cache.set("k", "a", {"v": 1}, size=10)
+        clock.now = 9.9
+        assert cache.get("k") is not None
+        clock.now = 10.0
+        assert cache.get("k") is None
+        assert cache.stats()["expirations"] == 1
+        # Expired entries are kept for revalidation until evicted
+        assert cache.peek("k") is not None
+
+    def test_renew_restarts_ttl(self, clock):
+        cache = ResponseCache(ttls={"a": 10}, clock=clock)
+        cache.set("k", "a", {"v": 1}, size=10, etag='"abc"')
+        clock.now = 15.0
+        assert cache.get("k") is None
+
+        assert cache.renew("k") == {"v": 1}
+        assert cache.get("k") == {"v": 1}
+        assert cache.peek("k").etag == '"abc"'
+        assert cache.stats()["renewals"] == 1
+
+    def test_uncacheable_action_not_stored(self):
+        cache = ResponseCache(ttls={"a": 10})
+        cache.set("k", "other", {"v": 1}, size=10)
+        assert len(cache) == 0
+
+    def test_lru_eviction_by_entry_count(self):
+        cache = ResponseCache(max_entries=2, ttls={"a": 10})
+        cache.set("k1", "a", {}, size=1)
+        cache.set("k2", "a", {}, size=1)
+        cache.get("k1")  # k2 is now least recently used
+        cache.set("k3", "a", {}, size=1)
+        assert cache.get("k2") is None
+        assert cache.get("k1") is not None
+        assert cache.stats()["evictions"] == 1
+
+    def test_eviction_by_total_bytes(self):
+        cache = ResponseCache(max_bytes=100, ttls={"a": 10})
+        cache.set("k1", "a", {}, size=60)
+        cache.set("k2", "a", {}, size=60)
+        assert cache.get("k1") is None
+        assert cache.stats()["bytes"] == 60
+
+    def test_oversized_value_not_stored(self):
+        cache = ResponseCache(max_bytes=100, ttls={"a": 10})
+        cache.set("k1", "a", {}, size=101)
+        assert len(cache) == 0
+
+    def test_invalidate_by_action(self):
+        cache = ResponseCache(ttls={"a": 10, "b": 10})
+        cache.set("k1", "a", {}, size=1)
+        cache.set("k2", "b", {}, size=1)
+        cache.invalidate("a")
+        assert cache.get("k1") is None
+        assert cache.get("k2") is not None
+
+    def test_disabled_cache_stores_nothing(self):
+        cache = ResponseCache(ttls={"a": 10}, enabled=False)
+        cache.set("k", "a", {}, size=1)
+        assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+class TestCachedAPICall:
+    """Test cache integration in ckan_api_call."""
+
+    @respx.mock
+    async def test_repeated_call_served_from_cache(self):
+        route = respx.get(f"{BASE_URL}/action/license_list").mock(
+            return_value=Response(200, json={"success": True, "result": []})
+        )
+
+        await ckan_api_call("license_list")
+        await ckan_api_call("license_list")
+
+        assert route.call_count == 1
+        assert response_cache.stats()["hits"] == 1
+
+    @respx.mock
+    async def test_different_params_not_shared(self):
+        route = respx.get(f"{BASE_URL}/action/package_show").mock(
+            return_value=Response(200, json={"success": True, "result": {}})
+        )
+
+        await ckan_api_call("package_show", params={"id": "a"})
+        await ckan_api_call("package_show", params={"id": "b"})
+
+        assert route.call_count == 2
+
+    @respx.mock
+    async def test_use_cache_false_bypasses_cache(self):
+        route = respx.get(f"{BASE_URL}/action/license_list").mock(
+            return_value=Response(200, json={"success": True, "result": []})
+        )
+
+        await ckan_api_call("license_list", use_cache=False)
+        await ckan_api_call("license_list", use_cache=False)
+
+        assert route.call_count == 2
+
+    @respx.mock
+    async def test_errors_not_cached(self):
+        route = respx.get(f"{BASE_URL}/action/license_list")
+        route.side_effect = [
+            Response(200, json={"success": False, "error": {"message": "boom"}}),
+            Response(200, json={"success": True, "result": []}),
+        ]
+
+        with pytest.raises(Exception):
+            await ckan_api_call("license_list")
+        result = await ckan_api_call("license_list")
+
+        assert result["success"] is True
+        assert route.call_count == 2
@@ -0,0 +1,178 @@
+"""Tests for HTTP client configuration and lifecycle."""
+
+import asyncio
+
+import httpx
+import pytest
+import respx
+
+from datagov_mcp.api import BASE_URL
+from datagov_mcp.client import HTTPClient, HTTPClientConfig, _http_client
+from datagov_mcp.server import lifespan, mcp
+
+
+class TestHTTPClientConfig:
+    """Test pool, protocol and timeout settings."""
+
+    def test_defaults(self):
+        config = HTTPClientConfig()
+        assert config.http2 is False
+        assert config.max_connections == 100
+
+    def test_from_env(self, monkeypatch):
+        monkeypatch.setenv("DATAGOV_HTTP_MAX_CONNECTIONS", "250")
+        monkeypatch.setenv("DATAGOV_HTTP_MAX_KEEPALIVE", "50")
+        monkeypatch.setenv("DATAGOV_HTTP_KEEPALIVE_EXPIRY", "60")
+        monkeypatch.setenv("DATAGOV_HTTP2", "true")
+        monkeypatch.setenv("DATAGOV_HTTP_CONNECT_TIMEOUT", "2.5")
+        monkeypatch.setenv("DATAGOV_HTTP_READ_TIMEOUT", "not-a-number")
+
+        config = HTTPClientConfig.from_env()
+
+        assert config.max_connections == 250
+        assert config.max_keepalive_connections == 50
+        assert config.keepalive_expiry == 60.0
+        assert config.http2 is True
+        assert config.connect_timeout == 2.5
+        assert config.read_timeout == 30.0  # invalid value falls back to default
+
+    def test_limits_and_timeout(self):
+        config = HTTPClientConfig(
+            max_connections=10,
+            max_keepalive_connections=5,
+            keepalive_expiry=15.0,
+            connect_timeout=1.0,
+            read_timeout=2.0,
+            write_timeout=3.0,
+            pool_timeout=4.0,
+        )
+
+        limits = config.limits()
+        assert limits.max_connections == 10
+        assert limits.max_keepalive_connections == 5
+        assert limits.keepalive_expiry == 15.0
+
+        timeout = config.timeout()
+        assert (timeout.connect, timeout.read, timeout.write, timeout.pool) == (1.0, 2.0, 3.0, 4.0)
+
+
+@pytest.mark.asyncio
+class TestHTTPClient:
+    """Test HTTPClient lifecycle."""
+
+    async def test_client_uses_config(self):
+        http_client = HTTPClient(HTTPClientConfig(read_timeout=12.0))
+        async with http_client.get_client() as client:
+            assert isinstance(client, httpx.AsyncClient)
+            assert client.timeout.read == 12.0
+        await http_client.close()
+
+    async def test_http2_falls_back_without_h2(self, monkeypatch):
+        monkeypatch.setattr("datagov_mcp.client.http2_available", lambda: False)
+        http_client = HTTPClient(HTTPClientConfig(http2=True))
+        async with http_client.get_client() as client:
+            assert isinstance(client, httpx.AsyncClient)
+        await http_client.close()
+
+    async def test_configure_replaces_client(self):
+        http_client = HTTPClient()
+        async with http_client.get_client() as first:
+            pass
+        await http_client.configure(HTTPClientConfig(read_timeout=5.0))
+        async with http_client.get_client() as second:
+            assert second is not first
+            assert second.timeout.read == 5.0
+        await http_client.close()
+
+
+@pytest.mark.asyncio
+class TestHTTPClientLifecycle:
+    """Test startup prewarming, refresh and shutdown."""
+
+    @respx.mock
+    async def test_start_prewarms_connections(self):
+        route = respx.get("https://example.test/ping").mock(return_value=httpx.Response(200))
+        http_client = HTTPClient(HTTPClientConfig(prewarm_connections=3, refresh_interval=0))
+
+        await http_client.start(prewarm_url="https://example.test/ping")
+        await http_client._prewarm_task
+
+        assert route.call_count == 3
+        await http_client.close()
+
+    @respx.mock
+    async def test_start_does_not_wait_for_prewarming(self):
+        async def stall(request: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(30)
+            return httpx.Response(200)
+
+        respx.get("https://example.test/ping").mock(side_effect=stall)
+        http_client = HTTPClient(HTTPClientConfig(prewarm_connections=2, refresh_interval=0))
+
+        await asyncio.wait_for(http_client.start(prewarm_url="https://example.test/ping"), 1)
+        task = http_client._prewarm_task
+        assert not task.done()
+
+        await http_client.close()
+
+        assert task.cancelled()
+        assert http_client._prewarm_task is None
+
+    @respx.mock
+    async def test_prewarm_failures_are_ignored(self):
+        respx.get("https://example.test/ping").mock(side_effect=httpx.ConnectError("down"))
+        http_client = HTTPClient(HTTPClientConfig(prewarm_connections=2, refresh_interval=0))
+
+        assert await http_client.prewarm("https://example.test/ping") == 0
+        await http_client.close()
+
+    async def test_refresh_swaps_client(self):
+        http_client = HTTPClient()
+        async with http_client.get_client() as first:
+            pass
+
+        await http_client.refresh()
+
+        assert first.is_closed
+        async with http_client.get_client() as second:
+            assert second is not first
+        await http_client.close()
+        assert second.is_closed
+
+    async def test_refresh_waits_for_requests_on_the_old_client(self):
+        http_client = HTTPClient(HTTPClientConfig(read_timeout=0.0))
+
+        async with http_client.get_client() as first:
+            async with http_client.get_client():
+                await http_client.refresh()
+                await asyncio.sleep(0.01)
+            assert not first.is_closed
+            async with http_client.get_client() as second:
+                assert second is not first
+
+        assert first.is_closed
+        assert not second.is_closed
+        await http_client.close()
+
+    async def test_close_stops_refresh_task(self):
+        http_client = HTTPClient(HTTPClientConfig(prewarm_connections=0, refresh_interval=60))
+        await http_client.start()
+        assert http_client._refresh_task is not None
+
+        await http_client.close()
+
+        assert http_client._refresh_task is None
+        assert http_client._client is None
+
+    @respx.mock
+    async def test_server_lifespan_manages_client(self):
+        route = respx.get(f"{BASE_URL}/action/status_show").mock(
+            return_value=httpx.Response(200, json={"success": True, "result": {}})
+        )
+
+        async with lifespan(mcp):
+            assert _http_client._client is not None
+            await _http_client._prewarm_task
+
+        assert route.called
+        assert _http_client._client is None
@@ -0,0 +1,211 @@
+"""Tests for the local column store of datastore resources."""
+
+from pathlib import Path
+
+import pytest
+
+from benchmarks.fake_ckan import FakeCKAN, make_row
+from datagov_mcp import columnar
+from datagov_mcp.columnar import ColumnStore, column_kind, merge_kinds
+from datagov_mcp.visualization import chart_generator, dataset_profile
+
+pytestmark = pytest.mark.fake_ckan(datasets=1, rows_per_resource=500)
+
+
+class MockContext:
+    """Mock Context for testing."""
+
+    def __init__(self):
+        self.info_messages = []
+        self.error_messages = []
+
+    async def info(self, message: str):
+        self.info_messages.append(message)
+
+    async def error(self, message: str):
+        self.error_messages.append(message)
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    return ColumnStore(tmp_path / "columns", refresh_interval=60.0, clock=clock)
+
+
+def expected_rows(fake: FakeCKAN, resource_id: str, rows: int) -> list[dict]:
+    return [make_row(fake._resource_seed(resource_id), i) for i in range(rows)]
+
+
+def fetched(records: list[dict], truncated=None) -> dict:
+    fields = [{"id": name} for name in records[0]] if records else []
+    return {"records": records, "fields": fields, "returned": len(records), "truncated": truncated}
+
+
+class TestColumnKinds:
+    """Test choosing column encodings."""
+
+    def test_column_kind(self):
+        assert column_kind([1, None, 2]) == "int"
+        assert column_kind([1, 2.5]) == "float"
+        assert column_kind(["a", None]) == "text"
+        assert column_kind([None, None]) is None
+        assert column_kind([True, 1]) == "json"
+        assert column_kind(["1", 1]) == "json"
+        assert column_kind([2**70]) == "json"
+
+    def test_merge_kinds(self):
+        assert merge_kinds(None, "text") == "text"
+        assert merge_kinds("int", "float") == "float"
+        assert merge_kinds("int", None) == "int"
+        assert merge_kinds("text", "int") == "json"
+
+
+class TestStoredColumns:
+    """Test writing, appending and reading columns."""
+
+    def test_round_trip(self, store):
+        records = [
+            {"_id": 1, "n": 1, "x": 0.5, "s": "חיפה", "empty": "", "j": True, "z": None},
+            {"_id": 2, "n": None, "x": None, "s": None, "empty": "", "j": {"a": 1}, "z": None},
+        ]
+        table = store._write("r1", fetched(records), "2024-01-01")
+
+        assert table.records() == records
+        assert table.column("s", limit=1) == ["חיפה"]
+        assert store.load("r1").manifest["kinds"] == ["int", "int", "float", "text", "text"] + [
+            "json",
+            None,
+        ]
+
+    def test_append_widens_and_repairs(self, store):
+        table = store._write("r1", fetched([{"_id": 1, "n": 1, "s": "a", "z": None}]), "t1")
+        # Bytes left past the manifest by an interrupted append are dropped
+        with open(table.directory / "2.data", "ab") as f:
+            f.write(b"garbage")
+
+        table = store._append(table, fetched([{"_id": 2, "n": 2.5, "s": "b", "z": 3}]), "t2")
+
+        assert table.rows == 2
+        assert table.manifest["high_water"] == 2
+        assert table.records() == [
+            {"_id": 1, "n": 1.0, "s": "a", "z": None},
+            {"_id": 2, "n": 2.5, "s": "b", "z": 3},
+        ]
+
+    def test_append_leaves_stored_version_intact(self, store, monkeypatch):
+        records = [{"_id": 1, "n": 1, "s": "a"}]
+        store._write("r1", fetched(records), "t1")
+
+        def crash(*args):
+            raise OSError("crashed before the swap")
+
+        monkeypatch.setattr(store, "_swap", crash)
+        with pytest.raises(OSError):
+            store._append(store.load("r1"), fetched([{"_id": 2, "n": 2.5, "s": "b"}]), "t2")
+
+        table = store.load("r1")
+        assert table.manifest["kinds"] == ["int", "int", "text"]
+        assert table.records() == records
+
+    def test_swap_retires_a_concurrent_version(self, store, tmp_path, clock, monkeypatch):
+        other = ColumnStore(tmp_path / "columns", clock=clock)  # another process
+        store._write("r1", fetched([{"_id": 1, "s": "old"}]), "t1")
+        rename = Path.rename
+        raced = []
+
+        def racing_rename(path, target):
+            if path.name.startswith(".staging") and not raced:
+                raced.append(path)
+                other._write("r1", fetched([{"_id": 1, "s": "theirs"}]), "t2")
+            return rename(path, target)
+
+        monkeypatch.setattr(Path, "rename", racing_rename)
+        table = store._write("r1", fetched([{"_id": 1, "s": "ours"}]), "t3")
+
+        assert raced
+        assert table.records() == [{"_id": 1, "s": "ours"}]
+        assert store.load("r1").manifest["last_modified"] == "t3"
+        assert [p.name for p in store.path.iterdir()] == [table.directory.name]
+
+    def test_evicts_least_recently_read(self, store, clock):
+        store._write("r1", fetched([{"_id": i, "s": "x" * 100} for i in range(50)]), None)
+        clock.now += 1
+        store.max_bytes = 1000
+        store._write("r2", fetched([{"_id": i, "s": "y" * 100} for i in range(50)]), None)
+
+        assert store.load("r1") is None
+        assert store.load("r2") is not None
+        assert store.stats()["resources"] == 1
+
+
+@pytest.mark.asyncio
+class TestRefresh:
+    """Test filling and refreshing against the fake CKAN."""
+
+    async def test_fills_once_within_refresh_interval(self, fake, store):
+        table = await store.table("res-0-0")
+        requests = dict(fake.requests)
+        again = await store.table("res-0-0")
+
+        assert table.records() == expected_rows(fake, "res-0-0", 500)
+        assert again.rows == 500
+        assert fake.requests == requests
+        assert (store.fills, store.hits) == (1, 1)
+
+    async def test_unchanged_resource_is_not_refetched(self, fake, store, clock):
+        await store.table("res-0-0")
+        clock.now += 120
+        searches = fake.requests["datastore_search"]
+
+        await store.table("res-0-0")
+
+        assert fake.requests["resource_show"] == 2
+        assert fake.requests["datastore_search"] == searches
+        assert store.fills == 1
+
+    async def test_appends_rows_past_high_water(self, fake, store, clock):
+        await store.table("res-0-0")
+        fake.config.rows_per_resource = 650
+        fake._resources["res-0-0"]["last_modified"] = "2024-03-01T00:00:00"
+        clock.now += 120
+
+        table = await store.table("res-0-0")
+
+        assert (store.fills, store.appends) == (1, 1)
+        assert table.manifest["last_modified"] == "2024-03-01T00:00:00"
+        assert table.records() == expected_rows(fake, "res-0-0", 650)
+
+    async def test_refills_when_rows_change_in_place(self, fake, store, clock):
+        await store.table("res-0-0")
+        fake._resources["res-0-0"]["last_modified"] = "2024-03-01T00:00:00"
+        clock.now += 120
+        await store.table("res-0-0")
+
+        fake.config.rows_per_resource = 400
+        fake._resources["res-0-0"]["last_modified"] = "2024-04-01T00:00:00"
+        clock.now += 120
+        table = await store.table("res-0-0")
+
+        assert (store.fills, store.appends) == (3, 0)
+        assert table.rows == 400
+
+
+@pytest.mark.asyncio
+class TestTools:
+    """Test the visualization tools reading from the store."""
+
+    async def test_tools_read_locally(self, fake, store, monkeypatch):
+        monkeypatch.setattr(columnar, "column_store", store)
+        ctx = MockContext()
+
+        profile = await dataset_profile.fn(ctx, resource_id="res-0-0", whole_resource=True)
+        requests = dict(fake.requests)
+        chart = await chart_generator.fn(
+            ctx, resource_id="res-0-0", chart_type="histogram", x_field="count", whole_resource=True
+        )
+
+        assert profile["computed"] == "local"
+        assert profile["row_count"] == 500
+        assert profile["sample_size"] == 100
+        assert chart["aggregation"] == {"computed": "local", "truncated": None}
+        assert sum(b["count"] for b in chart["vega_lite_spec"]["data"]["values"]) == 500
+        assert fake.requests == requests
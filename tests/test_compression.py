@@ -0,0 +1,154 @@
+"""Tests for Accept-Encoding negotiation and transfer byte accounting."""
+
+import gzip
+import importlib.util
+import json
+
+import httpx
+import pytest
+import respx
+
+from datagov_mcp.api import BASE_URL, ckan_api_call
+from datagov_mcp.client import (
+    HTTPClient,
+    HTTPClientConfig,
+    TransferStats,
+    supported_encodings,
+    transfer_stats,
+)
+from datagov_mcp.streaming import stream_records
+
+
+def datastore_body(rows: int) -> bytes:
+    records = [{"_id": i, "city": "תל אביב", "value": i % 10} for i in range(rows)]
+    document = {"success": True, "result": {"records": records, "total": rows}}
+    return json.dumps(document).encode()
+
+
+class TestNegotiation:
+    """Test which encodings are advertised."""
+
+    @pytest.fixture
+    def installed(self, monkeypatch):
+        """Pretend only the given optional packages are installed."""
+        modules: set[str] = set()
+        find_spec = importlib.util.find_spec
+
+        def fake_find_spec(name, *args, **kwargs):
+            if name in ("zstandard", "brotli", "brotlicffi"):
+                return object() if name in modules else None
+            return find_spec(name, *args, **kwargs)
+
+        monkeypatch.setattr(importlib.util, "find_spec", fake_find_spec)
+        return modules
+
+    def test_optional_decoders_detected(self, installed):
+        assert supported_encodings() == ["gzip", "deflate"]
+
+    def test_brotlicffi_decodes_brotli(self, installed):
+        installed.add("brotlicffi")
+
+        assert supported_encodings() == ["br", "gzip", "deflate"]
+
+    def test_zstd_and_brotli_preferred_when_available(self, installed):
+        installed.update({"zstandard", "brotli"})
+
+        assert supported_encodings() == ["zstd", "br", "gzip", "deflate"]
+
+    async def test_client_sends_accept_encoding(self):
+        http_client = HTTPClient()
+        async with http_client.get_client() as client:
+            assert client.headers["Accept-Encoding"] == ", ".join(supported_encodings())
+        await http_client.close()
+
+    async def test_accept_encoding_override(self, monkeypatch):
+        monkeypatch.setenv("DATAGOV_HTTP_ACCEPT_ENCODING", "gzip")
+        http_client = HTTPClient(HTTPClientConfig.from_env())
+        async with http_client.get_client() as client:
+            assert client.headers["Accept-Encoding"] == "gzip"
+        await http_client.close()
+
+
+class TestTransferStats:
+    """Test per-action byte counters."""
+
+    def test_counters_and_ratio(self):
+        stats = TransferStats()
+        stats.record("package_search", "gzip", 100, 1000)
+        stats.record("package_search", "gzip", 100, 600)
+        stats.record("package_list", "", 50, 50)
+
+        snapshot = stats.stats()
+
+        assert snapshot["compressed_bytes"] == 250
+        assert snapshot["decompressed_bytes"] == 1650
+        search = snapshot["actions"]["package_search"]
+        assert search["responses"] == 2
+        assert search["compression_ratio"] == 8.0
+        assert search["encodings"] == {"gzip": 2}
+        assert snapshot["actions"]["package_list"]["encodings"] == {"identity": 1}
+
+    def test_reset(self):
+        stats = TransferStats()
+        stats.record("package_list", "gzip", 1, 2)
+        stats.reset()
+
+        assert stats.stats()["actions"] == {}
+
+
+@pytest.mark.asyncio
+class TestUpstreamAccounting:
+    """Test that upstream calls record their payload sizes."""
+
+    @respx.mock
+    async def test_gzip_response_counted(self):
+        body = datastore_body(500)
+        respx.get(f"{BASE_URL}/action/datastore_search").mock(
+            return_value=httpx.Response(
+                200, content=gzip.compress(body), headers={"Content-Encoding": "gzip"}
+            )
+        )
+
+        result = await ckan_api_call("datastore_search", params={"resource_id": "r"})
+
+        assert len(result["result"]["records"]) == 500
+        counters = transfer_stats.stats()["actions"]["datastore_search"]
+        assert counters["decompressed_bytes"] == len(body)
+        assert counters["compressed_bytes"] == len(gzip.compress(body))
+        assert counters["compression_ratio"] > 5
+        assert counters["encodings"] == {"gzip": 1}
+
+    @respx.mock
+    async def test_zstd_response_decoded(self):
+        zstandard = pytest.importorskip("zstandard")
+        body = datastore_body(100)
+        respx.get(f"{BASE_URL}/action/datastore_search").mock(
+            return_value=httpx.Response(
+                200,
+                content=zstandard.ZstdCompressor().compress(body),
+                headers={"Content-Encoding": "zstd"},
+            )
+        )
+
+        result = await ckan_api_call("datastore_search", params={"resource_id": "r"})
+
+        assert len(result["result"]["records"]) == 100
+        assert transfer_stats.stats()["actions"]["datastore_search"]["encodings"] == {"zstd": 1}
+
+    @respx.mock
+    async def test_streamed_response_counted(self):
+        body = datastore_body(2000)
+        respx.get(f"{BASE_URL}/action/datastore_search").mock(
+            return_value=httpx.Response(
+                200, content=gzip.compress(body), headers={"Content-Encoding": "gzip"}
+            )
+        )
+
+        count = 0
+        async for batch in stream_records("datastore_search", {"resource_id": "r"}):
+            count += len(batch)
+
+        assert count == 2000
+        counters = transfer_stats.stats()["actions"]["datastore_search"]
+        assert counters["decompressed_bytes"] == len(body)
+        assert counters["compressed_bytes"] < len(body)
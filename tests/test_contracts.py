@@ -23,11 +23,15 @@ class TestToolContracts:
             "package_list",
             "package_search",
             "package_show",
+            "package_show_many",
             "organization_list",
             "organization_show",
             "resource_search",
             "datastore_search",
             "fetch_data",
+            "datastore_fetch_all",
+            "resource_query",
+            "server_metrics",
         ]
 
         tools = await mcp.get_tools()
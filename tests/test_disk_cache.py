@@ -0,0 +1,134 @@
+"""Tests for the persistent SQLite response cache."""
+
+import multiprocessing
+
+import pytest
+import respx
+from httpx import Response
+
+from datagov_mcp import disk_cache
+from datagov_mcp.api import BASE_URL, ckan_api_call
+from datagov_mcp.cache import response_cache
+from datagov_mcp.disk_cache import PersistentCache
+
+
+def _write_entries(path: str, worker: int) -> None:
+    cache = PersistentCache(path, ttls={"a": 60})
+    for i in range(20):
+        cache.set(f"w{worker}-{i}", "a", {"worker": worker, "i": i})
+    cache.close()
+
+
+class TestPersistentCache:
+    """Test storage, expiry and eviction."""
+
+    def test_roundtrip_survives_reopen(self, tmp_path):
+        path = tmp_path / "cache.sqlite"
+        cache = PersistentCache(path, ttls={"a": 60})
+        cache.set("k", "a", {"result": ["x", "שלום"]})
+        cache.close()
+
+        reopened = PersistentCache(path, ttls={"a": 60})
+        stored = reopened.get("k")
+
+        assert stored is not None
+        assert stored.value == {"result": ["x", "שלום"]}
+        assert 0 < stored.ttl <= 60
+        reopened.close()
+
+    def test_payload_is_compressed(self, tmp_path):
+        cache = PersistentCache(tmp_path / "cache.sqlite", ttls={"a": 60})
+        value = {"result": ["dataset-name"] * 1000}
+        cache.set("k", "a", value)
+
+        stats = cache.stats()
+        assert stats["entries"] == 1
+        assert stats["bytes"] < cache.get("k").size / 10
+        cache.close()
+
+    def test_ttl_expiry(self, tmp_path, clock):
+        cache = PersistentCache(tmp_path / "cache.sqlite", ttls={"a": 60}, clock=clock)
+        cache.set("k", "a", {"v": 1})
+
+        clock.now += 61
+
+        assert cache.get("k") is None
+        assert cache.stats()["entries"] == 0
+        cache.close()
+
+    def test_unpersisted_action_ignored(self, tmp_path):
+        cache = PersistentCache(tmp_path / "cache.sqlite", ttls={"a": 60})
+        cache.set("k", "datastore_search", {"v": 1})
+        assert cache.stats()["entries"] == 0
+        cache.close()
+
+    def test_size_bounded_eviction_drops_least_recently_read(self, tmp_path, clock):
+        cache = PersistentCache(tmp_path / "cache.sqlite", ttls={"a": 60}, clock=clock)
+        cache.set("k1", "a", {"v": "1" * 50})
+        size = cache.stats()["bytes"]
+        cache.max_bytes = size * 2
+        clock.now += 1
+        cache.set("k2", "a", {"v": "2" * 50})
+        clock.now += 1
+        cache.get("k1")  # k2 is now least recently read
+        clock.now += 1
+        cache.set("k3", "a", {"v": "3" * 50})
+
+        assert cache.get("k2") is None
+        assert cache.get("k1") is not None
+        assert cache.get("k3") is not None
+        cache.close()
+
+    def test_concurrent_writers_from_multiple_processes(self, tmp_path):
+        path = str(tmp_path / "cache.sqlite")
+        PersistentCache(path).close()  # create schema and switch to WAL first
+        ctx = multiprocessing.get_context("spawn")
+        workers = [ctx.Process(target=_write_entries, args=(path, w)) for w in range(3)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=30)
+            assert worker.exitcode == 0
+
+        cache = PersistentCache(path, ttls={"a": 60})
+        assert cache.stats()["entries"] == 60
+        cache.close()
+
+
+@pytest.mark.asyncio
+class TestPersistentCacheInAPICall:
+    """Test the persistent tier in ckan_api_call."""
+
+    @respx.mock
+    async def test_restart_served_from_disk(self, tmp_path, monkeypatch):
+        path = tmp_path / "cache.sqlite"
+        monkeypatch.setattr(disk_cache, "persistent_cache", PersistentCache(path))
+        route = respx.get(f"{BASE_URL}/action/package_list").mock(
+            return_value=Response(200, json={"success": True, "result": ["a", "b"]})
+        )
+
+        await ckan_api_call("package_list")
+        disk_cache.persistent_cache.close()
+
+        # Simulate a restart: empty memory cache, new persistent cache handle
+        response_cache.clear()
+        monkeypatch.setattr(disk_cache, "persistent_cache", PersistentCache(path))
+        result = await ckan_api_call("package_list")
+
+        assert result["result"] == ["a", "b"]
+        assert route.call_count == 1
+        assert len(response_cache) == 1  # promoted back into memory
+        disk_cache.persistent_cache.close()
+
+    @respx.mock
+    async def test_volatile_actions_not_persisted(self, tmp_path, monkeypatch):
+        store = PersistentCache(tmp_path / "cache.sqlite")
+        monkeypatch.setattr(disk_cache, "persistent_cache", store)
+        respx.get(f"{BASE_URL}/action/datastore_search").mock(
+            return_value=Response(200, json={"success": True, "result": {"records": []}})
+        )
+
+        await ckan_api_call("datastore_search", params={"resource_id": "r"})
+
+        assert store.stats()["entries"] == 0
+        store.close()
@@ -0,0 +1,132 @@
+"""Tests for the fake CKAN server used by the load-testing harness."""
+
+import httpx
+import pytest
+
+from benchmarks.fake_ckan import FakeCKAN, FakeCKANConfig
+from benchmarks.load_test import parse_mix, percentile
+from datagov_mcp import api
+
+FAKE_URL = "http://fake-ckan/api/3"
+
+pytestmark = pytest.mark.fake_ckan(datasets=5, rows_per_resource=250)
+
+
+class MockContext:
+    """Mock Context for testing."""
+
+    def __init__(self):
+        self.info_messages = []
+        self.error_messages = []
+
+    async def info(self, message: str):
+        self.info_messages.append(message)
+
+    async def error(self, message: str):
+        self.error_messages.append(message)
+
+
+def fake_client(fake: FakeCKAN) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=fake.app()))
+
+
+@pytest.mark.asyncio
+class TestFakeCKAN:
+    """Test the fake CKAN actions and fault injection."""
+
+    async def test_package_show(self):
+        fake = FakeCKAN(FakeCKANConfig(datasets=3, resources_per_dataset=2))
+        async with fake_client(fake) as client:
+            response = await client.get(f"{FAKE_URL}/action/package_show?id=dataset-1")
+            missing = await client.get(f"{FAKE_URL}/action/package_show?id=nope")
+
+        package = response.json()["result"]
+        assert package["name"] == "dataset-1"
+        assert [r["id"] for r in package["resources"]] == ["res-1-0", "res-1-1"]
+        assert missing.status_code == 404
+        assert fake.requests["package_show"] == 2
+
+    async def test_datastore_search_pages_deterministically(self):
+        fake = FakeCKAN(FakeCKANConfig(datasets=1, rows_per_resource=25))
+        async with fake_client(fake) as client:
+            first = await client.get(
+                f"{FAKE_URL}/action/datastore_search",
+                params={"resource_id": "res-0-0", "limit": 10, "offset": 20},
+            )
+            again = await client.get(
+                f"{FAKE_URL}/action/datastore_search",
+                params={"resource_id": "res-0-0", "limit": 10, "offset": 20},
+            )
+
+        result = first.json()["result"]
+        assert result["total"] == 25
+        assert [r["_id"] for r in result["records"]] == [21, 22, 23, 24, 25]
+        assert result == again.json()["result"]
+
+    async def test_fields_and_records_format(self):
+        fake = FakeCKAN(FakeCKANConfig(datasets=1, rows_per_resource=3))
+        async with fake_client(fake) as client:
+            lists = await client.get(
+                f"{FAKE_URL}/action/datastore_search",
+                params={"resource_id": "res-0-0", "fields": "_id,city", "records_format": "lists"},
+            )
+            csv = await client.get(
+                f"{FAKE_URL}/action/datastore_search",
+                params={"resource_id": "res-0-0", "fields": "_id", "records_format": "csv"},
+            )
+
+        result = lists.json()["result"]
+        assert [f["id"] for f in result["fields"]] == ["_id", "city"]
+        assert [len(row) for row in result["records"]] == [2, 2, 2]
+        assert [row[0] for row in result["records"]] == [1, 2, 3]
+        assert csv.json()["result"]["records"] == "1\r\n2\r\n3\r\n"
+
+    async def test_injected_faults(self):
+        throttled = FakeCKAN(FakeCKANConfig(throttle_rate=1.0, retry_after=2.5))
+        failing = FakeCKAN(FakeCKANConfig(error_rate=1.0))
+        async with fake_client(throttled) as client:
+            response = await client.get(f"{FAKE_URL}/action/status_show")
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "2.5"
+        async with fake_client(failing) as client:
+            response = await client.get(f"{FAKE_URL}/action/status_show")
+        assert response.status_code == 500
+        assert failing.faults == {"500": 1}
+
+
+@pytest.mark.asyncio
+class TestAgainstFakeCKAN:
+    """Run the real tools and retry logic against the fake CKAN."""
+
+    async def test_fetch_data_end_to_end(self, fake):
+        from datagov_mcp.server import fetch_data
+
+        result = await fetch_data.fn(MockContext(), dataset_name="dataset-2", limit=5)
+
+        assert len(result["records"]) == 5
+        assert fake.requests == {"package_show": 1, "datastore_search": 1}
+
+    async def test_retries_through_injected_faults(self, fake, monkeypatch):
+        rolls = iter([0.0, 0.5, 0.9])
+        monkeypatch.setattr(fake._rng, "random", lambda: next(rolls))
+        fake.config.throttle_rate = 0.3
+        fake.config.error_rate = 0.3
+
+        result = await api.ckan_api_call("package_show", params={"id": "dataset-0"})
+
+        assert result["result"]["name"] == "dataset-0"
+        assert fake.faults == {"429": 1, "500": 1}
+        assert fake.requests["package_show"] == 3
+
+
+class TestLoadTestHelpers:
+    """Test load-test report helpers."""
+
+    def test_percentile(self):
+        values = [float(i) for i in range(1, 101)]
+        assert percentile(values, 0.5) == 50.0
+        assert percentile(values, 0.99) == 99.0
+        assert percentile([], 0.5) == 0.0
+
+    def test_parse_mix(self):
+        assert parse_mix("package_show=3, fetch_data") == {"package_show": 3, "fetch_data": 1}
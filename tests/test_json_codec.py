@@ -0,0 +1,91 @@
+"""Tests for the pluggable JSON codec."""
+
+import json
+
+import pytest
+
+from datagov_mcp import json_codec
+from datagov_mcp.json_codec import OrjsonCodec, StdlibCodec, make_codec
+
+DOCUMENT = {
+    "success": True,
+    "result": {"records": [{"_id": 1, "עיר": "תל אביב", "value": 1.5, "missing": None}]},
+}
+
+
+def available_codecs():
+    codecs = [StdlibCodec()]
+    if json_codec.orjson_available():
+        codecs.append(OrjsonCodec())
+    return codecs
+
+
+@pytest.mark.parametrize("codec", available_codecs(), ids=lambda c: c.name)
+class TestCodecs:
+    """Test behavior shared by all codecs."""
+
+    def test_round_trip(self, codec):
+        assert codec.loads(codec.dumps(DOCUMENT)) == DOCUMENT
+        assert codec.loads(codec.dumps_bytes(DOCUMENT)) == DOCUMENT
+
+    def test_output_is_compact_utf8(self, codec):
+        text = codec.dumps(DOCUMENT)
+
+        assert "תל אביב" in text
+        assert ", " not in text and ": " not in text
+        assert json.loads(text) == DOCUMENT
+
+    def test_invalid_json_raises_value_error(self, codec):
+        with pytest.raises(ValueError):
+            codec.loads(b'{"success": ')
+
+    def test_large_integers(self, codec):
+        value = {"big": 2**70}
+
+        assert codec.loads(codec.dumps(value)) == pytest.approx(value)
+
+    @pytest.mark.parametrize(
+        "body",
+        [
+            b'{"value": NaN, "low": -Infinity}',
+            b'{"value": 1e400}',
+        ],
+        ids=["nan", "overflow"],
+    )
+    def test_decodes_like_the_standard_library(self, codec, body):
+        expected = json.dumps(json.loads(body))
+
+        assert json.dumps(codec.loads(body)) == expected
+        assert json.dumps(codec.loads(body.decode())) == expected
+
+
+def test_stdlib_decodes_wide_integers_exactly():
+    assert StdlibCodec().loads(b'{"id": 1180591620717411303425}') == {"id": 1180591620717411303425}
+
+
+class TestCodecSelection:
+    """Test choosing the codec."""
+
+    def test_json_forces_stdlib(self):
+        assert make_codec("json").name == "json"
+
+    def test_unknown_name_falls_back_to_auto(self):
+        assert make_codec("bogus").name == make_codec("auto").name
+
+    def test_orjson_missing_falls_back_to_stdlib(self, monkeypatch):
+        monkeypatch.setattr(json_codec, "orjson_available", lambda: False)
+
+        assert make_codec("orjson").name == "json"
+        assert make_codec("auto").name == "json"
+
+    def test_orjson_preferred_when_installed(self):
+        pytest.importorskip("orjson")
+
+        assert make_codec("auto").name == "orjson"
+
+    def test_set_codec_switches_module_functions(self, monkeypatch):
+        monkeypatch.setattr(json_codec, "codec", json_codec.codec)
+
+        assert json_codec.set_codec("json").name == "json"
+        assert json_codec.codec.name == "json"
+        assert json_codec.loads(json_codec.dumps(DOCUMENT)) == DOCUMENT
@@ -0,0 +1,193 @@
+"""Tests for latency histograms, counters and the metrics surfaces."""
+
+import httpx
+import pytest
+import respx
+from fastmcp import Client
+
+from datagov_mcp.api import BASE_URL, CKANAPIError, ckan_api_call
+from datagov_mcp.metrics import Histogram, Metrics, metrics
+from datagov_mcp.server import mcp, server_metrics
+
+
+class MockContext:
+    """Mock Context for testing."""
+
+    def __init__(self):
+        self.info_messages = []
+        self.error_messages = []
+
+    async def info(self, message: str):
+        self.info_messages.append(message)
+
+    async def error(self, message: str):
+        self.error_messages.append(message)
+
+
+class TestHistogram:
+    """Test the fixed-bucket histogram."""
+
+    def test_observe_and_cumulative_buckets(self):
+        hist = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            hist.observe(value)
+
+        assert hist.count == 4
+        assert hist.sum == pytest.approx(6.05)
+        assert list(hist.cumulative()) == [("0.1", 1), ("1", 3), ("+Inf", 4)]
+
+    def test_quantiles_interpolate_within_bucket(self):
+        hist = Histogram(buckets=(1.0, 2.0))
+        for _ in range(10):
+            hist.observe(1.5)
+
+        snapshot = hist.snapshot()
+
+        assert snapshot["p50"] == pytest.approx(1.5)
+        assert 1.0 < snapshot["p99"] <= 2.0
+        assert snapshot["mean"] == pytest.approx(1.5)
+
+    def test_empty_histogram(self):
+        assert Histogram().snapshot()["p95"] is None
+
+
+class TestMetrics:
+    """Test the metrics registry."""
+
+    def test_track_tool_times_and_counts_errors(self, clock):
+        registry = Metrics(clock=clock)
+
+        with registry.track_tool("package_search"):
+            assert registry.tools_in_flight["package_search"] == 1
+            clock.now += 0.2
+        with pytest.raises(RuntimeError):
+            with registry.track_tool("package_search"):
+                raise RuntimeError("boom")
+
+        tool = registry.snapshot()["tools"]["package_search"]
+        assert tool["count"] == 2
+        assert tool["errors"] == 1
+        assert tool["in_flight"] == 0
+        assert tool["sum"] == pytest.approx(0.2)
+
+    def test_disabled_registry_records_nothing(self):
+        registry = Metrics(enabled=False)
+
+        with registry.track_tool("license_list"):
+            pass
+        registry.upstream_finished("license_list", registry.upstream_started("license_list"), 200)
+        registry.record_retry("license_list")
+
+        assert registry.snapshot()["tools"] == {}
+        assert registry.snapshot()["actions"] == {}
+
+    def test_prometheus_exposition(self):
+        registry = Metrics()
+        with registry.track_tool('odd"name'):
+            pass
+        registry.record_cache("package_show", "hit")
+
+        text = registry.render_prometheus()
+
+        assert "# TYPE datagov_tool_duration_seconds histogram" in text
+        assert 'datagov_tool_duration_seconds_bucket{tool="odd\\"name",le="+Inf"} 1' in text
+        assert 'datagov_cache_outcomes_total{action="package_show",outcome="hit"} 1' in text
+        assert "datagov_response_cache_entries " in text
+
+    def test_prometheus_error_labels(self):
+        registry = Metrics()
+        with pytest.raises(ValueError), registry.track_tool("package_show"):
+            raise ValueError
+        with pytest.raises(ValueError), registry.track_action("package_show"):
+            raise ValueError
+
+        text = registry.render_prometheus()
+
+        assert 'datagov_tool_errors_total{tool="package_show"} 1' in text
+        assert 'datagov_ckan_call_errors_total{action="package_show"} 1' in text
+
+
+@pytest.mark.asyncio
+class TestCKANInstrumentation:
+    """Test that ckan_api_call feeds the global registry."""
+
+    @respx.mock
+    async def test_cache_outcomes_and_upstream_latency(self):
+        respx.get(f"{BASE_URL}/action/license_list").mock(
+            return_value=httpx.Response(200, json={"success": True, "result": []})
+        )
+
+        await ckan_api_call("license_list")
+        await ckan_api_call("license_list")
+
+        action = metrics.snapshot()["actions"]["license_list"]
+        assert action["count"] == 2
+        assert action["cache"] == {"hit": 1, "miss": 1}
+        assert action["upstream"]["count"] == 1
+        assert action["upstream"]["responses"] == {"200": 1}
+        assert action["upstream"]["in_flight"] == 0
+
+    @respx.mock
+    async def test_retries_and_errors_counted(self):
+        respx.get(f"{BASE_URL}/action/package_show").mock(
+            return_value=httpx.Response(503, text="unavailable")
+        )
+
+        with pytest.raises(CKANAPIError):
+            await ckan_api_call("package_show", params={"id": "x"}, max_retries=2)
+
+        action = metrics.snapshot()["actions"]["package_show"]
+        assert action["errors"] == 1
+        assert action["retries"] == 2
+        assert action["upstream"]["responses"] == {"503": 3}
+
+
+@pytest.mark.asyncio
+class TestMetricsSurfaces:
+    """Test the server_metrics tool, the middleware and the Prometheus endpoint."""
+
+    async def test_server_metrics_tool(self):
+        ctx = MockContext()
+
+        result = await server_metrics.fn(ctx)
+
+        assert {"tools", "actions", "response_cache", "transfer", "circuit_breakers"} <= set(result)
+
+    @respx.mock
+    async def test_middleware_times_tool_calls(self, monkeypatch):
+        monkeypatch.setattr("datagov_mcp.client._http_client.config.prewarm_connections", 0)
+        monkeypatch.setattr("datagov_mcp.client._http_client.config.refresh_interval", 0)
+        respx.get(f"{BASE_URL}/action/license_list").mock(
+            return_value=httpx.Response(200, json={"success": True, "result": []})
+        )
+
+        async with Client(mcp) as client:
+            await client.call_tool("license_list", {})
+
+        assert metrics.snapshot()["tools"]["license_list"]["count"] == 1
+
+    @respx.mock
+    async def test_middleware_counts_error_results(self, monkeypatch):
+        monkeypatch.setattr("datagov_mcp.client._http_client.config.refresh_interval", 0)
+        respx.get(f"{BASE_URL}/action/datastore_search").mock(
+            return_value=httpx.Response(
+                404, json={"success": False, "error": {"message": "Not found"}}
+            )
+        )
+
+        async with Client(mcp) as client:
+            result = await client.call_tool("resource_query", {"resource_id": "missing"})
+
+        assert "error" in result.structured_content
+        assert metrics.snapshot()["tools"]["resource_query"]["errors"] == 1
+
+    async def test_prometheus_endpoint(self):
+        metrics.record_cache("package_list", "miss")
+        transport = httpx.ASGITransport(app=mcp.http_app())
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'outcome="miss"' in response.text
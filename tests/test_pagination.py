@@ -0,0 +1,379 @@
+"""Tests for fetching whole datastore resources."""
+
+import asyncio
+import random
+
+import httpx
+import pytest
+import respx
+
+from datagov_mcp import json_codec
+from datagov_mcp.api import BASE_URL, CKANAPIError
+from datagov_mcp.cache import response_cache
+from datagov_mcp.pagination import (
+    FetchLimits,
+    SQLSupport,
+    decode_cursor,
+    encode_cursor,
+    estimate_bytes,
+    fetch_all_records,
+    keyset_possible,
+    keyset_sql,
+    plan_pages,
+    search_page,
+    search_sql,
+    sql_support,
+)
+from datagov_mcp.server import datastore_fetch_all, datastore_search
+
+pytestmark = pytest.mark.fake_ckan(datasets=1, rows_per_resource=1000)
+
+
+class MockContext:
+    """Mock Context for testing."""
+
+    def __init__(self):
+        self.info_messages = []
+        self.error_messages = []
+        self.progress = []
+
+    async def info(self, message: str):
+        self.info_messages.append(message)
+
+    async def error(self, message: str):
+        self.error_messages.append(message)
+
+    async def report_progress(self, progress, total=None, message=None):
+        self.progress.append((progress, total))
+
+
+def datastore(total: int, include_total: bool = True, delay: float = 0.0):
+    """respx side effect serving rows ``0..total-1`` by offset and limit."""
+    seen = []
+    active = 0
+    peak = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal active, peak
+        params = request.url.params
+        offset, limit = int(params["offset"]), int(params["limit"])
+        seen.append(dict(params))
+        active += 1
+        peak = max(peak, active)
+        # Later pages answer first, so reassembly has to restore the order
+        await asyncio.sleep(delay / (1 + offset))
+        active -= 1
+        result = {
+            "records": [
+                {"_id": i + 1, "value": i} for i in range(offset, min(total, offset + limit))
+            ],
+            "fields": [{"id": "_id", "type": "int"}, {"id": "value", "type": "int"}],
+        }
+        if include_total and params["include_total"] == "true":
+            result["total"] = total
+        return httpx.Response(200, json={"success": True, "result": result})
+
+    handler.seen = seen
+    handler.peak = lambda: peak
+    return handler
+
+
+def test_plan_pages():
+    assert plan_pages(10, 35, 10) == [(10, 10), (20, 10), (30, 5)]
+    assert plan_pages(10, 10, 10) == []
+
+
+def test_estimate_bytes():
+    cities = random.Random(0).choices(["תל אביב", "חיפה", "באר שבע", "אילת"], k=10_000)
+    records = [{"_id": i, "city": city} for i, city in enumerate(cities, 1)]
+    exact = len(json_codec.dumps_bytes(records))
+
+    assert estimate_bytes(records[:10]) == len(json_codec.dumps_bytes(records[:10]))
+    assert abs(estimate_bytes(records) - exact) / exact < 0.05
+    assert estimate_bytes([]) == 2
+
+
+class TestSQLSupport:
+    """Test remembering where datastore_search_sql is refused."""
+
+    @pytest.mark.asyncio
+    @respx.mock
+    async def test_resource_refusals_stay_with_the_resource(self):
+        def answer(request):
+            if '"private"' in request.url.params["sql"]:
+                return httpx.Response(
+                    403, json={"success": False, "error": {"message": "Not authorized"}}
+                )
+            return httpx.Response(200, json={"success": True, "result": {"records": []}})
+
+        route = respx.get(f"{BASE_URL}/action/datastore_search_sql").mock(side_effect=answer)
+
+        assert await search_sql('SELECT 1 FROM "private"', resource_id="private") is None
+        assert await search_sql('SELECT 2 FROM "private"', resource_id="private") is None
+        assert await search_sql('SELECT 1 FROM "r1"', resource_id="r1") == {"records": []}
+        assert route.call_count == 2
+        assert sql_support.available is True
+
+    def test_action_refusals_are_process_wide_until_rechecked(self, clock):
+        support = SQLSupport(ttl=60.0, clock=clock)
+
+        support.refuse(CKANAPIError("Not found: r1", 404), "r1")
+        assert not support.usable("r1")
+        assert support.usable("r2")
+
+        support.refuse(CKANAPIError("Access denied: datastore_search_sql is disabled", 403), "r2")
+        assert not support.usable()
+        assert not support.usable("r3")
+
+        clock.now = 61.0
+        assert support.usable("r1")
+        assert support.usable()
+
+
+class TestKeysetHelpers:
+    """Test cursors and keyset SQL."""
+
+    def test_cursor_round_trip(self):
+        cursor = encode_cursor({"after": 12345})
+        assert "=" not in cursor
+        assert decode_cursor(cursor) == {"after": 12345}
+
+    def test_invalid_cursor(self):
+        for position in ({"page": 2}, [1], {"after": "x"}, {"after": 1.5}, {"offset": -1}):
+            with pytest.raises(CKANAPIError) as exc_info:
+                decode_cursor(encode_cursor(position))
+            assert exc_info.value.status_code == 400
+        for cursor in ("not a cursor!", encode_cursor({"after": None})):
+            with pytest.raises(CKANAPIError) as exc_info:
+                decode_cursor(cursor)
+            assert exc_info.value.status_code == 400
+
+    def test_keyset_sql_quotes_names_and_values(self):
+        sql = keyset_sql(
+            'res"1', ["_id", "city"], {"city": "ג'ת", "n": [1, 2]}, after=10, upto=20, limit=5
+        )
+        assert sql == (
+            'SELECT "_id", "city" FROM "res""1" WHERE "city" = \'ג\'\'ת\' AND "n" IN (1, 2) '
+            'AND "_id" > 10 AND "_id" <= 20 ORDER BY "_id" LIMIT 5'
+        )
+
+    def test_keyset_possible(self):
+        assert keyset_possible({})
+        assert keyset_possible({"sort": "_id asc", "filters": {"city": "x"}})
+        assert not keyset_possible({"q": "text"})
+        assert not keyset_possible({"distinct": True})
+        assert not keyset_possible({"sort": "city"})
+        assert not keyset_possible({"records_format": "lists"})
+
+
+@pytest.mark.asyncio
+class TestKeysetPaging:
+    """Test keyset pages and scans against the fake CKAN."""
+
+    async def test_cursor_pages_follow_id(self, fake):
+        ids = []
+        cursor = ""
+        while True:
+            page = await search_page("res-0-0", {"fields": "city"}, limit=300, cursor=cursor)
+            result = page["result"]
+            assert result["paging"] == "keyset"
+            assert all(set(r) == {"city"} for r in result["records"])
+            ids.append(len(result["records"]))
+            cursor = result["next_cursor"]
+            if cursor is None:
+                break
+
+        assert ids == [300, 300, 300, 100]
+        # Every page after the first starts from the cursor, not an offset
+        assert fake.requests["datastore_search_sql"] == 4
+
+    async def test_repeated_scans_leave_cached_ids(self, fake):
+        cursor = encode_cursor({"after": 10})
+        pages = [await search_page("res-0-0", {"fields": "name,city"}, 10, cursor=cursor)]
+        pages.append(await search_page("res-0-0", {"fields": "name,city"}, 10, cursor=cursor))
+        fetches = [await fetch_all_records("res-0-0", params={"fields": "name"}, use_cache=True)]
+        fetches.append(
+            await fetch_all_records("res-0-0", params={"fields": "name"}, use_cache=True)
+        )
+
+        assert pages[0] == pages[1]
+        assert set(pages[1]["result"]["records"][0]) == {"name", "city"}
+        assert decode_cursor(pages[1]["result"]["next_cursor"]) == {"after": 20}
+        assert fetches[0]["records"] == fetches[1]["records"]
+        assert fetches[1]["returned"] == 1000
+
+    async def test_bulk_pages_bypass_the_response_cache(self, fake):
+        first, second = await asyncio.gather(
+            fetch_all_records("res-0-0"), fetch_all_records("res-0-0")
+        )
+
+        assert first["records"] == second["records"]
+        assert len(response_cache) == 0
+        # The _id bounds query and each page are still requested once for both calls
+        assert fake.requests["datastore_search_sql"] == 1 + first["pages"]
+
+    async def test_tool_falls_back_to_offset(self, fake):
+        ctx = MockContext()
+        result = await datastore_search.fn(
+            ctx, resource_id="res-0-0", q="רשומה", limit=10, offset=20, paging="keyset"
+        )
+
+        assert result["result"]["paging"] == "offset"
+        assert result["result"]["records"][0]["_id"] == 21
+        assert decode_cursor(result["result"]["next_cursor"]) == {"offset": 30}
+        assert fake.requests["datastore_search_sql"] == 0
+
+    async def test_empty_pages_end_the_scan(self, fake):
+        keyset = await search_page("res-0-0", limit=0)
+        offset = await search_page("res-0-0", params={"q": "רשומה"}, limit=0)
+
+        assert keyset["result"]["paging"] == "keyset"
+        assert keyset["result"]["next_cursor"] is None
+        assert offset["result"]["paging"] == "offset"
+        assert offset["result"]["next_cursor"] is None
+
+    async def test_tool_rejects_malformed_cursors(self, fake):
+        ctx = MockContext()
+        with pytest.raises(CKANAPIError) as exc_info:
+            await datastore_search.fn(
+                ctx, resource_id="res-0-0", cursor=encode_cursor({"after": "x"})
+            )
+
+        assert exc_info.value.status_code == 400
+        assert ctx.error_messages == ["Failed to search datastore: Invalid cursor"]
+
+    async def test_sql_disabled_falls_back_once(self, fake):
+        fake.config.sql_enabled = False
+
+        first = await search_page("res-0-0", limit=10, offset=990)
+        second = await search_page("res-0-0", limit=10, cursor=first["result"]["next_cursor"])
+
+        assert first["result"]["paging"] == "offset"
+        assert [r["_id"] for r in first["result"]["records"]] == list(range(991, 1001))
+        assert second["result"]["records"] == []
+        assert second["result"]["next_cursor"] is None
+        assert sql_support.available is False
+        assert fake.requests["datastore_search_sql"] == 1
+
+    async def test_fetch_all_in_id_slices(self, fake):
+        progress = []
+
+        async def report(fetched, expected):
+            progress.append((fetched, expected))
+
+        result = await fetch_all_records(
+            "res-0-0", page_size=100, limits=FetchLimits(concurrency=3), progress=report
+        )
+
+        assert result["paging"] == "keyset"
+        assert [r["_id"] for r in result["records"]] == list(range(1, 1001))
+        assert result["truncated"] is None
+        assert result["next_cursor"] is None
+        assert result["pages"] == 10
+        assert progress[-1] == (1000, 1000)
+        assert fake.requests["datastore_search"] == 1  # field list only
+
+    async def test_fetch_all_resumes_from_cursor(self, fake):
+        first = await fetch_all_records(
+            "res-0-0", params={"fields": "city"}, max_rows=250, page_size=100
+        )
+        rest = await fetch_all_records(
+            "res-0-0", params={"fields": "city"}, cursor=first["next_cursor"], page_size=100
+        )
+
+        assert first["returned"] == 250
+        assert first["truncated"] == "max_rows"
+        assert all(set(r) == {"city"} for r in first["records"])
+        assert decode_cursor(first["next_cursor"]) == {"after": 250}
+        assert rest["total"] == 750
+        assert rest["returned"] == 750
+        assert rest["truncated"] is None
+
+
+@pytest.mark.asyncio
+class TestFetchAll:
+    """Test concurrent offset paging, ordering and caps."""
+
+    @pytest.fixture(autouse=True)
+    def offset_paging(self, monkeypatch):
+        """Serve these tests by offset, as on a portal without datastore_search_sql."""
+        sql_support.refuse(CKANAPIError("Action name not known: datastore_search_sql", 400))
+
+    @respx.mock
+    async def test_fetches_pages_concurrently_in_order(self):
+        handler = datastore(total=95, delay=0.01)
+        respx.get(f"{BASE_URL}/action/datastore_search").mock(side_effect=handler)
+        progress = []
+
+        async def report(fetched, expected):
+            progress.append((fetched, expected))
+
+        result = await fetch_all_records(
+            "r1", page_size=10, limits=FetchLimits(concurrency=3), progress=report
+        )
+
+        assert [r["_id"] for r in result["records"]] == list(range(1, 96))
+        assert result["total"] == 95
+        assert result["pages"] == 10
+        assert result["truncated"] is None
+        assert result["next_offset"] is None
+        assert handler.peak() <= 3
+        assert [s["include_total"] for s in handler.seen].count("true") == 1
+        assert all(s["sort"] == "_id" for s in handler.seen)
+        assert progress[-1] == (95, 95)
+        assert len(progress) == 10
+
+    @respx.mock
+    async def test_row_cap(self):
+        handler = datastore(total=1000)
+        respx.get(f"{BASE_URL}/action/datastore_search").mock(side_effect=handler)
+
+        result = await fetch_all_records(
+            "r1", offset=100, max_rows=500, page_size=100, limits=FetchLimits(max_rows=250)
+        )
+
+        assert result["returned"] == 250
+        assert result["records"][0]["_id"] == 101
+        assert result["truncated"] == "max_rows"
+        assert result["next_offset"] == 350
+        assert len(handler.seen) == 3
+
+    @respx.mock
+    async def test_byte_cap(self):
+        respx.get(f"{BASE_URL}/action/datastore_search").mock(side_effect=datastore(total=1000))
+
+        result = await fetch_all_records("r1", page_size=100, limits=FetchLimits(max_bytes=5000))
+
+        assert 0 < result["returned"] < 1000
+        assert result["returned"] % 100 == 0
+        assert result["truncated"] == "max_bytes"
+        assert result["next_offset"] == result["returned"]
+
+    @respx.mock
+    async def test_without_total_pages_until_short_page(self):
+        handler = datastore(total=25, include_total=False)
+        respx.get(f"{BASE_URL}/action/datastore_search").mock(side_effect=handler)
+
+        result = await fetch_all_records("r1", page_size=10)
+
+        assert result["returned"] == 25
+        assert result["total"] is None
+        assert result["truncated"] is None
+        assert len(handler.seen) == 3
+
+    @respx.mock
+    async def test_tool_reports_progress_and_errors(self):
+        route = respx.get(f"{BASE_URL}/action/datastore_search")
+        route.mock(side_effect=datastore(total=30))
+        ctx = MockContext()
+
+        result = await datastore_fetch_all.fn(ctx, resource_id="r1", page_size=10)
+
+        assert result["returned"] == 30
+        assert ctx.progress[-1] == (30, 30)
+
+        route.mock(return_value=httpx.Response(404, json={"success": False, "error": {}}))
+        result = await datastore_fetch_all.fn(ctx, resource_id="missing")
+
+        assert "error" in result
+        assert ctx.error_messages
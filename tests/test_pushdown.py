@@ -0,0 +1,200 @@
+"""Tests for projection and filter pushdown in the visualization tools."""
+
+import json
+
+import httpx
+import pytest
+import respx
+
+from datagov_mcp import columnar
+from datagov_mcp.api import BASE_URL, CKANAPIError
+from datagov_mcp.columnar import ColumnStore
+from datagov_mcp.pushdown import bbox_ranges, plan_scan
+from datagov_mcp.visualization import chart_generator, map_generator
+
+POINTS = [
+    {"_id": 1, "name": "תל אביב", "lat": "32.0853", "lon": "34.7818", "kind": "city"},
+    {"_id": 2, "name": "אילת", "lat": "29.5577", "lon": "34.9519", "kind": "city"},
+    {"_id": 3, "name": "unknown", "lat": "", "lon": None, "kind": "city"},
+]
+
+
+class MockContext:
+    """Mock Context for testing."""
+
+    def __init__(self):
+        self.info_messages = []
+        self.error_messages = []
+
+    async def info(self, message: str):
+        self.info_messages.append(message)
+
+    async def error(self, message: str):
+        self.error_messages.append(message)
+
+
+def ok(result):
+    return httpx.Response(200, json={"success": True, "result": result})
+
+
+class TestPlan:
+    """Test planning and compiling reads."""
+
+    def test_sql(self):
+        plan = plan_scan(
+            "r1",
+            ["lat", "lon", "lat", ""],
+            {"kind": "city"},
+            not_null=["lat"],
+            ranges={"lon": (34.5, None)},
+        )
+
+        assert plan.fields == ["lat", "lon"]
+        assert plan.sql(10) == (
+            'SELECT "lat", "lon" FROM "r1" WHERE "kind" = \'city\' '
+            'AND "lat" IS NOT NULL AND "lat"::text <> \'\' '
+            'AND (CASE WHEN "lon"::text ~ '
+            "'^\\s*[-+]?([0-9]+\\.?[0-9]*|\\.[0-9]+)([eE][-+]?[0-9]+)?\\s*$' "
+            'THEN "lon"::text::numeric END) >= 34.5 ORDER BY "_id" LIMIT 10'
+        )
+        assert plan_scan("r1", ["a"]).sql(5) == 'SELECT "a" FROM "r1" ORDER BY "_id" LIMIT 5'
+
+    def test_matches(self):
+        plan = plan_scan(
+            "r1",
+            ["lat", "lon"],
+            {"kind": ["city", "town"]},
+            ["lat"],
+            bbox_ranges("lat", "lon", [34, 29, 35, 31]),
+        )
+
+        assert [plan.matches(p) for p in POINTS] == [False, True, False]
+        assert plan.matches({"lat": 30, "lon": 34.5, "kind": "village"})
+        assert not plan.matches({"lat": 30, "lon": 34.5, "kind": "village"}, check_filters=True)
+
+    def test_rejects_bad_input(self):
+        for bbox in ([1, 2, 3], ["a", 1, 2, 3], [35, 29, 34, 31]):
+            with pytest.raises(CKANAPIError) as exc:
+                bbox_ranges("lat", "lon", bbox)
+            assert exc.value.status_code == 400
+        with pytest.raises(CKANAPIError):
+            plan_scan("r1", ["a"], filters="kind=city")
+
+
+@pytest.mark.asyncio
+class TestTools:
+    """Test the requests the tools send."""
+
+    @respx.mock
+    async def test_chart_projects_and_filters(self):
+        route = respx.get(f"{BASE_URL}/action/datastore_search").mock(
+            return_value=ok(
+                {"fields": [{"id": "name"}, {"id": "lat"}], "records": [["תל אביב", "32.0853"]]}
+            )
+        )
+
+        result = await chart_generator.fn(
+            MockContext(), "r1", "bar", "name", "lat", filters={"kind": "city"}
+        )
+
+        params = route.calls.last.request.url.params
+        assert params["fields"] == "name,lat"
+        assert json.loads(params["filters"]) == {"kind": "city"}
+        assert result["vega_lite_spec"]["data"]["values"] == [{"name": "תל אביב", "lat": "32.0853"}]
+
+    @respx.mock
+    async def test_map_bbox_in_sql(self):
+        statements = []
+
+        def answer(request):
+            statements.append(request.url.params["sql"])
+            return ok({"records": [{"lat": "29.5577", "lon": "34.9519", "name": "אילת"}]})
+
+        respx.get(f"{BASE_URL}/action/datastore_search_sql").mock(side_effect=answer)
+
+        result = await map_generator.fn(
+            MockContext(),
+            "r1",
+            "lat",
+            "lon",
+            popup_fields=["name"],
+            bbox=[34, 29, 35, 31],
+            filters={"kind": "city"},
+        )
+
+        assert result["point_count"] == 1
+        assert result["geojson"]["features"][0]["properties"] == {"name": "אילת"}
+        assert statements[0].startswith('SELECT "lat", "lon", "name" FROM "r1" WHERE "kind"')
+        assert "<= 31.0" in statements[0]
+
+    @respx.mock
+    async def test_map_bbox_falls_back_without_sql(self):
+        respx.get(f"{BASE_URL}/action/datastore_search_sql").mock(
+            return_value=httpx.Response(403, json={"success": False, "error": {}})
+        )
+        search = respx.get(f"{BASE_URL}/action/datastore_search").mock(
+            return_value=ok({"records": POINTS})
+        )
+
+        result = await map_generator.fn(MockContext(), "r1", "lat", "lon", bbox=[34, 29, 35, 31])
+
+        assert search.calls.last.request.url.params["fields"] == "lat,lon"
+        assert result["point_count"] == 1
+        assert result["geojson"]["features"][0]["properties"] == {}
+
+    @respx.mock
+    async def test_map_reads_on_until_limit_points_have_coordinates(self):
+        # Every other row has no coordinates
+        rows = [[str(30 + i / 100), "35.0"] if i % 2 else ["", None] for i in range(100)]
+
+        def answer(request):
+            offset = int(request.url.params.get("offset", 0))
+            limit = int(request.url.params["limit"])
+            page = rows[offset : offset + limit]
+            return ok({"fields": [{"id": "lat"}, {"id": "lon"}], "records": page})
+
+        route = respx.get(f"{BASE_URL}/action/datastore_search").mock(side_effect=answer)
+
+        result = await map_generator.fn(MockContext(), "r1", "lat", "lon", limit=20)
+
+        assert result["point_count"] == 20
+        assert [call.request.url.params.get("offset", "0") for call in route.calls] == [
+            "0",
+            "20",
+        ]
+
+    @respx.mock
+    async def test_streamed_map_reads_on_until_limit_points_have_coordinates(self):
+        rows = [
+            {"lat": str(30 + i / 10000), "lon": "35.0"} if i % 2 else {"lat": "", "lon": None}
+            for i in range(3000)
+        ]
+
+        def answer(request):
+            offset = int(request.url.params["offset"])
+            limit = int(request.url.params["limit"])
+            return ok({"records": rows[offset : offset + limit]})
+
+        route = respx.get(f"{BASE_URL}/action/datastore_search").mock(side_effect=answer)
+
+        result = await map_generator.fn(MockContext(), "r1", "lat", "lon", limit=1200)
+
+        assert result["point_count"] == 1200
+        assert [call.request.url.params["offset"] for call in route.calls] == ["0", "1200"]
+
+    @pytest.mark.fake_ckan(datasets=1, rows_per_resource=300)
+    async def test_filters_apply_to_local_tables(self, fake, tmp_path, monkeypatch):
+        monkeypatch.setattr(columnar, "column_store", ColumnStore(tmp_path / "columns"))
+        ctx = MockContext()
+
+        chart = await chart_generator.fn(
+            ctx, "res-0-0", "bar", "city", whole_resource=True, filters={"city": "חיפה"}
+        )
+        points = await map_generator.fn(
+            ctx, "res-0-0", "lat", "lon", limit=300, filters={"city": ["חיפה", "נתניה"]}
+        )
+
+        groups = chart["vega_lite_spec"]["data"]["values"]
+        assert [g["city"] for g in groups] == ["חיפה"]
+        assert 0 < groups[0]["count"] < 300
+        assert points["point_count"] > groups[0]["count"]
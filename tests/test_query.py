@@ -0,0 +1,217 @@
+"""Tests for local filter / group-by / aggregate queries."""
+
+import pytest
+
+from datagov_mcp import api, columnar
+from datagov_mcp.columnar import ColumnStore
+from datagov_mcp.query import execute, parse_order, predicate, referenced_fields
+from datagov_mcp.server import resource_query
+
+pytestmark = pytest.mark.fake_ckan(datasets=1, rows_per_resource=200)
+
+COLUMNS = {
+    "city": ["חיפה", "חיפה", "ירושלים", None, "תל אביב"],
+    "year": ["2023", "2024", "2023", "2023", "2024"],
+    "amount": ["10", "30", None, "20.5", "x"],
+}
+
+
+class MockContext:
+    """Mock Context for testing."""
+
+    def __init__(self):
+        self.info_messages = []
+        self.error_messages = []
+
+    async def info(self, message: str):
+        self.info_messages.append(message)
+
+    async def error(self, message: str):
+        self.error_messages.append(message)
+
+
+class TestPredicates:
+    """Test compiling where conditions."""
+
+    def test_compares_numeric_text_as_numbers(self):
+        assert predicate("gt", 9)("10")
+        assert not predicate("lt", "9")("10")
+        assert predicate("eq", 20.5)("20.5")
+        # Text is only ordered against text
+        assert not predicate("gt", 5)("x")
+        assert predicate("lt", "b")("a")
+
+    def test_membership_and_nulls(self):
+        assert predicate("in", [2023, "2024"])("2023")
+        assert predicate("not_in", ["a"])("b")
+        assert predicate("contains", "ABC")("xabcx")
+        assert predicate("is_null")("")
+        assert not predicate("not_null")(None)
+
+    def test_rejects_bad_operators(self):
+        with pytest.raises(api.CKANAPIError) as exc:
+            predicate("like", "a")
+        assert exc.value.status_code == 400
+        with pytest.raises(api.CKANAPIError):
+            predicate("in", "a")
+
+    def test_parse_order_and_referenced_fields(self):
+        assert parse_order("count desc, city,  , x asc") == [
+            ("count", True),
+            ("city", False),
+            ("x", False),
+        ]
+        assert referenced_fields(None, [{"field": "a"}], None, None) == []
+        assert referenced_fields(["a"], [{"field": "b"}], ["c"], [{"op": "count"}]) == [
+            "a",
+            "c",
+            "b",
+        ]
+
+
+class TestExecute:
+    """Test running queries over columns."""
+
+    def test_filter_and_project(self):
+        result = execute(
+            COLUMNS,
+            5,
+            select=["city", "amount"],
+            where=[
+                {"field": "year", "op": "eq", "value": 2023},
+                {"field": "city", "op": "not_null"},
+            ],
+            order_by="amount desc",
+        )
+
+        assert result == {
+            "columns": ["city", "amount"],
+            "rows": [{"city": "חיפה", "amount": "10"}, {"city": "ירושלים", "amount": None}],
+            "matched": 2,
+        }
+
+    def test_group_and_aggregate(self):
+        result = execute(
+            COLUMNS,
+            5,
+            group_by=["year"],
+            aggregates=[
+                {"op": "count"},
+                {"op": "sum", "field": "amount", "as": "total"},
+                {"op": "count_distinct", "field": "city"},
+            ],
+            order_by="total desc",
+        )
+
+        assert result["columns"] == ["year", "count", "total", "count_distinct_city"]
+        assert result["rows"] == [
+            {"year": "2023", "count": 3, "total": 30.5, "count_distinct_city": 2},
+            {"year": "2024", "count": 2, "total": 30.0, "count_distinct_city": 2},
+        ]
+
+    def test_groups_json_values(self):
+        columns = {
+            "tags": [["a", "b"], ["a", "b"], {"k": 1}, '["a", "b"]', None],
+            "id": [1, 2, 3, 4, 5],
+        }
+
+        result = execute(
+            columns,
+            5,
+            where=[{"field": "tags", "op": "not_in", "value": [{"k": 1}]}],
+            group_by=["tags"],
+            aggregates=[{"op": "count"}, {"op": "count_distinct", "field": "tags"}],
+        )
+
+        assert result["rows"] == [
+            {"tags": ["a", "b"], "count": 2, "count_distinct_tags": 1},
+            {"tags": '["a", "b"]', "count": 1, "count_distinct_tags": 1},
+            {"tags": None, "count": 1, "count_distinct_tags": 0},
+        ]
+
+    def test_range_conditions_skip_booleans_and_json_values(self):
+        columns = {"flag": [True, ["x"], {"k": "z"}, "y", 5]}
+
+        def matching(op, value):
+            return execute(columns, 5, where=[{"field": "flag", "op": op, "value": value}])
+
+        assert matching("lt", "x")["rows"] == []
+        assert matching("ge", "x")["rows"] == [{"flag": "y"}]
+        assert matching("gt", 0)["rows"] == [{"flag": 5}]
+
+    def test_aggregates_without_groups_and_paging(self):
+        whole = execute(COLUMNS, 5, aggregates=[{"op": "mean", "field": "amount"}])
+        paged = execute(COLUMNS, 5, select=["city"], order_by="city", limit=2, offset=3)
+
+        assert whole["rows"] == [{"mean_amount": 20.166666666666668}]
+        assert paged == {
+            "columns": ["city"],
+            "rows": [{"city": "תל אביב"}, {"city": None}],
+            "matched": 5,
+        }
+
+    def test_rejects_invalid_specs(self):
+        for spec in (
+            {"select": ["nope"]},
+            {"where": [{"field": "nope", "op": "eq", "value": 1}]},
+            {"aggregates": [{"op": "median", "field": "amount"}]},
+            {"aggregates": [{"op": "sum"}]},
+            {"select": ["city"], "order_by": "year"},
+            {"limit": -1},
+            {"offset": -1},
+        ):
+            with pytest.raises(api.CKANAPIError):
+                execute(COLUMNS, 5, **spec)
+
+
+@pytest.mark.asyncio
+class TestResourceQueryTool:
+    """Test the resource_query tool against the fake CKAN."""
+
+    async def test_fetches_only_referenced_fields(self, fake):
+        ctx = MockContext()
+        result = await resource_query.fn(
+            ctx,
+            resource_id="res-0-0",
+            where=[{"field": "count", "op": "ge", "value": 0}],
+            group_by=["city"],
+            order_by="count desc",
+            limit=3,
+        )
+
+        assert result["source"] == "fetched"
+        assert result["scanned"] == 200
+        assert result["columns"] == ["city", "count"]
+        assert sum(r["count"] for r in result["rows"]) <= 200
+        assert result["returned"] == 3
+
+    async def test_repeated_queries_agree(self, fake):
+        ctx = MockContext()
+        first = await resource_query.fn(ctx, resource_id="res-0-0", group_by=["city"])
+        second = await resource_query.fn(ctx, resource_id="res-0-0", group_by=["city"])
+
+        assert first["rows"] == second["rows"]
+        assert sum(r["count"] for r in second["rows"]) == 200
+
+    async def test_reads_the_column_store(self, fake, tmp_path, monkeypatch):
+        store = ColumnStore(tmp_path / "columns")
+        monkeypatch.setattr(columnar, "column_store", store)
+        ctx = MockContext()
+
+        first = await resource_query.fn(ctx, resource_id="res-0-0", aggregates=[{"op": "count"}])
+        requests = dict(fake.requests)
+        second = await resource_query.fn(
+            ctx, resource_id="res-0-0", select=["_id"], order_by="_id desc", limit=1
+        )
+
+        assert first["source"] == "local"
+        assert first["rows"] == [{"count": 200}]
+        assert second["rows"] == [{"_id": 200}]
+        assert fake.requests == requests
+
+    async def test_reports_invalid_queries(self, fake):
+        ctx = MockContext()
+        result = await resource_query.fn(ctx, resource_id="res-0-0", select=["missing"])
+
+        assert "unknown field 'missing'" in result["error"]
+        assert ctx.error_messages
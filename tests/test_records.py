@@ -0,0 +1,124 @@
+"""Tests for compact records_format pages decoded to columns."""
+
+import httpx
+import pytest
+import respx
+
+from benchmarks.fake_ckan import make_row
+from datagov_mcp import api
+from datagov_mcp.api import BASE_URL
+from datagov_mcp.client import transfer_stats
+from datagov_mcp.records import ColumnPage, decode_csv, decode_records, search_columns
+from datagov_mcp.server import fetch_data
+from datagov_mcp.visualization import dataset_profile
+
+pytestmark = pytest.mark.fake_ckan(datasets=1, rows_per_resource=50)
+
+FIELDS = [
+    {"id": "_id", "type": "int"},
+    {"id": "city", "type": "text"},
+    {"id": "value", "type": "numeric"},
+    {"id": "open", "type": "bool"},
+    {"id": "date", "type": "timestamp"},
+]
+
+
+class MockContext:
+    """Mock Context for testing."""
+
+    def __init__(self):
+        self.info_messages = []
+        self.error_messages = []
+
+    async def info(self, message: str):
+        self.info_messages.append(message)
+
+    async def error(self, message: str):
+        self.error_messages.append(message)
+
+
+class TestDecode:
+    """Test decoding each records_format into columns."""
+
+    def test_lists_and_objects(self):
+        lists = [[1, "חיפה", 2.5, True, None], [2, "", None, False, "2024-01-01T00:00:00"]]
+        objects = [dict(zip([f["id"] for f in FIELDS], row)) for row in lists]
+
+        assert decode_records(FIELDS, lists) == decode_records(FIELDS, objects)
+        assert decode_records(FIELDS, lists)[1] == ["חיפה", ""]
+        assert decode_records(FIELDS, []) == [[], [], [], [], []]
+
+    def test_csv_converts_by_field_type(self):
+        text = '1,חיפה,2.5,t,\r\n2,"",,f,2024-01-01T00:00:00\r\n3,x,"1,5",,\r\n'
+
+        assert decode_csv(FIELDS, text) == [
+            [1, 2, 3],
+            ["חיפה", "", "x"],
+            [2.5, None, "1,5"],
+            [True, False, None],
+            [None, "2024-01-01T00:00:00", None],
+        ]
+        assert decode_records(FIELDS, "") == [[], [], [], [], []]
+
+    def test_column_page(self):
+        page = ColumnPage.from_records(FIELDS[:2], [[1, "a"], [2, "b"]], total=10)
+
+        assert (page.rows, page.total) == (2, 10)
+        assert page.column("city", limit=1) == ["a"]
+        assert page.records(["city", "missing"]) == [{"city": "a"}, {"city": "b"}]
+        assert page.records(limit=1) == [{"_id": 1, "city": "a"}]
+        # Objects without fields take their columns from the records
+        assert ColumnPage.from_records([], [{"a": 1}, {"b": 2}]).records() == [
+            {"a": 1, "b": None},
+            {"a": None, "b": 2},
+        ]
+
+
+@pytest.mark.asyncio
+class TestSearchColumns:
+    """Test fetching pages decoded to columns."""
+
+    @pytest.mark.parametrize("records_format", ["lists", "csv"])
+    async def test_matches_objects(self, fake, records_format):
+        page = await search_columns("res-0-0", 20, offset=10, records_format=records_format)
+
+        assert page.total == 50
+        assert page.records() == [
+            make_row(fake._resource_seed("res-0-0"), i) for i in range(10, 30)
+        ]
+
+    @pytest.mark.parametrize("records_format", ["lists", "csv"])
+    async def test_transfers_less_than_objects(self, fake, records_format):
+        def received() -> int:
+            return transfer_stats.stats()["actions"]["datastore_search"]["decompressed_bytes"]
+
+        await api.ckan_api_call("datastore_search", params={"resource_id": "res-0-0", "limit": 50})
+        objects = received()
+        await search_columns("res-0-0", 50, records_format=records_format)
+
+        assert received() - objects < objects * 0.75
+
+    @respx.mock
+    async def test_tools_request_lists(self):
+        route = respx.get(f"{BASE_URL}/action/datastore_search").mock(
+            return_value=httpx.Response(
+                200,
+                json={
+                    "success": True,
+                    "result": {"fields": FIELDS[:2], "records": [[1, "חיפה"], [2, "חיפה"]]},
+                },
+            )
+        )
+        respx.get(f"{BASE_URL}/action/package_show").mock(
+            return_value=httpx.Response(
+                200, json={"success": True, "result": {"resources": [{"id": "r1"}]}}
+            )
+        )
+        ctx = MockContext()
+
+        profile = await dataset_profile.fn(ctx, resource_id="r1")
+        data = await fetch_data.fn(ctx, dataset_name="d", limit=2)
+
+        assert route.calls.last.request.url.params["records_format"] == "lists"
+        assert profile["fields"][0]["stats"]["top_values"] == {"חיפה": 2}
+        assert data["records"] == [{"_id": 1, "city": "חיפה"}, {"_id": 2, "city": "חיפה"}]
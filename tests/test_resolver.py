@@ -0,0 +1,158 @@
+"""Tests for the dataset-to-resource resolver index."""
+
+import httpx
+import pytest
+import respx
+
+from datagov_mcp.api import BASE_URL
+from datagov_mcp.resolver import ResourceIndex, rank_resources, resource_index
+from datagov_mcp.server import fetch_data, package_search
+
+PDF = {"id": "pdf", "format": "PDF", "datastore_active": False}
+XLSX = {"id": "xlsx", "format": "XLSX", "datastore_active": True, "size": 900}
+OLD_CSV = {"id": "old", "format": "CSV", "datastore_active": True, "last_modified": "2023-01-01"}
+NEW_CSV = {"id": "new", "format": "csv", "datastore_active": True, "last_modified": "2024-06-01"}
+
+
+class MockContext:
+    """Mock Context for testing."""
+
+    def __init__(self):
+        self.info_messages = []
+        self.error_messages = []
+
+    async def info(self, message: str):
+        self.info_messages.append(message)
+
+    async def error(self, message: str):
+        self.error_messages.append(message)
+
+
+def package(resources, modified="2024-01-01T00:00:00", name="budget"):
+    return {"id": f"id-{name}", "name": name, "metadata_modified": modified, "resources": resources}
+
+
+def ok(result):
+    return httpx.Response(200, json={"success": True, "result": result})
+
+
+def mock_search():
+    return respx.get(f"{BASE_URL}/action/datastore_search").mock(
+        return_value=ok({"fields": [{"id": "_id"}], "records": [[1]]})
+    )
+
+
+class TestRanking:
+    """Test choosing a dataset's best resource."""
+
+    def test_prefers_datastore_csv_then_newest(self):
+        ranked = rank_resources([PDF, XLSX, OLD_CSV, NEW_CSV])
+
+        assert [r["id"] for r in ranked] == ["new", "old", "xlsx"]
+        assert ranked[0]["format"] == "csv"
+
+    def test_considers_all_resources_without_datastore_flags(self):
+        ranked = rank_resources([{"id": "a", "format": "PDF"}, {"id": "b", "format": "CSV"}])
+
+        assert [r["id"] for r in ranked] == ["b", "a"]
+        assert rank_resources([PDF]) == []
+
+
+class TestIndex:
+    """Test index lookups, expiry and invalidation."""
+
+    def test_lookup_by_name_or_id_until_expiry(self, clock):
+        index = ResourceIndex(ttl=60.0, clock=clock)
+        index.observe(package([NEW_CSV]))
+
+        assert index.lookup("budget").best["id"] == "new"
+        assert index.lookup("id-budget") is index.lookup("budget")
+        clock.now += 61
+        assert index.lookup("budget") is None
+
+    def test_metadata_changes_replace_entries(self):
+        index = ResourceIndex()
+        index.observe(package([OLD_CSV]))
+        index.observe(package([OLD_CSV]))
+        index.observe(package([OLD_CSV, NEW_CSV], modified="2024-06-01T00:00:00"))
+
+        assert index.lookup("budget").best["id"] == "new"
+        assert index.invalidations == 1
+        index.invalidate("id-budget")
+        assert index.lookup("budget") is None
+
+    def test_evicts_least_recently_used(self):
+        index = ResourceIndex(max_entries=2)
+        for name in ("a", "b"):
+            index.observe(package([NEW_CSV], name=name))
+        index.lookup("a")
+        index.observe(package([NEW_CSV], name="c"))
+
+        assert index.lookup("b") is None
+        assert index.lookup("a") is not None
+        assert index.stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+class TestFetchData:
+    """Test fetch_data resolving through the index."""
+
+    @respx.mock
+    async def test_resolves_once_and_skips_non_datastore_resources(self):
+        show = respx.get(f"{BASE_URL}/action/package_show").mock(
+            return_value=ok(package([PDF, XLSX, NEW_CSV]))
+        )
+        search = mock_search()
+        ctx = MockContext()
+
+        first = await fetch_data.fn(ctx, dataset_name="budget")
+        second = await fetch_data.fn(ctx, dataset_name="id-budget", offset=100)
+
+        assert first["resource_id"] == second["resource_id"] == "new"
+        assert first["records"] == [{"_id": 1}]
+        assert show.call_count == 1
+        assert search.call_count == 2
+        assert resource_index.stats()["hits"] == 1
+
+    @respx.mock
+    async def test_package_search_warms_the_index(self):
+        show = respx.get(f"{BASE_URL}/action/package_show").mock(return_value=ok(package([])))
+        respx.get(f"{BASE_URL}/action/package_search").mock(
+            return_value=ok({"count": 1, "results": [package([XLSX])]})
+        )
+        mock_search()
+        ctx = MockContext()
+
+        await package_search.fn(ctx, q="budget")
+        result = await fetch_data.fn(ctx, dataset_name="budget")
+
+        assert result["resource"]["format"] == "XLSX"
+        assert show.call_count == 0
+
+    @respx.mock
+    async def test_reports_datasets_without_datastore_resources(self):
+        respx.get(f"{BASE_URL}/action/package_show").mock(return_value=ok(package([PDF])))
+
+        result = await fetch_data.fn(MockContext(), dataset_name="budget")
+
+        assert result == {
+            "error": "No datastore resources found in dataset 'budget' (resource formats: PDF)"
+        }
+
+    @respx.mock
+    async def test_re_resolves_a_removed_resource(self):
+        respx.get(f"{BASE_URL}/action/package_show").mock(
+            side_effect=[ok(package([OLD_CSV])), ok(package([NEW_CSV], modified="2024-06-02"))]
+        )
+
+        def answer(request):
+            if request.url.params["resource_id"] == "old":
+                return httpx.Response(404, json={"success": False, "error": {"message": "gone"}})
+            return ok({"fields": [{"id": "_id"}], "records": [[1]]})
+
+        respx.get(f"{BASE_URL}/action/datastore_search").mock(side_effect=answer)
+
+        result = await fetch_data.fn(MockContext(), dataset_name="budget")
+
+        assert result["resource_id"] == "new"
+        assert resource_index.lookup("budget").best["id"] == "new"
@@ -0,0 +1,148 @@
+"""Tests for retry backoff, Retry-After handling and the retry budget."""
+
+import pytest
+import respx
+from httpx import ConnectError, Response
+
+from datagov_mcp.api import BASE_URL, CKANAPIError, ckan_api_call
+from datagov_mcp.retry import RetryBudget, RetryPolicy, parse_retry_after, retry_budget
+
+
+class TestRetryPolicy:
+    """Test backoff delay calculation."""
+
+    def test_backoff_grows_exponentially_up_to_cap(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+        assert policy.backoff(0, rng=lambda: 1.0) == 1.0
+        assert policy.backoff(1, rng=lambda: 1.0) == 2.0
+        assert policy.backoff(2, rng=lambda: 1.0) == 4.0
+        assert policy.backoff(3, rng=lambda: 1.0) == 5.0
+
+    def test_backoff_full_jitter(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+        assert policy.backoff(2, rng=lambda: 0.0) == 0.0
+        assert policy.backoff(2, rng=lambda: 0.5) == 2.0
+
+    def test_retry_after_takes_precedence_and_is_capped(self):
+        policy = RetryPolicy(base_delay=1.0, max_retry_after=10.0)
+        assert policy.delay(0, retry_after=3.0) == 3.0
+        assert policy.delay(0, retry_after=60.0) == 10.0
+
+
+class TestParseRetryAfter:
+    """Test Retry-After header parsing."""
+
+    def test_delay_seconds(self):
+        assert parse_retry_after("5") == 5.0
+
+    def test_http_date(self):
+        assert parse_retry_after("Thu, 01 Jan 1970 00:00:30 GMT", now=10.0) == 20.0
+
+    def test_past_date_is_zero(self):
+        assert parse_retry_after("Thu, 01 Jan 1970 00:00:00 GMT", now=10.0) == 0.0
+
+    def test_missing_or_malformed(self):
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("soon") is None
+
+
+class TestRetryBudget:
+    """Test the retry token bucket."""
+
+    def test_retries_limited_to_ratio_of_requests(self, clock):
+        budget = RetryBudget(ratio=0.5, min_per_second=0.0, max_tokens=1.0, clock=clock)
+        assert budget.try_spend() is True
+        assert budget.try_spend() is False
+
+        budget.record_request()
+        assert budget.try_spend() is False  # 0.5 tokens
+        budget.record_request()
+        assert budget.try_spend() is True  # 1.0 tokens
+        assert budget.stats()["exhausted"] == 2
+
+    def test_min_per_second_refill(self, clock):
+        budget = RetryBudget(ratio=0.0, min_per_second=1.0, max_tokens=1.0, clock=clock)
+        assert budget.try_spend() is True
+        assert budget.try_spend() is False
+        clock.now = 1.0
+        assert budget.try_spend() is True
+
+
+@pytest.mark.asyncio
+class TestRetryingAPICall:
+    """Test retry behavior of ckan_api_call."""
+
+    @respx.mock
+    async def test_429_is_retried(self):
+        route = respx.get(f"{BASE_URL}/action/package_list")
+        route.side_effect = [
+            Response(429, headers={"Retry-After": "1"}, text="Too Many Requests"),
+            Response(200, json={"success": True, "result": []}),
+        ]
+
+        result = await ckan_api_call("package_list")
+
+        assert result["success"] is True
+        assert route.call_count == 2
+
+    @respx.mock
+    async def test_4xx_is_not_retried(self):
+        route = respx.get(f"{BASE_URL}/action/package_show").mock(
+            return_value=Response(403, text="Forbidden")
+        )
+
+        with pytest.raises(CKANAPIError):
+            await ckan_api_call("package_show", params={"id": "x"})
+
+        assert route.call_count == 1
+
+    @respx.mock
+    async def test_network_error_is_retried(self):
+        route = respx.get(f"{BASE_URL}/action/package_list")
+        route.side_effect = [
+            ConnectError("connection refused"),
+            Response(200, json={"success": True, "result": []}),
+        ]
+
+        result = await ckan_api_call("package_list")
+
+        assert result["success"] is True
+        assert route.call_count == 2
+
+    @respx.mock
+    async def test_exhausted_budget_stops_retries(self, monkeypatch):
+        route = respx.get(f"{BASE_URL}/action/package_list").mock(
+            return_value=Response(503, text="Service Unavailable")
+        )
+        monkeypatch.setattr(retry_budget, "ratio", 0.0)
+        monkeypatch.setattr(retry_budget, "min_per_second", 0.0)
+        monkeypatch.setattr(retry_budget, "max_tokens", 0.0)
+        retry_budget.reset()
+
+        with pytest.raises(CKANAPIError) as exc_info:
+            await ckan_api_call("package_list", max_retries=2)
+
+        assert exc_info.value.status_code == 503
+        assert route.call_count == 1
+
+    @respx.mock
+    async def test_ckan_error_not_wrapped_as_unexpected(self):
+        respx.get(f"{BASE_URL}/action/package_list").mock(
+            return_value=Response(200, json={"success": False, "error": {"message": "Nope"}})
+        )
+
+        with pytest.raises(CKANAPIError) as exc_info:
+            await ckan_api_call("package_list")
+
+        assert str(exc_info.value) == "CKAN API error: Nope"
+
+    @respx.mock
+    async def test_invalid_json_reported(self):
+        respx.get(f"{BASE_URL}/action/package_list").mock(
+            return_value=Response(200, text="<html>maintenance</html>")
+        )
+
+        with pytest.raises(CKANAPIError) as exc_info:
+            await ckan_api_call("package_list")
+
+        assert "Invalid JSON response" in exc_info.value.message
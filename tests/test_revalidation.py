@@ -0,0 +1,97 @@
+"""Tests for conditional revalidation of expired cache entries."""
+
+import pytest
+import respx
+from httpx import Response
+
+from datagov_mcp.api import BASE_URL, ckan_api_call
+from datagov_mcp.cache import make_cache_key, response_cache
+
+
+def expire(action: str, params: dict | None = None) -> None:
+    """Force a cached entry past its TTL."""
+    response_cache.peek(make_cache_key(action, "GET", params)).expires_at = 0.0
+
+
+@pytest.mark.asyncio
+class TestRevalidation:
+    """Test ETag / Last-Modified / content-hash revalidation in ckan_api_call."""
+
+    @respx.mock
+    async def test_etag_304_renews_entry(self):
+        route = respx.get(f"{BASE_URL}/action/package_list")
+        route.side_effect = [
+            Response(200, json={"success": True, "result": ["a"]}, headers={"ETag": '"v1"'}),
+            Response(304),
+        ]
+
+        first = await ckan_api_call("package_list")
+        expire("package_list")
+        second = await ckan_api_call("package_list")
+
+        assert second is first
+        assert route.calls[1].request.headers["If-None-Match"] == '"v1"'
+        assert response_cache.stats()["renewals"] == 1
+        assert await ckan_api_call("package_list") is first
+        assert route.call_count == 2
+
+    @respx.mock
+    async def test_last_modified_sent(self):
+        route = respx.get(f"{BASE_URL}/action/package_list")
+        route.side_effect = [
+            Response(
+                200,
+                json={"success": True, "result": ["a"]},
+                headers={"Last-Modified": "Wed, 01 Jan 2025 00:00:00 GMT"},
+            ),
+            Response(304),
+        ]
+
+        await ckan_api_call("package_list")
+        expire("package_list")
+        await ckan_api_call("package_list")
+
+        headers = route.calls[1].request.headers
+        assert headers["If-Modified-Since"] == "Wed, 01 Jan 2025 00:00:00 GMT"
+        assert "If-None-Match" not in headers
+
+    @respx.mock
+    async def test_unchanged_body_without_validators_reuses_object(self):
+        route = respx.get(f"{BASE_URL}/action/package_list").mock(
+            return_value=Response(200, json={"success": True, "result": ["a"]})
+        )
+
+        first = await ckan_api_call("package_list")
+        expire("package_list")
+        second = await ckan_api_call("package_list")
+
+        assert second is first
+        assert route.call_count == 2
+        assert response_cache.stats()["renewals"] == 1
+
+    @respx.mock
+    async def test_changed_body_replaces_entry(self):
+        route = respx.get(f"{BASE_URL}/action/package_list")
+        route.side_effect = [
+            Response(200, json={"success": True, "result": ["a"]}),
+            Response(200, json={"success": True, "result": ["a", "b"]}),
+        ]
+
+        first = await ckan_api_call("package_list")
+        expire("package_list")
+        second = await ckan_api_call("package_list")
+
+        assert second is not first
+        assert second["result"] == ["a", "b"]
+        assert response_cache.stats()["renewals"] == 0
+
+    @respx.mock
+    async def test_fresh_request_is_unconditional(self):
+        route = respx.get(f"{BASE_URL}/action/package_list").mock(
+            return_value=Response(200, json={"success": True, "result": []})
+        )
+
+        await ckan_api_call("package_list")
+
+        assert "If-None-Match" not in route.calls[0].request.headers
+        assert "If-Modified-Since" not in route.calls[0].request.headers
@@ -0,0 +1,128 @@
+"""Tests for single-flight coalescing of concurrent CKAN calls."""
+
+import asyncio
+
+import pytest
+import respx
+from httpx import Response
+
+from datagov_mcp.api import BASE_URL, CKANAPIError, ckan_api_call
+from datagov_mcp.singleflight import SingleFlight, inflight_requests
+
+
+def slow_response(response: Response, delay: float = 0.05):
+    """Build a respx side effect that answers after a short delay."""
+
+    async def side_effect(request):
+        await asyncio.sleep(delay)
+        return response
+
+    return side_effect
+
+
+@pytest.mark.asyncio
+class TestSingleFlight:
+    """Test the SingleFlight registry directly."""
+
+    async def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight()
+        calls = 0
+
+        async def fn():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        results = await asyncio.gather(*(flight.do("k", fn) for _ in range(5)))
+
+        assert results == [1] * 5
+        assert calls == 1
+        assert flight.stats() == {"in_flight": 0, "leaders": 1, "followers": 4}
+
+    async def test_error_shared_by_all_callers(self):
+        flight = SingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(
+            *(flight.do("k", fn) for _ in range(3)), return_exceptions=True
+        )
+
+        assert all(isinstance(r, ValueError) for r in results)
+        assert flight.in_flight() == 0
+
+    async def test_sequential_calls_not_coalesced(self):
+        flight = SingleFlight()
+        calls = 0
+
+        async def fn():
+            nonlocal calls
+            calls += 1
+            return calls
+
+        assert await flight.do("k", fn) == 1
+        assert await flight.do("k", fn) == 2
+
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        flight = SingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        first = asyncio.ensure_future(flight.do("k", fn))
+        second = asyncio.ensure_future(flight.do("k", fn))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        assert await second == "done"
+
+
+@pytest.mark.asyncio
+class TestCoalescedAPICall:
+    """Test coalescing in ckan_api_call."""
+
+    @respx.mock
+    async def test_identical_calls_hit_upstream_once(self):
+        route = respx.get(f"{BASE_URL}/action/package_show")
+        route.side_effect = slow_response(
+            Response(200, json={"success": True, "result": {"id": "a"}})
+        )
+
+        results = await asyncio.gather(
+            *(ckan_api_call("package_show", params={"id": "a"}) for _ in range(10))
+        )
+
+        assert route.call_count == 1
+        assert all(r["result"]["id"] == "a" for r in results)
+        assert inflight_requests.in_flight() == 0
+
+    @respx.mock
+    async def test_uncached_calls_also_coalesced(self):
+        route = respx.get(f"{BASE_URL}/action/datastore_search")
+        route.side_effect = slow_response(
+            Response(200, json={"success": True, "result": {"records": []}})
+        )
+
+        params = {"resource_id": "r", "limit": 10}
+        await asyncio.gather(
+            *(ckan_api_call("datastore_search", params=params, use_cache=False) for _ in range(4))
+        )
+
+        assert route.call_count == 1
+
+    @respx.mock
+    async def test_error_propagates_to_all_callers(self):
+        route = respx.get(f"{BASE_URL}/action/package_show")
+        route.side_effect = slow_response(Response(404, text="Not Found"))
+
+        results = await asyncio.gather(
+            *(ckan_api_call("package_show", params={"id": "x"}) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+        assert route.call_count == 1
+        assert all(isinstance(r, CKANAPIError) and r.status_code == 404 for r in results)
@@ -0,0 +1,90 @@
+"""Tests for lazy tool loading and startup measurement."""
+
+import inspect
+import sys
+import types
+
+import pytest
+
+from datagov_mcp import visualization
+from datagov_mcp.lazy import lazy_tool
+from datagov_mcp.startup import measure_startup, parse_importtime, summarize
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     fastmcp.utilities
+import time:      2000 |       2120 |   fastmcp
+import time:       300 |        300 |     datagov_mcp.config
+import time:       500 |       2920 | datagov_mcp.server
+unrelated stderr line
+"""
+
+
+class TestImportTime:
+    """Test parsing and summarizing ``-X importtime`` output."""
+
+    def test_parse(self):
+        entries = parse_importtime(IMPORTTIME)
+
+        assert [e.module for e in entries] == [
+            "fastmcp.utilities",
+            "fastmcp",
+            "datagov_mcp.config",
+            "datagov_mcp.server",
+        ]
+        assert [e.depth for e in entries] == [2, 1, 2, 0]
+        assert entries[3].cumulative_us == 2920
+
+    def test_summarize(self):
+        summary = summarize(parse_importtime(IMPORTTIME))
+
+        assert summary["total_import_ms"] == pytest.approx(2.92)
+        assert summary["packages"][0] == {"package": "fastmcp", "self_ms": pytest.approx(2.12)}
+        assert [m["module"] for m in summary["datagov_mcp"]] == [
+            "datagov_mcp.config",
+            "datagov_mcp.server",
+        ]
+
+
+@pytest.mark.asyncio
+class TestLazyTool:
+    """Test deferring tool implementations."""
+
+    async def test_forwards_on_first_call(self, monkeypatch):
+        implementation = types.ModuleType("fake_tool_impl")
+
+        async def tool(ctx, name: str, limit: int = 5) -> dict:
+            return {"name": name, "limit": limit}
+
+        implementation.tool = tool
+
+        @lazy_tool("fake_tool_impl")
+        async def tool(ctx, name: str, limit: int = 5) -> dict:  # noqa: F811
+            """Describe the tool."""
+
+        assert list(inspect.signature(tool).parameters) == ["ctx", "name", "limit"]
+        assert tool.__doc__ == "Describe the tool."
+        assert tool.__lazy_module__ == "fake_tool_impl"
+
+        monkeypatch.setitem(sys.modules, "fake_tool_impl", implementation)
+        assert await tool(None, "x", limit=2) == {"name": "x", "limit": 2}
+
+    async def test_visualization_helpers_resolve_lazily(self):
+        from datagov_mcp import visualization_impl
+
+        assert visualization.infer_field_type is visualization_impl.infer_field_type
+        with pytest.raises(AttributeError):
+            visualization.does_not_exist  # noqa: B018
+
+
+class TestMeasureStartup:
+    """Test the cold-start probe."""
+
+    def test_tools_list_defers_visualization(self):
+        report = measure_startup()
+
+        assert report["tools"] >= 14
+        assert "datagov_mcp.visualization_impl" in report["deferred_modules"]
+        assert report["deferred_loaded"] == []
+        assert report["import_ms"] > 0
+        assert any(m["module"] == "datagov_mcp.server" for m in report["datagov_mcp"])
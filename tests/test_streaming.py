@@ -0,0 +1,181 @@
+"""Tests for streaming decoding of datastore records."""
+
+import json
+
+import pytest
+import respx
+from httpx import Response
+
+from datagov_mcp.api import BASE_URL, CircuitOpenError, CKANAPIError
+from datagov_mcp.breaker import circuit_breakers
+from datagov_mcp.streaming import RecordStreamParser, stream_records
+from datagov_mcp.visualization import map_generator
+
+
+def make_document(count: int) -> dict:
+    return {
+        "help": "https://data.gov.il/api/3/action/help_show?name=datastore_search",
+        "success": True,
+        "result": {
+            "resource_id": "r",
+            "records": [
+                {"_id": i, "name": f'עיר "{i}" ]}}', "tags": [{"a": "["}], "lat": 32.0, "lon": 34.8}
+                for i in range(count)
+            ],
+            "fields": [{"id": "_id", "type": "int"}, {"id": "name", "type": "text"}],
+            "total": count,
+        },
+    }
+
+
+def feed_in_chunks(parser: RecordStreamParser, raw: bytes, size: int) -> list:
+    records = []
+    for i in range(0, len(raw), size):
+        records.extend(parser.feed(raw[i : i + size]))
+    return records
+
+
+class MockContext:
+    """Mock Context for testing."""
+
+    def __init__(self):
+        self.info_messages = []
+        self.error_messages = []
+
+    async def info(self, message: str):
+        self.info_messages.append(message)
+
+    async def error(self, message: str):
+        self.error_messages.append(message)
+
+
+class TestRecordStreamParser:
+    """Test the incremental records parser."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, 64, 100_000])
+    def test_records_and_metadata_extracted(self, chunk_size):
+        document = make_document(50)
+        parser = RecordStreamParser()
+
+        records = feed_in_chunks(parser, json.dumps(document).encode(), chunk_size)
+        rest = parser.finish()
+
+        assert records == document["result"]["records"]
+        assert rest["result"]["records"] == []
+        assert rest["result"]["fields"] == document["result"]["fields"]
+        assert rest["result"]["total"] == 50
+
+    def test_pretty_printed_and_non_ascii(self):
+        document = make_document(5)
+        raw = json.dumps(document, indent=2, ensure_ascii=False).encode()
+        parser = RecordStreamParser()
+
+        assert feed_in_chunks(parser, raw, 3) == document["result"]["records"]
+        assert parser.finish()["success"] is True
+
+    def test_lists_records_format(self):
+        document = {"success": True, "result": {"records": [[1, "a,]"], [2, "b"]], "fields": []}}
+        parser = RecordStreamParser()
+
+        assert parser.feed(json.dumps(document).encode()) == [[1, "a,]"], [2, "b"]]
+
+    def test_buffer_is_bounded(self):
+        document = make_document(1000)
+        raw = json.dumps(document).encode()
+        parser = RecordStreamParser(max_buffer_bytes=4096)
+
+        records = feed_in_chunks(parser, raw, 1024)
+
+        assert len(records) == 1000
+        assert len(raw) > 20 * 4096
+
+    def test_oversized_record_rejected(self):
+        document = {"success": True, "result": {"records": [{"blob": "x" * 10_000}]}}
+        parser = RecordStreamParser(max_buffer_bytes=1024)
+
+        with pytest.raises(CKANAPIError):
+            feed_in_chunks(parser, json.dumps(document).encode(), 512)
+
+    def test_truncated_document_rejected(self):
+        parser = RecordStreamParser()
+        parser.feed(json.dumps(make_document(2)).encode()[:-10])
+
+        with pytest.raises(CKANAPIError):
+            parser.finish()
+
+    def test_invalid_record_rejected(self):
+        parser = RecordStreamParser()
+        parser.feed(b'{"success": true, "result": {"records": [{"a": 1}, {"a": nope}]}}')
+
+        with pytest.raises(CKANAPIError, match="Invalid JSON record"):
+            parser.finish()
+
+
+@pytest.mark.asyncio
+class TestRecordStream:
+    """Test streamed CKAN calls."""
+
+    @respx.mock
+    async def test_batches_and_metadata(self):
+        respx.get(f"{BASE_URL}/action/datastore_search").mock(
+            return_value=Response(200, json=make_document(25))
+        )
+
+        stream = stream_records("datastore_search", {"resource_id": "r"}, batch_size=10)
+        batches = [batch async for batch in stream]
+
+        assert [len(b) for b in batches] == [10, 10, 5]
+        assert stream.metadata["total"] == 25
+        assert "records" not in stream.metadata
+
+    @respx.mock
+    async def test_ckan_error_raised(self):
+        respx.get(f"{BASE_URL}/action/datastore_search").mock(
+            return_value=Response(200, json={"success": False, "error": {"message": "Not found"}})
+        )
+
+        with pytest.raises(CKANAPIError, match="Not found"):
+            async for _ in stream_records("datastore_search", {"resource_id": "r"}):
+                pass
+
+    @respx.mock
+    async def test_http_error_raised(self):
+        respx.get(f"{BASE_URL}/action/datastore_search").mock(
+            return_value=Response(404, text="Not Found")
+        )
+
+        with pytest.raises(CKANAPIError) as exc_info:
+            async for _ in stream_records("datastore_search", {"resource_id": "r"}):
+                pass
+
+        assert exc_info.value.status_code == 404
+
+    @respx.mock
+    async def test_open_breaker_fails_fast(self, monkeypatch):
+        route = respx.get(f"{BASE_URL}/action/datastore_search").mock(
+            return_value=Response(200, json=make_document(5))
+        )
+        breaker = circuit_breakers.for_action("datastore_search")
+        monkeypatch.setattr(breaker, "min_calls", 1)
+        breaker.record(False)
+
+        with pytest.raises(CircuitOpenError) as exc_info:
+            async for _ in stream_records("datastore_search", {"resource_id": "r"}):
+                pass
+
+        assert exc_info.value.status_code == 503
+        assert not route.called
+
+    @respx.mock
+    async def test_map_generator_streams_large_limits(self):
+        respx.get(f"{BASE_URL}/action/datastore_search").mock(
+            return_value=Response(200, json=make_document(1500))
+        )
+
+        ctx = MockContext()
+        result = await map_generator.fn(
+            ctx, resource_id="r", lat_field="lat", lon_field="lon", limit=5000, popup_fields=["_id"]
+        )
+
+        assert result["point_count"] == 1500
+        assert result["geojson"]["features"][0]["properties"]["_id"] == 0
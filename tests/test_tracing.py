@@ -0,0 +1,168 @@
+"""Tests for tracing spans."""
+
+import asyncio
+
+import httpx
+import pytest
+import respx
+from fastmcp import Client
+
+from datagov_mcp import tracing
+from datagov_mcp.api import BASE_URL, ckan_api_call
+from datagov_mcp.server import fetch_data, mcp
+from datagov_mcp.tracing import NOOP_SPAN, NoopTracer, RecordingTracer, make_tracer, span
+
+
+class MockContext:
+    """Mock Context for testing."""
+
+    def __init__(self):
+        self.info_messages = []
+        self.error_messages = []
+
+    async def info(self, message: str):
+        self.info_messages.append(message)
+
+    async def error(self, message: str):
+        self.error_messages.append(message)
+
+
+@pytest.fixture
+def recorder(monkeypatch):
+    tracer = RecordingTracer()
+    monkeypatch.setattr(tracing, "_tracer", tracer)
+    return tracer
+
+
+def by_name(tracer: RecordingTracer, name: str) -> list:
+    return [s for s in tracer.spans if s.name == name]
+
+
+class TestTracers:
+    """Test tracer selection and span bookkeeping."""
+
+    def test_default_is_noop(self):
+        assert isinstance(make_tracer(), NoopTracer)
+        with NoopTracer().start_span("x", {}) as current:
+            assert current is NOOP_SPAN
+
+    def test_otel_falls_back_without_opentelemetry(self, monkeypatch):
+        monkeypatch.setattr(tracing, "opentelemetry_available", lambda: False)
+
+        assert isinstance(make_tracer("otel"), NoopTracer)
+
+    def test_nested_spans_share_trace(self, recorder):
+        with span("outer", tool="t") as outer:
+            with span("inner") as inner:
+                inner.set_attribute("rows", 3)
+
+        assert inner.parent_id == outer.span_id
+        assert inner.trace_id == outer.trace_id
+        assert outer.parent_id is None
+        assert inner.attributes == {"rows": 3}
+        assert [s.name for s in recorder.spans] == ["inner", "outer"]
+        assert outer.duration >= inner.duration >= 0
+
+    def test_errors_recorded(self, recorder):
+        with pytest.raises(ValueError):
+            with span("failing"):
+                raise ValueError("bad")
+
+        assert recorder.spans[0].error == "ValueError: bad"
+
+    async def test_context_propagates_into_tasks(self, recorder):
+        async def child():
+            with span("child"):
+                await asyncio.sleep(0)
+
+        with span("parent") as parent:
+            await asyncio.gather(asyncio.create_task(child()), asyncio.create_task(child()))
+
+        children = by_name(recorder, "child")
+        assert len(children) == 2
+        assert all(c.parent_id == parent.span_id for c in children)
+
+
+@pytest.mark.asyncio
+class TestCKANSpans:
+    """Test spans emitted by ckan_api_call and tools."""
+
+    @respx.mock
+    async def test_attempts_decode_and_backoff_spans(self, recorder):
+        respx.get(f"{BASE_URL}/action/package_show").mock(
+            side_effect=[
+                httpx.Response(503, text="unavailable"),
+                httpx.Response(200, json={"success": True, "result": {"id": "x"}}),
+            ]
+        )
+
+        await ckan_api_call("package_show", params={"id": "x"})
+
+        (call,) = by_name(recorder, "ckan_api_call")
+        requests = by_name(recorder, "ckan.request")
+        assert [r.attributes["attempt"] for r in requests] == [0, 1]
+        assert [r.attributes["http.response.status_code"] for r in requests] == [503, 200]
+        assert all(r.parent_id == call.span_id for r in requests)
+        (decode,) = by_name(recorder, "ckan.decode")
+        assert decode.parent_id == requests[1].span_id
+        assert by_name(recorder, "ckan.backoff")[0].parent_id == call.span_id
+        assert call.attributes["cache"] == "miss"
+
+    @respx.mock
+    async def test_fetch_data_nests_both_calls(self, recorder):
+        respx.get(f"{BASE_URL}/action/package_show").mock(
+            return_value=httpx.Response(
+                200, json={"success": True, "result": {"resources": [{"id": "r1"}]}}
+            )
+        )
+        respx.get(f"{BASE_URL}/action/datastore_search").mock(
+            return_value=httpx.Response(200, json={"success": True, "result": {"records": []}})
+        )
+
+        with span("tool fetch_data") as root:
+            await fetch_data.fn(MockContext(), dataset_name="d")
+
+        calls = by_name(recorder, "ckan_api_call")
+        assert [c.attributes["action"] for c in calls] == ["package_show", "datastore_search"]
+        assert all(c.parent_id == root.span_id for c in calls)
+
+    @respx.mock
+    async def test_middleware_opens_tool_span(self, recorder, monkeypatch):
+        monkeypatch.setattr("datagov_mcp.client._http_client.config.prewarm_connections", 0)
+        monkeypatch.setattr("datagov_mcp.client._http_client.config.refresh_interval", 0)
+        respx.get(f"{BASE_URL}/action/license_list").mock(
+            return_value=httpx.Response(200, json={"success": True, "result": []})
+        )
+
+        async with Client(mcp) as client:
+            await client.call_tool("license_list", {})
+
+        (tool,) = by_name(recorder, "tool license_list")
+        (call,) = by_name(recorder, "ckan_api_call")
+        assert call.parent_id == tool.span_id
+
+
+class TestOpenTelemetry:
+    """Test the OpenTelemetry bridge."""
+
+    def test_spans_exported(self, monkeypatch):
+        pytest.importorskip("opentelemetry.sdk")
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        tracer = tracing.OpenTelemetryTracer()
+        tracer._tracer = provider.get_tracer("datagov_mcp")
+        monkeypatch.setattr(tracing, "_tracer", tracer)
+
+        with span("outer", tool="t"):
+            with span("inner"):
+                tracing.current_span().set_attribute("rows", 3)
+
+        inner, outer = exporter.get_finished_spans()
+        assert inner.parent.span_id == outer.context.span_id
+        assert dict(inner.attributes) == {"rows": 3}
+        assert dict(outer.attributes) == {"tool": "t"}
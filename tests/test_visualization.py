@@ -5,7 +5,15 @@ import respx
 from httpx import Response
 
 from datagov_mcp.api import BASE_URL
-from datagov_mcp.visualization import chart_generator, dataset_profile, map_generator
+from datagov_mcp.visualization import (
+    build_chart_spec,
+    chart_generator,
+    dataset_profile,
+    map_center,
+    map_generator,
+    records_to_features,
+    render_chart_html,
+)
 
 
 class MockContext:
@@ -217,6 +225,7 @@ class TestVisualizationTools:
             lat_field="latitude",
             lon_field="longitude",
             limit=100,
+            popup_fields=["name", "population"],
         )
 
         assert "geojson" in result
@@ -289,3 +298,35 @@ class TestVisualizationTools:
 
         assert "error" in result
         assert "Unsupported chart type" in result["error"]
+
+
+class TestVisualizationHelpers:
+    """Test the pure spec, feature and HTML helpers behind the tools."""
+
+    def test_records_to_features_skips_invalid(self):
+        records = [
+            {"lat": "32.1", "lon": "34.8", "name": "תל אביב"},
+            {"lat": None, "lon": "34.8"},
+            {"lat": "x", "lon": "y"},
+        ]
+
+        features = records_to_features(records, "lat", "lon")
+
+        assert len(features) == 1
+        assert features[0]["geometry"]["coordinates"] == [34.8, 32.1]
+        assert features[0]["properties"] == {"name": "תל אביב"}
+        assert map_center(features) == (32.1, 34.8)
+
+    def test_build_chart_spec(self):
+        spec = build_chart_spec([{"x": 1}], "histogram", "x")
+
+        assert spec["mark"] == "bar"
+        assert spec["encoding"]["x"]["bin"] is True
+        assert spec["title"] == "Histogram Chart"
+        assert build_chart_spec([{"x": 1}], "pie", "x") is None
+
+    def test_render_chart_html_embeds_spec(self):
+        html = render_chart_html(build_chart_spec([{"city": "חיפה"}], "bar", "city", "v"))
+
+        assert '<meta charset="utf-8">' in html
+        assert '"city":"חיפה"' in html